@@ -0,0 +1,125 @@
+import io
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Union
+
+from app.core.exceptions import InvalidFormError
+from app.models.field_validator import FieldType
+from app.models.form_template import FormTemplate
+
+#: Типы содержимого, которые разбираются как NDJSON (одна форма на строку)
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+#: Количество результатов в одном фрагменте потокового ответа
+STREAM_CHUNK_SIZE = 256
+
+
+def parse_form(item: Any, position: int) -> Dict[str, str]:
+    """
+    Проверяет, что элемент пакета — словарь строковых полей и значений.
+
+    :param item: Разобранный JSON-элемент.
+    :param position: Порядковый номер элемента (с единицы) для сообщения об ошибке.
+    :return: Данные формы.
+    :raises InvalidFormError: Если элемент имеет неверную структуру.
+    """
+    if not isinstance(item, dict) or not all(
+        isinstance(value, str) for value in item.values()
+    ):
+        raise InvalidFormError(
+            f"Item {position}: form must be an object with string values."
+        )
+    return item
+
+
+async def iter_json_array(body: bytes) -> AsyncIterator[Dict[str, str]]:
+    """
+    Разбирает тело запроса в формате JSON-массива форм.
+
+    :param body: Тело запроса.
+    :return: Асинхронный итератор данных форм.
+    :raises InvalidFormError: Если тело не является массивом форм.
+    """
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise InvalidFormError("Request body must be a JSON array of forms.")
+    if not isinstance(items, list):
+        raise InvalidFormError("Request body must be a JSON array of forms.")
+    for position, item in enumerate(items, start=1):
+        yield parse_form(item, position)
+
+
+async def iter_ndjson(body: bytes) -> AsyncIterator[Dict[str, str]]:
+    """
+    Построчно разбирает тело запроса в формате NDJSON.
+
+    Пустые строки пропускаются. Строки разбираются по мере обработки,
+    поэтому разобранные формы всего набора не держатся в памяти.
+
+    Тело передается целиком: при потоковом ответе Starlette читает канал
+    запроса для отслеживания отключения клиента, и дочитать тело после
+    начала ответа нельзя.
+
+    :param body: Тело запроса.
+    :return: Асинхронный итератор данных форм.
+    :raises InvalidFormError: Если строка не является JSON-объектом формы.
+    """
+    for position, line in enumerate(io.BytesIO(body), start=1):
+        if line.strip():
+            yield _parse_line(line, position)
+
+
+def _parse_line(line: bytes, position: int) -> Dict[str, str]:
+    try:
+        item = json.loads(line)
+    except ValueError:
+        raise InvalidFormError(f"Item {position}: invalid JSON.")
+    return parse_form(item, position)
+
+
+def serialize_result(
+    result: Union[FormTemplate, Dict[str, FieldType]],
+) -> Dict[str, Any]:
+    """
+    Преобразует результат обработки формы в JSON-совместимый словарь,
+    совпадающий с ответом эндпоинта `/get_form`.
+
+    :param result: Найденный шаблон или типы полей.
+    :return: `{"template_name": ...}` или словарь с типами полей.
+    """
+    if isinstance(result, FormTemplate):
+        return {"template_name": result.name}
+    return result
+
+
+async def encode_ndjson(
+    results: AsyncIterable[Union[FormTemplate, Dict[str, FieldType]]],
+) -> AsyncIterator[bytes]:
+    """
+    Кодирует результаты в NDJSON, группируя строки во фрагменты.
+
+    Если во входных данных встречается ошибка, в поток записывается
+    строка `{"error": ...}` и передача прекращается.
+
+    :param results: Асинхронный итератор результатов.
+    :return: Асинхронный итератор фрагментов ответа.
+    """
+    lines = []
+    try:
+        async for result in results:
+            lines.append(_dumps(serialize_result(result)))
+            if len(lines) >= STREAM_CHUNK_SIZE:
+                yield _join(lines)
+                lines = []
+    except InvalidFormError as e:
+        lines.append(_dumps({"error": str(e)}))
+    if lines:
+        yield _join(lines)
+
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _join(lines: Iterable[str]) -> bytes:
+    return ("\n".join(lines) + "\n").encode("utf-8")
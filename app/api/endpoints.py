@@ -1,19 +1,112 @@
-from typing import Union
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Literal, TypeVar, Union
 
-from fastapi import FastAPI, Request
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from app.api.schema import get_form_schema
+from app.api.batch import (
+    NDJSON_MEDIA_TYPES,
+    encode_ndjson,
+    iter_json_array,
+    iter_ndjson,
+    serialize_result,
+)
+from app.api.fast_path import (
+    URLENCODED_MEDIA_TYPE,
+    encode_field_types,
+    encode_template_name,
+    parse_urlencoded,
+)
+from app.api.profiling import ProfilingMiddleware
+from app.api.schema import (
+    bulk_upsert_schema,
+    delete_template_schema,
+    get_form_schema,
+    get_forms_schema,
+    get_template_schema,
+    list_templates_schema,
+    put_template_schema,
+)
+from app.core.api import ApiConfig
+from app.core.exceptions import (
+    InvalidFormError,
+    ReadOnlyStorageError,
+    StorageUnavailableError,
+)
+from app.core.profiling import ProfilingConfig
+from app.models.field_validator import FieldType, detect_field_type
+from app.models.admin import ProfilingSettings
 from app.models.form_template import FormData, FormTemplate
-from app.models.response import TemplateNameResponse, FieldTypeResponse
+from app.models.response import (
+    BulkUpsertResponse,
+    FieldTypeResponse,
+    RankedTemplatesResponse,
+    TemplateCandidate,
+    TemplateListResponse,
+    TemplateNameResponse,
+    TemplateResponse,
+)
 from app.services.form_service import FormService
+from app.services.matcher import MatchMode
+from app.services.metrics import CONTENT_TYPE, metrics
+from app.services.profiler import Profiler
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 service = FormService()
 
+api_config = ApiConfig().get_params()
+
+profiler = Profiler(**ProfilingConfig().get_params())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Прогревает каталог шаблонов при запуске приложения.
+
+    Если каталог уже загружен (например, родительским процессом
+    `app.serve` до запуска воркеров), повторная загрузка не выполняется.
+    Ошибка загрузки не останавливает приложение: каталог будет загружен
+    при первом запросе, а `/ready` до этого отвечает 503.
+    """
+    if not service.ready:
+        try:
+            await service.awarmup()
+        except Exception:
+            logger.exception("Template catalog warmup failed")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+
+@app.exception_handler(StorageUnavailableError)
+async def storage_unavailable(
+    request: Request, exc: StorageUnavailableError
+) -> JSONResponse:
+    """
+    Отвечает 503, если хранилище недоступно, а каталога в памяти нет.
+
+    :param request: Объект запроса
+    :param exc: Ошибка хранилища
+    :return: JSONResponse: Описание ошибки
+    """
+    return JSONResponse({"detail": str(exc)}, status_code=503)
+
 
 @app.post("/get_form", **get_form_schema)
-async def get_form(request: Request) -> Union[TemplateNameResponse, FieldTypeResponse]:
+async def get_form(
+    request: Request,
+    match: Literal["first", "best", "top"] = "first",
+    limit: int = Query(5, ge=1, le=100),
+) -> Union[TemplateNameResponse, FieldTypeResponse, RankedTemplatesResponse]:
     """
     Обрабатывает данные формы и возвращает результат.
 
@@ -23,15 +116,313 @@ async def get_form(request: Request) -> Union[TemplateNameResponse, FieldTypeRes
     - Если шаблон найден, возвращается имя шаблона.
     - Если шаблон не найден, возвращается словарь с типами полей.
 
+    Параметр `match` задает режим подбора:
+    - `first` — первый подходящий шаблон в порядке хранилища;
+    - `best` — подходящий шаблон с наибольшим числом полей;
+    - `top` — до `limit` кандидатов с оценками, включая частично
+      совпавшие шаблоны.
+
+    Если включен быстрый путь (`FAST_PATH_ENABLED`), urlencoded-тело
+    разбирается и обрабатывается без pydantic-моделей, а ответ кодируется
+    напрямую; JSON ответа при этом совпадает побайтно.
+
     :param request: Объект запроса
-    :return: Union[TemplateNameResponse, FieldTypeResponse]: Ответ с именем
-             шаблона или ответ с типами полей
+    :param match: Режим подбора шаблона
+    :param limit: Максимальное количество кандидатов в режиме `top`
+    :return: Union[TemplateNameResponse, FieldTypeResponse,
+             RankedTemplatesResponse]: Ответ с именем шаблона, ответ
+             с типами полей или список кандидатов
     """
+    if match != "top" and api_config["FAST_PATH"] and _is_urlencoded(request):
+        return await _get_form_fast(request, match)
+
+    started = metrics.now()
     data_dict = dict(await request.form())
+    stage = metrics.stage("parse", started)
     form_data = FormData(data=data_dict)
-    result = service.process_form(form_data)
+    metrics.stage("detect", stage)
+
+    if match == "top":
+        candidates = await service.arank_form(form_data, limit)
+        metrics.stage("total", started)
+        return RankedTemplatesResponse(
+            candidates=[
+                TemplateCandidate(
+                    template_name=candidate.template.name,
+                    score=candidate.score,
+                    matched_fields=candidate.matched,
+                    template_fields=candidate.total,
+                )
+                for candidate in candidates
+            ]
+        )
+
+    result = await service.aprocess_form(form_data, match)
 
+    stage = metrics.now()
     if isinstance(result, FormTemplate):
-        return TemplateNameResponse(template_name=result.name)
+        response = TemplateNameResponse(template_name=result.name)
+    else:
+        response = FieldTypeResponse(root=result)
+    metrics.stage("serialize", stage)
+    metrics.stage("total", started)
+    return response
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready() -> JSONResponse:
+    """
+    Сигнал готовности: 200, только когда каталог шаблонов загружен.
+
+    :return: JSONResponse: Статус готовности
+    """
+    if service.ready:
+        return JSONResponse({"status": "ready"})
+    return JSONResponse({"status": "warming up"}, status_code=503)
+
+
+@app.get("/health", include_in_schema=False)
+async def health() -> JSONResponse:
+    """
+    Состояние сервиса: каталог в памяти, автоматический выключатель
+    и пул соединений хранилища (см. `FormService.health`).
+
+    Пока каталог загружен, сервис отвечает 200, даже если хранилище
+    недоступно (статус `degraded`); без каталога — 503.
+
+    :return: JSONResponse: Отчет о состоянии
+    """
+    report = service.health()
+    status_code = 503 if report["status"] == "unavailable" else 200
+    return JSONResponse(report, status_code=status_code)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Метрики сервиса в текстовом формате Prometheus (при `METRICS_ENABLED`).
+
+    :return: Response: Значения метрик или 404, если метрики выключены
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
+def require_admin_token(
+    x_admin_token: str = Header("", include_in_schema=False),
+) -> None:
+    """
+    Проверяет токен администратора для эндпоинтов, изменяющих состояние
+    сервиса (`/admin/*`, запись `/templates`).
+
+    Если `ADMIN_TOKEN` не задан, эндпоинты отключены.
+
+    :param x_admin_token: Токен из заголовка `X-Admin-Token`
+    :raises HTTPException: 404, если `ADMIN_TOKEN` не задан;
+                           403, если токен не совпадает с `ADMIN_TOKEN`
+    """
+    expected = api_config["ADMIN_TOKEN"]
+    if not expected:
+        raise HTTPException(
+            status_code=404, detail="Admin endpoints are disabled (no ADMIN_TOKEN)."
+        )
+    if not secrets.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+#: Зависимости эндпоинтов, доступных только администратору
+admin_only = [Depends(require_admin_token)]
+
+
+@app.get(
+    "/admin/profiling",
+    response_model=ProfilingSettings,
+    include_in_schema=False,
+    dependencies=admin_only,
+)
+async def get_profiling() -> ProfilingSettings:
+    """
+    Возвращает текущие настройки профилирования запросов.
+
+    :return: ProfilingSettings: Настройки профилирования
+    """
+    return ProfilingSettings(**profiler.state())
+
+
+@app.post(
+    "/admin/profiling",
+    response_model=ProfilingSettings,
+    include_in_schema=False,
+    dependencies=admin_only,
+)
+async def set_profiling(settings: ProfilingSettings) -> ProfilingSettings:
+    """
+    Изменяет настройки профилирования запросов во время работы.
 
-    return FieldTypeResponse(root=result)
+    Настройки действуют только в процессе, обработавшем запрос.
+
+    :param settings: Новые значения настроек (`null` — без изменений)
+    :return: ProfilingSettings: Настройки профилирования после изменения
+    """
+    profiler.configure(**settings.model_dump())
+    return ProfilingSettings(**profiler.state())
+
+
+def _is_urlencoded(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    return content_type == URLENCODED_MEDIA_TYPE
+
+
+async def _get_form_fast(request: Request, match: MatchMode = "first") -> Response:
+    """
+    Быстрый путь `/get_form`: работает со словарями и готовыми байтами ответа.
+
+    :param request: Объект запроса
+    :param match: Режим подбора: `"first"` или `"best"`
+    :return: Response: Ответ в формате JSON
+    """
+    started = metrics.now()
+    data = parse_urlencoded(await request.body())
+    stage = metrics.stage("parse", started)
+    field_types = {name: detect_field_type(value) for name, value in data.items()}
+    stage = metrics.stage("detect", stage)
+    templates = await service.acandidates(field_types)
+    stage = metrics.stage("load", stage)
+    template_name = service.match_name(templates, field_types, match)
+    stage = metrics.stage("match", stage)
+    metrics.result(template_name)
+
+    if template_name is not None:
+        content = encode_template_name(template_name)
+    else:
+        content = encode_field_types(field_types)
+    metrics.stage("serialize", stage)
+    metrics.stage("total", started)
+    return Response(content=content, media_type="application/json")
+
+
+@app.post("/get_forms", **get_forms_schema)
+async def get_forms(request: Request, stream: bool = False) -> Response:
+    """
+    Обрабатывает набор форм за один запрос.
+
+    Эндпоинт принимает JSON-массив форм (`application/json`) или NDJSON
+    (`application/x-ndjson`). Шаблоны загружаются один раз на весь набор,
+    результаты возвращаются в порядке входных данных.
+
+    :param request: Объект запроса
+    :param stream: Передавать ли ответ потоком в формате NDJSON
+    :return: Response: JSON-массив результатов или поток NDJSON
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    body = await request.body()
+    if content_type in NDJSON_MEDIA_TYPES:
+        forms = iter_ndjson(body)
+    else:
+        forms = iter_json_array(body)
+
+    results = service.aprocess_forms(forms)
+    if stream:
+        return StreamingResponse(
+            encode_ndjson(results), media_type="application/x-ndjson"
+        )
+
+    try:
+        return JSONResponse([serialize_result(result) async for result in results])
+    except InvalidFormError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/templates", **list_templates_schema)
+async def list_templates() -> TemplateListResponse:
+    """
+    Возвращает все шаблоны каталога.
+
+    :return: TemplateListResponse: Шаблоны в порядке хранилища
+    """
+    templates = await service.alist_templates()
+    return TemplateListResponse(
+        templates=[_template_response(template) for template in templates]
+    )
+
+
+@app.get("/templates/{name}", **get_template_schema)
+async def get_template(name: str) -> TemplateResponse:
+    """
+    Возвращает шаблон по имени.
+
+    :param name: Имя шаблона
+    :return: TemplateResponse: Шаблон формы
+    """
+    template = await service.aget_template(name)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template {name!r} not found.")
+    return _template_response(template)
+
+
+@app.put("/templates/{name}", dependencies=admin_only, **put_template_schema)
+async def put_template(
+    name: str, fields: Dict[str, FieldType] = Body(...)
+) -> TemplateResponse:
+    """
+    Добавляет шаблон или заменяет существующий с тем же именем.
+
+    :param name: Имя шаблона
+    :param fields: Поля шаблона и их типы
+    :return: TemplateResponse: Записанный шаблон
+    """
+    template = FormTemplate(**{**fields, "name": name})
+    await _write(service.aupsert_templates([template]))
+    return _template_response(template)
+
+
+@app.delete("/templates/{name}", dependencies=admin_only, **delete_template_schema)
+async def delete_template(name: str) -> Response:
+    """
+    Удаляет шаблон по имени.
+
+    :param name: Имя шаблона
+    :return: Response: Пустой ответ
+    """
+    if not await _write(service.adelete_templates([name])):
+        raise HTTPException(status_code=404, detail=f"Template {name!r} not found.")
+    return Response(status_code=204)
+
+
+@app.post("/templates/bulk", dependencies=admin_only, **bulk_upsert_schema)
+async def upsert_templates(
+    documents: List[Dict[str, Any]] = Body(...),
+) -> BulkUpsertResponse:
+    """
+    Атомарно добавляет или заменяет набор шаблонов.
+
+    Все шаблоны проверяются до записи, поэтому некорректный шаблон
+    отклоняет весь набор.
+
+    :param documents: Шаблоны в формате хранилища
+    :return: BulkUpsertResponse: Количество записанных шаблонов
+    """
+    try:
+        templates = [FormTemplate(**dict(document)) for document in documents]
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    await _write(service.aupsert_templates(templates))
+    return BulkUpsertResponse(upserted=len(templates))
+
+
+def _template_response(template: FormTemplate) -> TemplateResponse:
+    return TemplateResponse(name=template.name, fields=template.fields)
+
+
+async def _write(operation: Awaitable[T]) -> T:
+    """
+    Выполняет запись шаблонов, сообщая об отсутствии поддержки записи кодом 405.
+
+    :param operation: Операция записи
+    :return: Результат операции
+    """
+    try:
+        return await operation
+    except ReadOnlyStorageError as e:
+        raise HTTPException(status_code=405, detail=str(e))
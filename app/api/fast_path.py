@@ -0,0 +1,58 @@
+import json
+from functools import lru_cache
+from typing import Dict, Mapping
+from urllib.parse import unquote_plus
+
+from app.models.field_validator import FieldType
+
+#: Тип содержимого, который обрабатывается быстрым путем
+URLENCODED_MEDIA_TYPE = "application/x-www-form-urlencoded"
+
+# Те же параметры, что у `fastapi.responses.JSONResponse.render`,
+# поэтому ответ совпадает побайтно.
+_encode = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+).encode
+
+
+def parse_urlencoded(body: bytes) -> Dict[str, str]:
+    """
+    Разбирает тело запроса `application/x-www-form-urlencoded` в словарь.
+
+    Разбор повторяет поведение `Request.form()` в Starlette: пары
+    разделяются `&`, поля без значения получают пустую строку,
+    при повторе поля остается последнее значение.
+
+    :param body: Тело запроса.
+    :return: Словарь поле -> значение.
+    """
+    data = {}
+    for pair in body.decode("latin-1").split("&"):
+        if not pair:
+            continue
+        name, _, value = pair.partition("=")
+        data[unquote_plus(name)] = unquote_plus(value)
+    return data
+
+
+@lru_cache(maxsize=4096)
+def encode_template_name(name: str) -> bytes:
+    """
+    Возвращает закодированный ответ `{"template_name": name}`.
+
+    Ответы для имен шаблонов кешируются, так как набор имен ограничен каталогом.
+
+    :param name: Имя шаблона.
+    :return: Тело ответа в формате JSON.
+    """
+    return _encode({"template_name": name}).encode("utf-8")
+
+
+def encode_field_types(field_types: Mapping[str, FieldType]) -> bytes:
+    """
+    Возвращает закодированный ответ с типами полей.
+
+    :param field_types: Типы полей формы.
+    :return: Тело ответа в формате JSON.
+    """
+    return _encode(field_types).encode("utf-8")
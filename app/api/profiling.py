@@ -0,0 +1,35 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.services.profiler import Profiler
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware, профилирующее HTTP-запросы с помощью `Profiler`.
+
+    Пока профилирование выключено, middleware только проверяет флаг
+    и передает запрос дальше. Профиль записывается в пуле потоков
+    (`Profiler.afinish`), не блокируя цикл событий.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Profiler):
+        """
+        :param app: Оборачиваемое ASGI-приложение.
+        :param profiler: Профилировщик запросов.
+        """
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        recording = self.profiler.start()
+        if recording is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.profiler.afinish(recording, f"{scope['method']} {scope['path']}")
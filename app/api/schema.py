@@ -1,15 +1,27 @@
 from typing import Union
 
-from app.models.response import TemplateNameResponse, FieldTypeResponse
+from app.models.response import (
+    BulkUpsertResponse,
+    FieldTypeResponse,
+    RankedTemplatesResponse,
+    TemplateListResponse,
+    TemplateNameResponse,
+    TemplateResponse,
+)
 
 #: Метаданные для эндпоинта `/get_form`
 get_form_schema = {
-    "response_model": Union[TemplateNameResponse, FieldTypeResponse],
+    "response_model": Union[
+        TemplateNameResponse, FieldTypeResponse, RankedTemplatesResponse
+    ],
     "summary": "Обработка формы",
     "description": (
         "Этот эндпоинт принимает данные формы (поля и их значения) и выполняет обработку. "
         "\nЕсли данные соответствуют шаблону формы, возвращается имя шаблона. "
-        "\nВ противном случае возвращаются типы переданных полей."
+        "\nВ противном случае возвращаются типы переданных полей. "
+        "\nПараметр `match` задает режим подбора: `first` — первый подходящий "
+        "шаблон, `best` — подходящий шаблон с наибольшим числом полей, "
+        "`top` — до `limit` кандидатов с оценками совпадения."
     ),
     "openapi_extra": {
         "requestBody": {
@@ -42,9 +54,171 @@ get_form_schema = {
                             "summary": "Шаблон не найден",
                             "value": {"email": "email", "phone": "phone"},
                         },
+                        "ranked_candidates": {
+                            "summary": "Кандидаты (match=top)",
+                            "value": {
+                                "candidates": [
+                                    {
+                                        "template_name": "Contact Form",
+                                        "score": 1.0,
+                                        "matched_fields": 3,
+                                        "template_fields": 3,
+                                    },
+                                    {
+                                        "template_name": "Job Application Form",
+                                        "score": 0.5,
+                                        "matched_fields": 2,
+                                        "template_fields": 4,
+                                    },
+                                ]
+                            },
+                        },
                     },
                 }
             },
         },
     },
 }
+
+#: Метаданные для эндпоинта `/get_forms`
+get_forms_schema = {
+    "summary": "Пакетная обработка форм",
+    "description": (
+        "Этот эндпоинт принимает набор форм в виде JSON-массива объектов "
+        "или в формате NDJSON (по одной форме на строку) и обрабатывает их "
+        "за один запрос. "
+        "\nРезультаты возвращаются в порядке входных данных в том же формате, "
+        "что и у `/get_form`. "
+        "\nС параметром `stream=true` ответ передается потоком в формате NDJSON."
+    ),
+    "openapi_extra": {
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "additionalProperties": {"type": "string"},
+                        },
+                    },
+                    "example": [
+                        {
+                            "email": "example@example.com",
+                            "phone": "+7 999 456 78 90",
+                            "message": "Hello world!",
+                        },
+                        {"email": "example@example.com", "phone": "+7 999 456 78 90"},
+                    ],
+                },
+                "application/x-ndjson": {
+                    "schema": {"type": "string"},
+                    "example": (
+                        '{"email": "example@example.com", "message": "Hello"}\n'
+                        '{"phone": "+7 999 456 78 90"}\n'
+                    ),
+                },
+            }
+        }
+    },
+    "responses": {
+        200: {
+            "description": "Успешная обработка набора форм",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {"template_name": "Contact Form"},
+                        {"email": "email", "phone": "phone"},
+                    ],
+                },
+                "application/x-ndjson": {
+                    "example": (
+                        '{"template_name":"Contact Form"}\n'
+                        '{"email":"email","phone":"phone"}\n'
+                    ),
+                },
+            },
+        },
+        422: {"description": "Некорректные данные в наборе форм"},
+    },
+}
+
+#: Пример шаблона формы в ответах эндпоинтов `/templates`
+_template_example = {
+    "name": "Contact Form",
+    "fields": {"email": "email", "phone": "phone", "message": "text"},
+}
+
+#: Ответы эндпоинтов записи шаблонов
+_write_responses = {
+    405: {"description": "Хранилище не поддерживает запись шаблонов"},
+    422: {"description": "Некорректный шаблон"},
+}
+
+#: Метаданные для эндпоинта `GET /templates`
+list_templates_schema = {
+    "response_model": TemplateListResponse,
+    "summary": "Список шаблонов",
+    "description": "Возвращает все шаблоны каталога в порядке хранилища.",
+}
+
+#: Метаданные для эндпоинта `GET /templates/{name}`
+get_template_schema = {
+    "response_model": TemplateResponse,
+    "summary": "Получение шаблона",
+    "description": "Возвращает шаблон по имени.",
+    "responses": {
+        200: {"content": {"application/json": {"example": _template_example}}},
+        404: {"description": "Шаблон не найден"},
+    },
+}
+
+#: Метаданные для эндпоинта `PUT /templates/{name}`
+put_template_schema = {
+    "response_model": TemplateResponse,
+    "summary": "Добавление или замена шаблона",
+    "description": (
+        "Принимает словарь полей шаблона и их типов. "
+        "\nСуществующий шаблон с тем же именем заменяется и сохраняет свое место "
+        "в порядке подбора, новый добавляется в конец. "
+        "\nИндекс подбора обновляется без перезагрузки каталога."
+    ),
+    "openapi_extra": {
+        "requestBody": {
+            "content": {"application/json": {"example": _template_example["fields"]}}
+        }
+    },
+    "responses": _write_responses,
+}
+
+#: Метаданные для эндпоинта `DELETE /templates/{name}`
+delete_template_schema = {
+    "status_code": 204,
+    "summary": "Удаление шаблона",
+    "description": "Удаляет шаблон по имени.",
+    "responses": {404: {"description": "Шаблон не найден"}, **_write_responses},
+}
+
+#: Метаданные для эндпоинта `POST /templates/bulk`
+bulk_upsert_schema = {
+    "response_model": BulkUpsertResponse,
+    "summary": "Пакетное добавление или замена шаблонов",
+    "description": (
+        "Принимает JSON-массив шаблонов в формате хранилища "
+        "(`name` и поля с их типами) и записывает их атомарно: "
+        "если хотя бы один шаблон некорректен, не записывается ни один."
+    ),
+    "openapi_extra": {
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "example": [
+                        {"name": "Login Form", "username": "text", "password": "text"},
+                        {"name": "Newsletter Form", "email": "email"},
+                    ]
+                }
+            }
+        }
+    },
+    "responses": _write_responses,
+}
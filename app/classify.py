@@ -0,0 +1,305 @@
+"""
+Офлайн-классификация архивов форм.
+
+Читает формы потоком из CSV (первая строка — имена полей) или NDJSON/JSONL
+(один JSON-объект на строку), раздает пакеты форм пулу процессов и пишет
+результаты в NDJSON в порядке входных данных: по строке
+`{"template_name": ...}` или с типами полей на каждую форму, как в ответе
+`/get_form`. Некорректная форма дает строку `{"error": ...}`, обработка
+продолжается.
+
+Каталог загружается из настроенного хранилища (`STORAGE_TYPE`,
+`STORAGE_NAME`, ...) один раз в родительском процессе, после чего клиенты
+хранилища и пулы потоков закрываются: воркеры, запущенные через `fork`,
+наследуют только готовый индекс и к хранилищу не обращаются. Там, где
+`fork` недоступен, каждый воркер загружает каталог сам. В обработке
+одновременно находится не более `2 * workers` пакетов, поэтому память
+не зависит от размера входных данных.
+
+Запуск:
+    python -m app.classify forms.ndjson results.ndjson --workers 8
+    python -m app.classify forms.csv results.ndjson --match best
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.api.batch import parse_form, serialize_result
+from app.core.exceptions import InvalidFormError
+from app.models.form_template import FormData
+from app.services.form_service import FormService
+from app.services.matcher import MatchMode, TemplateIndex
+
+#: Форматы входных данных по расширению файла
+INPUT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+#: Запись входных данных: номер строки и форма (словарь для CSV, строка JSON для NDJSON)
+Record = Tuple[int, Any]
+
+#: Индекс шаблонов процесса-воркера
+_index: Optional[TemplateIndex] = None
+
+
+def load_index() -> TemplateIndex:
+    """
+    Загружает каталог из настроенного хранилища и закрывает соединения
+    с ним, чтобы процессы, порожденные после загрузки, не наследовали
+    клиенты баз данных и потоки.
+
+    :return: Индекс шаблонов.
+    """
+    return asyncio.run(_load_index(FormService()))
+
+
+async def _load_index(service: FormService) -> TemplateIndex:
+    try:
+        return await service.aget_index()
+    finally:
+        await service.aclose()
+
+
+def read_records(stream: IO[bytes], input_format: str) -> Iterator[Record]:
+    """
+    Читает записи входного потока.
+
+    Строки NDJSON не разбираются здесь, а передаются воркерам как есть.
+    Пустые строки пропускаются.
+
+    :param stream: Входной поток в бинарном режиме.
+    :param input_format: `"csv"` или `"ndjson"`.
+    :return: Итератор пар (номер строки, запись).
+    """
+    if input_format == "ndjson":
+        for position, line in enumerate(stream, start=1):
+            if line.strip():
+                yield position, line
+        return
+
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def chunked(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    """
+    Группирует записи в пакеты.
+
+    :param records: Записи.
+    :param size: Размер пакета.
+    :return: Итератор пакетов.
+    """
+    chunk: List[Record] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def classify_chunk(
+    chunk: List[Record], match: MatchMode = "first"
+) -> Tuple[str, int, int]:
+    """
+    Классифицирует пакет форм по каталогу процесса.
+
+    :param chunk: Пакет записей.
+    :param match: Режим подбора шаблона.
+    :return: Кортеж (строки NDJSON, количество найденных шаблонов, количество ошибок).
+    """
+    index = _index
+    lines = []
+    matched = errors = 0
+    for position, record in chunk:
+        try:
+            result = serialize_result(
+                FormService.match_template(
+                    FormData(data=_parse(record, position)), index, match
+                )
+            )
+        except (InvalidFormError, ValueError) as e:
+            result = {"error": _error_message(e, position)}
+            errors += 1
+        else:
+            matched += "template_name" in result
+        lines.append(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n", matched, errors
+
+
+def _parse(record: Any, position: int) -> Dict[str, str]:
+    if isinstance(record, dict):
+        # Короткие строки CSV дают None для недостающих столбцов.
+        return {name: value for name, value in record.items() if value is not None}
+    try:
+        item = json.loads(record)
+    except ValueError:
+        raise InvalidFormError(f"Item {position}: invalid JSON.")
+    return parse_form(item, position)
+
+
+def _error_message(error: Exception, position: int) -> str:
+    if isinstance(error, InvalidFormError):
+        return str(error)
+    return f"Item {position}: invalid form."
+
+
+def _init_worker() -> None:
+    global _index
+    if _index is None:
+        _index = load_index()
+
+
+class Progress:
+    """
+    Периодический отчет о ходе обработки в `stderr`.
+
+    Атрибуты:
+    - `forms`: Обработано форм.
+    - `matched`: Найдено шаблонов.
+    - `errors`: Некорректных форм.
+    """
+
+    def __init__(self, interval: float = 5.0, stream: Optional[IO[str]] = None):
+        """
+        :param interval: Интервал между отчетами в секундах (0 — только итог).
+        :param stream: Поток для отчетов (по умолчанию `stderr`).
+        """
+        self.interval = interval
+        self.stream = stream
+        self.forms = self.matched = self.errors = 0
+        self.started = self._reported = time.monotonic()
+
+    def update(self, forms: int, matched: int, errors: int) -> None:
+        """
+        Учитывает обработанный пакет и при необходимости печатает отчет.
+
+        :param forms: Форм в пакете.
+        :param matched: Найдено шаблонов.
+        :param errors: Некорректных форм.
+        """
+        self.forms += forms
+        self.matched += matched
+        self.errors += errors
+        now = time.monotonic()
+        if self.interval and now - self._reported >= self.interval:
+            self._reported = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        """
+        Печатает отчет.
+
+        :param final: Итоговый ли это отчет.
+        """
+        elapsed = time.monotonic() - self.started
+        rate = self.forms / elapsed if elapsed else 0.0
+        prefix = "Done:" if final else "Progress:"
+        print(
+            f"{prefix} {self.forms} forms, {self.matched} matched,"
+            f" {self.errors} errors, {elapsed:.1f}s, {rate:.0f} forms/s",
+            file=self.stream or sys.stderr,
+            flush=True,
+        )
+
+
+def classify(
+    records: Iterable[Record],
+    output: IO[str],
+    workers: int = 1,
+    chunk_size: int = 1000,
+    match: MatchMode = "first",
+    progress: Optional[Progress] = None,
+) -> Progress:
+    """
+    Классифицирует формы и пишет результаты в порядке входных данных.
+
+    :param records: Записи входных данных.
+    :param output: Выходной текстовый поток.
+    :param workers: Количество процессов (0 — обработка в текущем процессе).
+    :param chunk_size: Количество форм в пакете.
+    :param match: Режим подбора шаблона.
+    :param progress: Отчет о ходе обработки.
+    :return: Итоговая статистика.
+    """
+    progress = progress or Progress(interval=0)
+    chunks = chunked(records, chunk_size)
+    _init_worker()
+
+    def write(forms: int, result: Tuple[str, int, int]) -> None:
+        lines, matched, errors = result
+        output.write(lines)
+        progress.update(forms, matched, errors)
+
+    if not workers:
+        for chunk in chunks:
+            write(len(chunk), classify_chunk(chunk, match))
+        return progress
+
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    )
+    with context.Pool(workers, initializer=_init_worker) as pool:
+        pending: Deque[Tuple[int, Any]] = deque()
+        for chunk in chunks:
+            pending.append(
+                (len(chunk), pool.apply_async(classify_chunk, (chunk, match)))
+            )
+            if len(pending) >= 2 * workers:
+                size, result = pending.popleft()
+                write(size, result.get())
+        while pending:
+            size, result = pending.popleft()
+            write(size, result.get())
+    return progress
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline form classification")
+    parser.add_argument("input", help="Файл CSV или NDJSON/JSONL ('-' — stdin)")
+    parser.add_argument("output", help="Файл результатов NDJSON ('-' — stdout)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Формат входа")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--match", choices=["first", "best"], default="first")
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    input_format = args.format or INPUT_FORMATS.get(
+        os.path.splitext(args.input)[1].lower(), "ndjson"
+    )
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    target = (
+        sys.stdout
+        if args.output == "-"
+        else open(args.output, "w", encoding="utf-8", newline="\n")
+    )
+    try:
+        progress = classify(
+            read_records(source, input_format),
+            target,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            match=args.match,
+            progress=Progress(args.progress_interval),
+        )
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    progress.report(final=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+
+
+class ApiConfig(BaseStorageConfig):
+    """
+    Конфигурация HTTP API.
+
+    Загружает параметры из переменных окружения или использует значения по умолчанию:
+    - `FAST_PATH_ENABLED`: Обрабатывать ли `/get_form` без построения
+      pydantic-моделей. Значение по умолчанию — "false".
+    - `ADMIN_TOKEN`: Токен для эндпоинтов `/admin/*` и записи шаблонов
+      (`PUT`/`DELETE /templates/{name}`, `POST /templates/bulk`), передаваемый
+      в заголовке `X-Admin-Token`. Если не задан, эти эндпоинты отключены (404).
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации API.
+        """
+        self.params: Dict[str, Any] = {
+            "FAST_PATH": os.getenv("FAST_PATH_ENABLED", "false").lower()
+            in ("1", "true", "yes"),
+            "ADMIN_TOKEN": os.getenv("ADMIN_TOKEN", ""),
+        }
+
+    def validate(self) -> None:
+        """
+        Метод валидации конфигурации API.
+
+        Параметры приводятся к нужным типам при чтении, поэтому метод пуст.
+        """
+        pass
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации API.
+
+        :return: Словарь с параметрами `FAST_PATH`, `ADMIN_TOKEN`.
+        """
+        return self.params
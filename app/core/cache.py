@@ -0,0 +1,158 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+from app.core.exceptions import StorageConfigError
+
+
+class TemplateCacheConfig(BaseStorageConfig):
+    """
+    Конфигурация кеша шаблонов форм.
+
+    Загружает параметры кеша из переменных окружения или использует значения по умолчанию:
+    - `TEMPLATE_CACHE_ENABLED`: Включен ли кеш. Значение по умолчанию — "true".
+    - `TEMPLATE_CACHE_TTL`: Время жизни кеша в секундах (0 — без ограничения).
+      Значение по умолчанию — 300.
+    - `TEMPLATE_CACHE_CHECK_INTERVAL`: Как часто (в секундах) проверять версию
+      данных в хранилище. Значение по умолчанию — 1.
+    - `TEMPLATE_CACHE_RETRY_BACKOFF`: Пауза (в секундах) перед повторной
+      загрузкой каталога после ошибки; удваивается после каждой следующей
+      ошибки. Значение по умолчанию — 1.
+    - `TEMPLATE_CACHE_MAX_RETRY_BACKOFF`: Максимальная пауза перед повторной
+      загрузкой в секундах. Значение по умолчанию — 30.
+    - `STORAGE_THREAD_POOL_SIZE`: Размер пула потоков для вызовов синхронных
+      хранилищ из асинхронного кода. Значение по умолчанию — 4.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации кеша шаблонов.
+        """
+        self.params: Dict[str, Any] = {
+            "ENABLED": os.getenv("TEMPLATE_CACHE_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            "TTL": os.getenv("TEMPLATE_CACHE_TTL", "300"),
+            "CHECK_INTERVAL": os.getenv("TEMPLATE_CACHE_CHECK_INTERVAL", "1"),
+            "RETRY_BACKOFF": os.getenv("TEMPLATE_CACHE_RETRY_BACKOFF", "1"),
+            "MAX_RETRY_BACKOFF": os.getenv("TEMPLATE_CACHE_MAX_RETRY_BACKOFF", "30"),
+            "THREAD_POOL_SIZE": os.getenv("STORAGE_THREAD_POOL_SIZE", "4"),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что TTL, интервал проверки и паузы перед повторной
+        загрузкой — неотрицательные числа.
+
+        :raises StorageConfigError: Если значения некорректны.
+        """
+        for key in ("TTL", "CHECK_INTERVAL", "RETRY_BACKOFF", "MAX_RETRY_BACKOFF"):
+            try:
+                value = float(self.params[key])
+            except (TypeError, ValueError):
+                raise StorageConfigError(f"Invalid template cache {key}.")
+            if value < 0:
+                raise StorageConfigError(f"Invalid template cache {key}.")
+            self.params[key] = value
+
+        pool_size = str(self.params["THREAD_POOL_SIZE"])
+        if not pool_size.isdigit() or int(pool_size) < 1:
+            raise StorageConfigError("Invalid storage thread pool size.")
+        self.params["THREAD_POOL_SIZE"] = int(pool_size)
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации кеша шаблонов.
+
+        :return: Словарь с параметрами `ENABLED`, `TTL`, `CHECK_INTERVAL`,
+                 `RETRY_BACKOFF`, `MAX_RETRY_BACKOFF`, `THREAD_POOL_SIZE`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
+
+
+class DetectionCacheConfig(BaseStorageConfig):
+    """
+    Конфигурация кеша определения типов значений полей.
+
+    Загружает параметры кеша из переменных окружения или использует значения по умолчанию:
+    - `DETECTION_CACHE_SIZE`: Максимальное число запоминаемых значений
+      (0 — кеш отключен). Значение по умолчанию — 0.
+    - `DETECTION_CACHE_MAX_BYTES`: Максимальный суммарный размер запомненных
+      значений в байтах. Значение по умолчанию — 4 МиБ.
+    - `DETECTION_CACHE_MAX_VALUE_BYTES`: Значения большего размера не
+      запоминаются. Значение по умолчанию — 512.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации кеша определения типов.
+        """
+        self.params: Dict[str, Any] = {
+            "SIZE": os.getenv("DETECTION_CACHE_SIZE", "0"),
+            "MAX_BYTES": os.getenv("DETECTION_CACHE_MAX_BYTES", str(4 * 1024 * 1024)),
+            "MAX_VALUE_BYTES": os.getenv("DETECTION_CACHE_MAX_VALUE_BYTES", "512"),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что все параметры — неотрицательные целые числа.
+
+        :raises StorageConfigError: Если значения некорректны.
+        """
+        for key, value in self.params.items():
+            if not str(value).isdigit():
+                raise StorageConfigError(f"Invalid detection cache {key}.")
+            self.params[key] = int(value)
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации кеша определения типов.
+
+        :return: Словарь с параметрами `SIZE`, `MAX_BYTES`, `MAX_VALUE_BYTES`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
+
+
+class ResultCacheConfig(BaseStorageConfig):
+    """
+    Конфигурация кеша результатов подбора шаблонов.
+
+    Загружает параметры кеша из переменных окружения или использует значения по умолчанию:
+    - `RESULT_CACHE_SIZE`: Максимальное число запоминаемых наборов типизированных
+      полей (0 — кеш отключен). Значение по умолчанию — 10000.
+    - `RESULT_CACHE_MAX_BYTES`: Максимальный суммарный размер ключей в байтах.
+      Значение по умолчанию — 8 МиБ.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации кеша результатов.
+        """
+        self.params: Dict[str, Any] = {
+            "SIZE": os.getenv("RESULT_CACHE_SIZE", "10000"),
+            "MAX_BYTES": os.getenv("RESULT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что все параметры — неотрицательные целые числа.
+
+        :raises StorageConfigError: Если значения некорректны.
+        """
+        for key, value in self.params.items():
+            if not str(value).isdigit():
+                raise StorageConfigError(f"Invalid result cache {key}.")
+            self.params[key] = int(value)
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации кеша результатов.
+
+        :return: Словарь с параметрами `SIZE`, `MAX_BYTES`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
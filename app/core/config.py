@@ -3,7 +3,9 @@ from typing import Dict, Any
 
 from app.core.base import BaseStorageConfig
 from app.core.exceptions import StorageConfigError
+from app.core.indexed_file import IndexedFileConfig
 from app.core.mongodb import MongoDBConfig
+from app.core.snapshot import SnapshotConfig
 from app.core.tinydb import TinyDBConfig
 
 
@@ -17,7 +19,10 @@ class StorageConfigFactory:
 
     _config_classes = {
         "MongoDB": MongoDBConfig,
+        "AsyncMongoDB": MongoDBConfig,
         "TinyDB": TinyDBConfig,
+        "IndexedFile": IndexedFileConfig,
+        "Snapshot": SnapshotConfig,
     }
 
     @classmethod
@@ -25,7 +30,8 @@ class StorageConfigFactory:
         """
         Создает объект конфигурации для указанного типа хранилища.
 
-        :param storage_type: Тип хранилища (например, "MongoDB" или "TinyDB").
+        :param storage_type: Тип хранилища (например, "MongoDB", "AsyncMongoDB",
+                             "TinyDB", "IndexedFile" или "Snapshot").
         :return: Объект конфигурации хранилища.
         :raises StorageConfigError: Если передан неизвестный тип хранилища.
         """
@@ -47,7 +53,14 @@ def get_storage_config() -> Dict[str, Any]:
     return {"STORAGE_TYPE": storage_type, "STORAGE_PARAMS": config.get_params()}
 
 
-try:
-    CONFIG = get_storage_config()
-except StorageConfigError as e:
-    print(f"Storage configuration error: {e}")
+def __getattr__(name: str) -> Any:
+    """
+    Вычисляет `CONFIG` при первом обращении, а не при импорте модуля,
+    и сохраняет его в модуле для последующих обращений.
+
+    :raises StorageConfigError: Если конфигурация хранилища не валидна.
+    """
+    if name != "CONFIG":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    config = globals()["CONFIG"] = get_storage_config()
+    return config
@@ -2,3 +2,27 @@ class StorageConfigError(Exception):
     """Исключение для ошибок конфигурации хранилища."""
 
     pass
+
+
+class InvalidFormError(ValueError):
+    """Исключение для некорректных данных формы в пакетных запросах."""
+
+    pass
+
+
+class ReadOnlyStorageError(Exception):
+    """Исключение для операций записи в хранилище, не поддерживающее запись."""
+
+    pass
+
+
+class SnapshotError(Exception):
+    """Исключение для поврежденных или несовместимых снимков каталога."""
+
+    pass
+
+
+class StorageUnavailableError(Exception):
+    """Исключение для недоступного хранилища (ошибка соединения или таймаут)."""
+
+    pass
@@ -0,0 +1,49 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+from app.core.exceptions import StorageConfigError
+from app.models.field_types import OPTIONAL_FIELD_TYPES
+
+
+class FieldTypesConfig(BaseStorageConfig):
+    """
+    Конфигурация определяемых типов полей.
+
+    Загружает параметры из переменных окружения или использует значения по умолчанию:
+    - `FIELD_TYPES`: Поставляемые типы полей, определяемые в дополнение
+      к встроенным (`date`, `phone`, `email`, `text`), через запятую:
+      `uuid`, `url`, `inn`, `postcode`, `decimal`. Значение по умолчанию — "".
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации типов полей.
+        """
+        self.params: Dict[str, Any] = {
+            "TYPES": os.getenv("FIELD_TYPES", ""),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что все перечисленные типы поставляются сервисом.
+
+        :raises StorageConfigError: Если тип неизвестен.
+        """
+        types = self.params["TYPES"]
+        if isinstance(types, str):
+            types = [name.strip() for name in types.split(",") if name.strip()]
+        for name in types:
+            if name not in OPTIONAL_FIELD_TYPES:
+                raise StorageConfigError(f"Unknown field type: {name}.")
+        self.params["TYPES"] = list(dict.fromkeys(types))
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации типов полей.
+
+        :return: Словарь с параметром `TYPES` (список имен типов).
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
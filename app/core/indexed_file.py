@@ -0,0 +1,61 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+from app.core.exceptions import StorageConfigError
+
+
+class IndexedFileConfig(BaseStorageConfig):
+    """
+    Конфигурация файлового хранилища с индексом.
+
+    Загружает параметры хранилища из переменных окружения или использует значения по умолчанию:
+    - `STORAGE_NAME`: Путь к файлу журнала. Значение по умолчанию — "forms.db".
+    - `STORAGE_COMPACT_RATIO`: Доля устаревших записей в журнале, после которой
+      он переписывается. Значение по умолчанию — 0.5.
+    - `STORAGE_INDEX_CHECKPOINT`: Число записей, после которого индекс
+      сохраняется в файл. Значение по умолчанию — 100.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации файлового хранилища.
+        """
+        self.params: Dict[str, Any] = {
+            "NAME": os.getenv("STORAGE_NAME", "forms.db"),
+            "COMPACT_RATIO": os.getenv("STORAGE_COMPACT_RATIO", "0.5"),
+            "INDEX_CHECKPOINT": os.getenv("STORAGE_INDEX_CHECKPOINT", "100"),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что доля для компакции — число от 0 до 1,
+        а интервал сохранения индекса — положительное целое число.
+
+        :raises StorageConfigError: Если значение некорректно.
+        """
+        try:
+            ratio = float(self.params["COMPACT_RATIO"])
+        except (TypeError, ValueError):
+            raise StorageConfigError("Invalid storage compact ratio.")
+        if not 0 < ratio < 1:
+            raise StorageConfigError("Invalid storage compact ratio.")
+        self.params["COMPACT_RATIO"] = ratio
+        try:
+            checkpoint = int(self.params["INDEX_CHECKPOINT"])
+        except (TypeError, ValueError):
+            raise StorageConfigError("Invalid storage index checkpoint.")
+        if checkpoint < 1:
+            raise StorageConfigError("Invalid storage index checkpoint.")
+        self.params["INDEX_CHECKPOINT"] = checkpoint
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации файлового хранилища.
+
+        :return: Словарь с параметрами `NAME`, `COMPACT_RATIO`
+                 и `INDEX_CHECKPOINT`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
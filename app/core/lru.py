@@ -0,0 +1,113 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Потокобезопасный ограниченный LRU-кеш.
+
+    Размер кеша ограничен количеством записей и суммарным размером ключей
+    в байтах. Записи с ключом больше `max_item_bytes` не кешируются, чтобы
+    длинные значения не вытесняли полезные короткие.
+
+    Атрибуты:
+    - `max_entries`: Максимальное количество записей.
+    - `max_bytes`: Максимальный суммарный размер ключей в байтах (0 — без ограничения).
+    - `max_item_bytes`: Максимальный размер одного ключа в байтах (0 — без ограничения).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, max_item_bytes: int = 0):
+        """
+        Инициализация кеша.
+
+        :param max_entries: Максимальное количество записей.
+        :param max_bytes: Ограничение суммарного размера ключей в байтах.
+        :param max_item_bytes: Ограничение размера одного ключа в байтах.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._data: "OrderedDict[K, tuple[V, int]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Возвращает значение по ключу и отмечает запись как недавно использованную.
+
+        :param key: Ключ.
+        :param default: Значение, возвращаемое при отсутствии ключа.
+        :return: Значение из кеша или `default`.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return item[0]
+
+    def put(self, key: K, value: V, size: Optional[int] = None) -> bool:
+        """
+        Сохраняет значение, вытесняя давно не использованные записи.
+
+        :param key: Ключ.
+        :param value: Значение.
+        :param size: Размер записи в байтах; по умолчанию — размер ключа.
+        :return: `True`, если значение сохранено.
+        """
+        if size is None:
+            size = sys.getsizeof(key)
+        if self.max_item_bytes and size > self.max_item_bytes:
+            return False
+        if self.max_bytes and size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+        return True
+
+    def clear(self) -> None:
+        """
+        Удаляет все записи. Статистика обращений сохраняется.
+        """
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кеша.
+
+        :return: Словарь с ключами `hits`, `misses`, `hit_rate`, `entries`, `bytes`.
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,43 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+from app.core.exceptions import StorageConfigError
+from app.services.engines import MATCH_ENGINES
+
+
+class MatchingConfig(BaseStorageConfig):
+    """
+    Конфигурация подбора шаблонов.
+
+    Загружает параметры из переменных окружения или использует значения по умолчанию:
+    - `MATCH_ENGINE`: Движок подбора шаблонов: `index` (инвертированный индекс)
+      или `bitset` (битовые множества NumPy). Значение по умолчанию — "index".
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации подбора шаблонов.
+        """
+        self.params: Dict[str, Any] = {
+            "ENGINE": os.getenv("MATCH_ENGINE", "index"),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет, что выбранный движок зарегистрирован.
+
+        :raises StorageConfigError: Если движок неизвестен.
+        """
+        if self.params["ENGINE"] not in MATCH_ENGINES:
+            raise StorageConfigError(f"Unknown match engine: {self.params['ENGINE']}.")
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации подбора шаблонов.
+
+        :return: Словарь с параметром `ENGINE`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
@@ -0,0 +1,39 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+
+
+class MetricsConfig(BaseStorageConfig):
+    """
+    Конфигурация метрик сервиса.
+
+    Загружает параметры из переменных окружения или использует значения по умолчанию:
+    - `METRICS_ENABLED`: Собирать ли метрики и отдавать их на `/metrics`.
+      Значение по умолчанию — "false".
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации метрик.
+        """
+        self.params: Dict[str, Any] = {
+            "ENABLED": os.getenv("METRICS_ENABLED", "false").lower()
+            in ("1", "true", "yes"),
+        }
+
+    def validate(self) -> None:
+        """
+        Метод валидации конфигурации метрик.
+
+        Параметры приводятся к нужным типам при чтении, поэтому метод пуст.
+        """
+        pass
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации метрик.
+
+        :return: Словарь с параметром `ENABLED`.
+        """
+        return self.params
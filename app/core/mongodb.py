@@ -4,6 +4,26 @@ from typing import Dict, Any
 from app.core.base import BaseStorageConfig
 from app.core.exceptions import StorageConfigError
 
+#: Допустимые значения `STORAGE_READ_PREFERENCE`
+READ_PREFERENCES = (
+    "primary",
+    "primaryPreferred",
+    "secondary",
+    "secondaryPreferred",
+    "nearest",
+)
+
+#: Целочисленные параметры клиента и их минимальные значения
+INT_PARAMS = {
+    "MAX_POOL_SIZE": 1,
+    "MIN_POOL_SIZE": 0,
+    "SERVER_SELECTION_TIMEOUT_MS": 1,
+    "CONNECT_TIMEOUT_MS": 1,
+    "SOCKET_TIMEOUT_MS": 0,
+    "WAIT_QUEUE_TIMEOUT_MS": 1,
+    "BREAKER_THRESHOLD": 1,
+}
+
 
 class MongoDBConfig(BaseStorageConfig):
     """
@@ -13,6 +33,25 @@ class MongoDBConfig(BaseStorageConfig):
     - `STORAGE_HOST`: Хост MongoDB.
     - `STORAGE_NAME`: Имя базы данных.
     - `STORAGE_COLLECTION`: Название коллекции.
+
+    Параметры клиента (значения по умолчанию рассчитаны на то, чтобы
+    недоступная база данных проявлялась быстрой ошибкой, а не зависанием):
+    - `STORAGE_MAX_POOL_SIZE`: Максимальный размер пула соединений. По умолчанию — 100.
+    - `STORAGE_MIN_POOL_SIZE`: Минимальный размер пула соединений. По умолчанию — 0.
+    - `STORAGE_SERVER_SELECTION_TIMEOUT_MS`: Время ожидания доступного сервера.
+      По умолчанию — 2000.
+    - `STORAGE_CONNECT_TIMEOUT_MS`: Таймаут установки соединения. По умолчанию — 2000.
+    - `STORAGE_SOCKET_TIMEOUT_MS`: Таймаут чтения ответа (0 — без ограничения).
+      По умолчанию — 5000.
+    - `STORAGE_WAIT_QUEUE_TIMEOUT_MS`: Время ожидания свободного соединения
+      в пуле. По умолчанию — 1000.
+    - `STORAGE_READ_PREFERENCE`: Предпочтение чтения (`primary`,
+      `primaryPreferred`, `secondary`, `secondaryPreferred`, `nearest`).
+      По умолчанию — "primary".
+    - `STORAGE_BREAKER_THRESHOLD`: Количество ошибок соединения подряд, после
+      которого обращения к MongoDB приостанавливаются. По умолчанию — 5.
+    - `STORAGE_BREAKER_RESET_TIMEOUT`: Время в секундах до повторной попытки
+      после приостановки. По умолчанию — 30.
     """
 
     def __init__(self):
@@ -23,22 +62,55 @@ class MongoDBConfig(BaseStorageConfig):
             "HOST": os.getenv("STORAGE_HOST"),
             "NAME": os.getenv("STORAGE_NAME"),
             "COLLECTION": os.getenv("STORAGE_COLLECTION"),
+            "MAX_POOL_SIZE": os.getenv("STORAGE_MAX_POOL_SIZE", "100"),
+            "MIN_POOL_SIZE": os.getenv("STORAGE_MIN_POOL_SIZE", "0"),
+            "SERVER_SELECTION_TIMEOUT_MS": os.getenv(
+                "STORAGE_SERVER_SELECTION_TIMEOUT_MS", "2000"
+            ),
+            "CONNECT_TIMEOUT_MS": os.getenv("STORAGE_CONNECT_TIMEOUT_MS", "2000"),
+            "SOCKET_TIMEOUT_MS": os.getenv("STORAGE_SOCKET_TIMEOUT_MS", "5000"),
+            "WAIT_QUEUE_TIMEOUT_MS": os.getenv("STORAGE_WAIT_QUEUE_TIMEOUT_MS", "1000"),
+            "READ_PREFERENCE": os.getenv("STORAGE_READ_PREFERENCE", "primary"),
+            "BREAKER_THRESHOLD": os.getenv("STORAGE_BREAKER_THRESHOLD", "5"),
+            "BREAKER_RESET_TIMEOUT": os.getenv("STORAGE_BREAKER_RESET_TIMEOUT", "30"),
         }
 
     def validate(self) -> None:
         """
-        Проверяет, что все параметры конфигурации заполнены.
+        Проверяет, что адрес, база данных и коллекция заданы, а параметры
+        клиента корректны.
 
-        :raises StorageConfigError: Если один или несколько параметров отсутствуют.
+        :raises StorageConfigError: Если один или несколько параметров
+                                    отсутствуют или некорректны.
         """
-        if not all(self.params.values()):
+        if not all(self.params[key] for key in ("HOST", "NAME", "COLLECTION")):
             raise StorageConfigError("Incomplete MongoDB configuration.")
 
+        for key, minimum in INT_PARAMS.items():
+            value = str(self.params[key])
+            if not value.isdigit() or int(value) < minimum:
+                raise StorageConfigError(f"Invalid MongoDB {key}.")
+            self.params[key] = int(value)
+        if self.params["MIN_POOL_SIZE"] > self.params["MAX_POOL_SIZE"]:
+            raise StorageConfigError("Invalid MongoDB MIN_POOL_SIZE.")
+
+        if self.params["READ_PREFERENCE"] not in READ_PREFERENCES:
+            raise StorageConfigError("Invalid MongoDB READ_PREFERENCE.")
+
+        try:
+            reset_timeout = float(self.params["BREAKER_RESET_TIMEOUT"])
+        except (TypeError, ValueError):
+            raise StorageConfigError("Invalid MongoDB BREAKER_RESET_TIMEOUT.")
+        if reset_timeout <= 0:
+            raise StorageConfigError("Invalid MongoDB BREAKER_RESET_TIMEOUT.")
+        self.params["BREAKER_RESET_TIMEOUT"] = reset_timeout
+
     def get_params(self) -> Dict[str, Any]:
         """
         Возвращает параметры конфигурации MongoDB.
 
-        :return: Словарь с параметрами `HOST`, `NAME`, `COLLECTION`.
+        :return: Словарь с параметрами `HOST`, `NAME`, `COLLECTION` и параметрами
+                 клиента (`MAX_POOL_SIZE`, ..., `BREAKER_RESET_TIMEOUT`).
         :raises StorageConfigError: Если параметры конфигурации не валидны.
         """
         self.validate()
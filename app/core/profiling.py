@@ -0,0 +1,71 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+from app.core.exceptions import StorageConfigError
+
+
+class ProfilingConfig(BaseStorageConfig):
+    """
+    Конфигурация профилирования запросов.
+
+    Загружает параметры из переменных окружения или использует значения по умолчанию:
+    - `PROFILING_ENABLED`: Включено ли профилирование при запуске
+      (его можно переключить через `/admin/profiling`). По умолчанию — "false".
+    - `PROFILING_SAMPLE_RATE`: Доля запросов, профилируемых случайно.
+      Значение по умолчанию — 0.01.
+    - `PROFILING_SLOW_MS`: Запросы дольше этого порога (в миллисекундах)
+      сохраняются всегда; 0 — не отбирать по длительности. По умолчанию — 250.
+    - `PROFILING_INTERVAL_MS`: Интервал снятия стеков в миллисекундах.
+      Значение по умолчанию — 5.
+    - `PROFILING_DIR`: Каталог для файлов профилей. По умолчанию — "profiles".
+    - `PROFILING_MAX_FILES`: Сколько последних профилей хранить.
+      Значение по умолчанию — 100.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации профилирования.
+        """
+        self.params: Dict[str, Any] = {
+            "ENABLED": os.getenv("PROFILING_ENABLED", "false").lower()
+            in ("1", "true", "yes"),
+            "SAMPLE_RATE": os.getenv("PROFILING_SAMPLE_RATE", "0.01"),
+            "SLOW_MS": os.getenv("PROFILING_SLOW_MS", "250"),
+            "INTERVAL_MS": os.getenv("PROFILING_INTERVAL_MS", "5"),
+            "DIR": os.getenv("PROFILING_DIR", "profiles"),
+            "MAX_FILES": os.getenv("PROFILING_MAX_FILES", "100"),
+        }
+
+    def validate(self) -> None:
+        """
+        Проверяет числовые параметры профилирования.
+
+        :raises StorageConfigError: Если значения некорректны.
+        """
+        for key in ("SAMPLE_RATE", "SLOW_MS", "INTERVAL_MS"):
+            try:
+                value = float(self.params[key])
+            except (TypeError, ValueError):
+                raise StorageConfigError(f"Invalid profiling {key}.")
+            if value < 0:
+                raise StorageConfigError(f"Invalid profiling {key}.")
+            self.params[key] = value
+        if self.params["SAMPLE_RATE"] > 1 or not self.params["INTERVAL_MS"]:
+            raise StorageConfigError("Invalid profiling SAMPLE_RATE or INTERVAL_MS.")
+
+        max_files = str(self.params["MAX_FILES"])
+        if not max_files.isdigit() or int(max_files) < 1:
+            raise StorageConfigError("Invalid profiling MAX_FILES.")
+        self.params["MAX_FILES"] = int(max_files)
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации профилирования.
+
+        :return: Словарь с параметрами `ENABLED`, `SAMPLE_RATE`, `SLOW_MS`,
+                 `INTERVAL_MS`, `DIR`, `MAX_FILES`.
+        :raises StorageConfigError: Если параметры конфигурации не валидны.
+        """
+        self.validate()
+        return self.params
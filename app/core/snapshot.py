@@ -0,0 +1,37 @@
+import os
+from typing import Dict, Any
+
+from app.core.base import BaseStorageConfig
+
+
+class SnapshotConfig(BaseStorageConfig):
+    """
+    Конфигурация хранилища-снимка каталога.
+
+    Загружает параметры хранилища из переменных окружения или использует значения по умолчанию:
+    - `STORAGE_NAME`: Путь к файлу снимка. Значение по умолчанию — "forms.snapshot".
+    """
+
+    def __init__(self):
+        """
+        Инициализирует параметры конфигурации снимка.
+        """
+        self.params: Dict[str, Any] = {
+            "NAME": os.getenv("STORAGE_NAME", "forms.snapshot"),
+        }
+
+    def validate(self) -> None:
+        """
+        Метод валидации конфигурации снимка.
+
+        Путь к файлу проверяется при открытии снимка, поэтому метод пуст.
+        """
+        pass
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конфигурации снимка.
+
+        :return: Словарь с параметром `NAME`.
+        """
+        return self.params
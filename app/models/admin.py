@@ -0,0 +1,19 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingSettings(BaseModel):
+    """
+    Настройки профилирования запросов.
+
+    Поля (в запросе на изменение `null` оставляет значение без изменений):
+    - `enabled`: Включено ли профилирование.
+    - `sample_rate`: Доля запросов, профилируемых случайно.
+    - `slow_ms`: Порог длительности запроса в миллисекундах (0 — не отбирать
+      по длительности).
+    """
+
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+    slow_ms: Optional[float] = Field(None, ge=0)
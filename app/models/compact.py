@@ -0,0 +1,176 @@
+import sys
+from array import array
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from app.models.field_types import TYPE_BITS
+from app.models.field_validator import FieldType, field_types
+from app.models.form_template import FormTemplate
+
+#: Коды типов полей в компактном представлении (из реестра типов)
+TYPE_CODES: Dict[FieldType, int] = field_types.codes
+
+#: Типы полей по их кодам
+TYPE_NAMES: List[Optional[FieldType]] = field_types.names
+
+
+def pack(field_id: int, type_code: int) -> int:
+    """
+    Упаковывает пару (идентификатор поля, код типа) в одно целое число.
+
+    :param field_id: Идентификатор поля в словаре.
+    :param type_code: Код типа поля.
+    :return: Упакованная пара.
+    """
+    return field_id << TYPE_BITS | type_code
+
+
+def unpack(key: int) -> Tuple[int, int]:
+    """
+    Распаковывает пару (идентификатор поля, код типа).
+
+    :param key: Упакованная пара.
+    :return: Кортеж `(field_id, type_code)`.
+    """
+    return key >> TYPE_BITS, key & ((1 << TYPE_BITS) - 1)
+
+
+class FieldVocabulary:
+    """
+    Словарь имен полей: каждому имени сопоставляется целочисленный идентификатор.
+
+    Имена хранятся один раз на весь каталог, а не в каждом шаблоне.
+    """
+
+    __slots__ = ("_ids", "_names")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, name: str) -> int:
+        """
+        Возвращает идентификатор имени поля, добавляя его при необходимости.
+
+        :param name: Имя поля.
+        :return: Идентификатор поля.
+        """
+        field_id = self._ids.get(name)
+        if field_id is None:
+            field_id = self._ids[sys.intern(name)] = len(self._names)
+            self._names.append(name)
+        return field_id
+
+    def get(self, name: str) -> Optional[int]:
+        """
+        Возвращает идентификатор имени поля, не добавляя его.
+
+        :param name: Имя поля.
+        :return: Идентификатор или `None`, если имя не встречается в каталоге.
+        """
+        return self._ids.get(name)
+
+    def name(self, field_id: int) -> str:
+        """
+        Возвращает имя поля по идентификатору.
+
+        :param field_id: Идентификатор поля.
+        :return: Имя поля.
+        """
+        return self._names[field_id]
+
+    def key(self, name: str, field_type: FieldType) -> Optional[int]:
+        """
+        Возвращает упакованную пару для поля формы.
+
+        :param name: Имя поля.
+        :param field_type: Тип поля.
+        :return: Упакованная пара или `None`, если такой пары нет в каталоге.
+        """
+        field_id = self._ids.get(name)
+        if field_id is None:
+            return None
+        return pack(field_id, TYPE_CODES[field_type])
+
+
+class CompactTemplate:
+    """
+    Компактное неизменяемое представление шаблона формы.
+
+    Поля шаблона хранятся как отсортированный массив упакованных пар
+    (идентификатор поля, код типа). Объект `FormTemplate` создается
+    только при выдаче результата наружу.
+
+    Атрибуты:
+    - `name`: Имя шаблона формы.
+    - `fields`: Массив упакованных пар (поле, тип).
+    """
+
+    __slots__ = ("name", "fields")
+
+    def __init__(self, name: str, fields: array):
+        self.name = name
+        self.fields = fields
+
+    def __setattr__(self, key, value):
+        if hasattr(self, key):
+            raise AttributeError("CompactTemplate is immutable")
+        super().__setattr__(key, value)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    @classmethod
+    def from_fields(
+        cls, name: str, fields: Mapping[str, FieldType], vocabulary: FieldVocabulary
+    ) -> "CompactTemplate":
+        """
+        Создает компактный шаблон, добавляя имена полей в словарь.
+
+        :param name: Имя шаблона.
+        :param fields: Словарь поле -> тип.
+        :param vocabulary: Словарь имен полей каталога.
+        :return: Объект `CompactTemplate`.
+        """
+        keys = sorted(
+            pack(vocabulary.intern(field), TYPE_CODES[field_type])
+            for field, field_type in fields.items()
+        )
+        return cls(sys.intern(name), array("L", keys))
+
+    @classmethod
+    def from_template(
+        cls, template: FormTemplate, vocabulary: FieldVocabulary
+    ) -> "CompactTemplate":
+        """
+        Создает компактный шаблон из `FormTemplate`.
+
+        :param template: Шаблон формы.
+        :param vocabulary: Словарь имен полей каталога.
+        :return: Объект `CompactTemplate`.
+        """
+        return cls.from_fields(template.name, template.fields, vocabulary)
+
+    def items(self, vocabulary: FieldVocabulary) -> Iterator[Tuple[str, FieldType]]:
+        """
+        Возвращает пары (имя поля, тип поля).
+
+        :param vocabulary: Словарь имен полей каталога.
+        :return: Итератор пар.
+        """
+        for key in self.fields:
+            field_id, type_code = unpack(key)
+            yield vocabulary.name(field_id), TYPE_NAMES[type_code]
+
+    def to_template(self, vocabulary: FieldVocabulary) -> FormTemplate:
+        """
+        Преобразует компактный шаблон в `FormTemplate` без повторной валидации.
+
+        :param vocabulary: Словарь имен полей каталога.
+        :return: Объект `FormTemplate`.
+        """
+        return FormTemplate.model_construct(
+            name=self.name, fields=dict(self.items(vocabulary))
+        )
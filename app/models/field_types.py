@@ -0,0 +1,314 @@
+"""
+Реестр типов полей.
+
+Тип поля объявляется именем, регулярным выражением, приоритетом
+и необязательной дополнительной проверкой (`check`). Значение относится
+к типу, если выражение совпадает со всем значением и проверка (если есть)
+ее подтверждает. Из нескольких подходящих типов выбирается тип с большим
+приоритетом, при равных приоритетах — объявленный раньше. Значение, не
+подошедшее ни под один тип, относится к типу `fallback` ("text").
+
+Каждому типу назначается код для компактного представления шаблонов
+(`app.models.compact`). Коды встроенных и поставляемых типов фиксированы,
+поэтому снимки каталога, собранные разными процессами, совместимы.
+"""
+
+import calendar
+import re
+from re import _parser
+from typing import Callable, Dict, Iterable, List, Optional
+
+#: Количество бит, занимаемых кодом типа в упакованной паре (поле, тип)
+TYPE_BITS = 4
+
+#: Дополнительная проверка значения, совпавшего с выражением типа
+Check = Callable[[str], bool]
+
+
+class FieldTypeSpec:
+    """
+    Объявление типа поля.
+
+    Атрибуты:
+    - `name`: Имя типа.
+    - `pattern`: Регулярное выражение для всего значения или `None`,
+                 если тип не определяется по значению (например, "text").
+    - `priority`: Приоритет при совпадении нескольких типов.
+    - `check`: Дополнительная проверка значения, совпавшего с выражением.
+    - `code`: Код типа в компактном представлении шаблонов.
+    """
+
+    __slots__ = ("name", "pattern", "priority", "check", "code")
+
+    def __init__(
+        self,
+        name: str,
+        pattern: Optional[str] = None,
+        priority: int = 0,
+        check: Optional[Check] = None,
+        code: Optional[int] = None,
+    ):
+        self.name = name
+        self.pattern = pattern
+        self.priority = priority
+        self.check = check
+        self.code = code
+
+
+class FieldTypeRegistry:
+    """
+    Реестр объявленных типов полей.
+
+    Атрибуты:
+    - `fallback`: Тип значений, не подошедших ни под один тип.
+    - `codes`: Словарь имя типа -> код.
+    - `names`: Имена типов по кодам (`None` для свободных кодов).
+    - `version`: Номер изменения реестра; увеличивается при каждой регистрации.
+    """
+
+    def __init__(self, fallback: str = "text"):
+        """
+        :param fallback: Тип значений, не подошедших ни под один тип.
+        """
+        self.fallback = fallback
+        self.codes: Dict[str, int] = {}
+        self.names: List[Optional[str]] = [None] * (1 << TYPE_BITS)
+        self.version = 0
+        self._specs: List[FieldTypeSpec] = []
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.codes
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def register(
+        self,
+        name: str,
+        pattern: Optional[str] = None,
+        priority: int = 0,
+        check: Optional[Check] = None,
+        code: Optional[int] = None,
+    ) -> FieldTypeSpec:
+        """
+        Объявляет тип поля.
+
+        Выражение не должно содержать именованных групп, обратных ссылок
+        и глобальных флагов (`(?i)` и т.п.): оно объединяется с выражениями
+        других типов в одно.
+
+        :param name: Имя типа (идентификатор Python).
+        :param pattern: Регулярное выражение для всего значения.
+        :param priority: Приоритет при совпадении нескольких типов.
+        :param check: Дополнительная проверка значения.
+        :param code: Код типа (по умолчанию — первый свободный).
+        :return: Объявление типа.
+        :raises ValueError: Если тип уже объявлен, имя или выражение
+                            некорректны или свободных кодов не осталось.
+        """
+        return self.add(FieldTypeSpec(name, pattern, priority, check, code))
+
+    def add(self, spec: FieldTypeSpec) -> FieldTypeSpec:
+        """
+        Добавляет готовое объявление типа (см. `register`).
+
+        Реестр изменяется только после того, как объединенное выражение
+        всех типов с новым типом успешно скомпилировано.
+
+        :param spec: Объявление типа.
+        :return: То же объявление с назначенным кодом.
+        :raises ValueError: Если объявление некорректно.
+        """
+        if spec.name in self.codes:
+            raise ValueError(f"Field type '{spec.name}' is already registered.")
+        if not spec.name.isidentifier():
+            raise ValueError(f"Invalid field type name: {spec.name!r}.")
+        if spec.pattern is not None:
+            try:
+                compiled = re.compile(spec.pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern for field type '{spec.name}': {e}")
+            if compiled.groupindex:
+                raise ValueError(
+                    f"Pattern for field type '{spec.name}' must not use named groups."
+                )
+            if _has_backreference(_parser.parse(spec.pattern)):
+                raise ValueError(
+                    f"Pattern for field type '{spec.name}' must not use backreferences."
+                )
+            try:
+                re.compile(combine_patterns(self.detectable() + [spec]))
+            except re.error as e:
+                raise ValueError(
+                    f"Pattern for field type '{spec.name}' cannot be combined "
+                    f"with other types: {e}"
+                )
+
+        code = spec.code
+        if code is None:
+            code = next((c for c, n in enumerate(self.names) if n is None), None)
+            if code is None:
+                raise ValueError(f"No free code for field type '{spec.name}'.")
+        elif not 0 <= code < len(self.names) or self.names[code] is not None:
+            raise ValueError(f"Code {code} of field type '{spec.name}' is taken.")
+
+        spec.code = code
+        self.codes[spec.name] = code
+        self.names[code] = spec.name
+        self._specs.append(spec)
+        self.version += 1
+        return spec
+
+    def copy(self) -> "FieldTypeRegistry":
+        """
+        Возвращает независимую копию реестра.
+
+        :return: Реестр с теми же объявлениями и версией.
+        """
+        registry = FieldTypeRegistry(self.fallback)
+        for spec in self._specs:
+            registry.add(_copy(spec))
+        registry.version = self.version
+        return registry
+
+    def detectable(self) -> List[FieldTypeSpec]:
+        """
+        Возвращает типы, определяемые по значению, в порядке проверки:
+        по убыванию приоритета, при равных приоритетах — в порядке объявления.
+
+        :return: Список объявлений типов.
+        """
+        specs = [spec for spec in self._specs if spec.pattern is not None]
+        return sorted(specs, key=lambda spec: -spec.priority)
+
+
+def combine_patterns(specs: List[FieldTypeSpec]) -> str:
+    """
+    Объединяет выражения типов в одно выражение с именованной группой
+    на каждый тип (в порядке списка).
+
+    :param specs: Объявления типов с выражениями.
+    :return: Объединенное выражение.
+    """
+    return "|".join(f"(?P<{spec.name}>{spec.pattern})" for spec in specs)
+
+
+def _has_backreference(pattern: _parser.SubPattern) -> bool:
+    """
+    Проверяет, есть ли в разобранном выражении обратные ссылки
+    (`\\1`, `(?(1)...)`): в объединенном выражении номера групп сдвигаются.
+    """
+    for op, av in pattern:
+        if op in (_parser.GROUPREF, _parser.GROUPREF_EXISTS):
+            return True
+        for item in av if isinstance(av, (tuple, list)) else (av,):
+            if isinstance(item, _parser.SubPattern) and _has_backreference(item):
+                return True
+            if isinstance(item, list) and any(
+                _has_backreference(branch)
+                for branch in item
+                if isinstance(branch, _parser.SubPattern)
+            ):
+                return True
+    return False
+
+
+def is_valid_date(value: str) -> bool:
+    """
+    Проверяет, что день не выходит за пределы месяца, а год — положительный.
+
+    Значение уже совпало с выражением даты (`ДД.ММ.ГГГГ` или `ГГГГ-ММ-ДД`).
+    """
+    if "-" in value:
+        year, month, day = value.split("-")
+    else:
+        day, month, year = value.split(".")
+    year = int(year)
+    return year >= 1 and int(day) <= calendar.monthrange(year, int(month))[1]
+
+
+def is_valid_inn(value: str) -> bool:
+    """
+    Проверяет контрольные цифры ИНН (10 цифр — организация, 12 — физическое лицо).
+    """
+    digits = [int(c) for c in value]
+
+    def control(weights: Iterable[int]) -> int:
+        return sum(w * d for w, d in zip(weights, digits)) % 11 % 10
+
+    if len(digits) == 10:
+        return control((2, 4, 10, 3, 5, 9, 4, 6, 8)) == digits[9]
+    return (
+        control((7, 2, 4, 10, 3, 5, 9, 4, 6, 8)) == digits[10]
+        and control((3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)) == digits[11]
+    )
+
+
+# Те же выражения, что `datetime.strptime` строит для форматов "%d.%m.%Y"
+# и "%Y-%m-%d"; "$" в выражениях телефона и почты допускал завершающий
+# перевод строки, поэтому он разрешен явно.
+_DAY = r"(?:3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])"
+_MONTH = r"(?:1[0-2]|0[1-9]|[1-9])"
+
+#: Встроенные типы в порядке приоритета
+BUILTIN_FIELD_TYPES = (
+    FieldTypeSpec(
+        "date",
+        rf"{_DAY}\.{_MONTH}\.\d{{4}}|\d{{4}}-{_MONTH}-{_DAY}",
+        priority=300,
+        check=is_valid_date,
+        code=0,
+    ),
+    FieldTypeSpec(
+        "phone", r"\+?[1-9]\d{0,2} \d{3} \d{3} \d{2} \d{2}\n?", priority=200, code=1
+    ),
+    FieldTypeSpec(
+        "email",
+        r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\n?",
+        priority=100,
+        code=2,
+    ),
+    FieldTypeSpec("text", code=3),
+)
+
+#: Поставляемые типы, включаемые переменной окружения `FIELD_TYPES`
+OPTIONAL_FIELD_TYPES: Dict[str, FieldTypeSpec] = {
+    spec.name: spec
+    for spec in (
+        FieldTypeSpec(
+            "uuid",
+            r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}"
+            r"-[0-9a-fA-F]{12}",
+            priority=60,
+            code=4,
+        ),
+        FieldTypeSpec("url", r"https?://[^\s/?#]+(?:[/?#]\S*)?", priority=50, code=5),
+        FieldTypeSpec(
+            "inn", r"[0-9]{10}|[0-9]{12}", priority=40, check=is_valid_inn, code=6
+        ),
+        FieldTypeSpec("postcode", r"[1-9][0-9]{5}", priority=30, code=7),
+        FieldTypeSpec(
+            "decimal", r"[+-]?(?:[0-9]+(?:[.,][0-9]+)?|[.,][0-9]+)", priority=20, code=8
+        ),
+    )
+}
+
+
+def default_registry(optional: Iterable[str] = ()) -> FieldTypeRegistry:
+    """
+    Создает реестр со встроенными типами и выбранными поставляемыми типами.
+
+    :param optional: Имена типов из `OPTIONAL_FIELD_TYPES`.
+    :return: Реестр типов.
+    :raises KeyError: Если поставляемого типа с таким именем нет.
+    """
+    registry = FieldTypeRegistry(fallback="text")
+    for spec in BUILTIN_FIELD_TYPES:
+        registry.add(_copy(spec))
+    for name in optional:
+        registry.add(_copy(OPTIONAL_FIELD_TYPES[name]))
+    return registry
+
+
+def _copy(spec: FieldTypeSpec) -> FieldTypeSpec:
+    return FieldTypeSpec(spec.name, spec.pattern, spec.priority, spec.check, spec.code)
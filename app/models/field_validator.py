@@ -1,8 +1,67 @@
 import re
+import threading
 from datetime import datetime
-from typing import Type, Literal, TypedDict
+from typing import (
+    Annotated,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypedDict,
+)
 
-FieldType = Literal["date", "phone", "email", "text"]
+from pydantic import AfterValidator, GetJsonSchemaHandler
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import CoreSchema
+
+from app.core.cache import DetectionCacheConfig
+from app.core.field_types import FieldTypesConfig
+from app.core.lru import LRUCache
+from app.models.field_types import (
+    Check,
+    FieldTypeRegistry,
+    FieldTypeSpec,
+    combine_patterns,
+    default_registry,
+)
+
+#: Поиск совпадения выражения со всем значением
+Matcher = Callable[[str], Optional[re.Match]]
+
+
+def check_field_type(name: str) -> str:
+    """
+    Проверяет, что тип поля объявлен в реестре сервиса.
+
+    :param name: Имя типа.
+    :return: То же имя.
+    :raises ValueError: Если тип не объявлен.
+    """
+    if name not in field_types:
+        raise ValueError(f"Unknown field type: {name}.")
+    return name
+
+
+class FieldTypeNames:
+    """
+    Схема JSON типа поля: перечисление (`enum`) имен типов реестра.
+
+    Имена берутся из реестра при построении схемы, поэтому схема OpenAPI
+    включает и типы, объявленные `register_field_type` при запуске.
+    """
+
+    def __get_pydantic_json_schema__(
+        self, core_schema: CoreSchema, handler: GetJsonSchemaHandler
+    ) -> JsonSchemaValue:
+        schema = handler(core_schema)
+        schema["enum"] = list(field_types.codes)
+        return schema
+
+
+#: Тип поля: имя типа, объявленного в реестре `field_types`
+FieldType = Annotated[str, AfterValidator(check_field_type), FieldTypeNames()]
 
 
 class ValidatorMap(TypedDict):
@@ -28,14 +87,9 @@ class FieldValidator:
     @classmethod
     def get_validators(cls) -> ValidatorMap:
         """
-        Возвращает словарь доступных валидаторов.
+        Возвращает словарь валидаторов встроенных типов.
         """
-        return {
-            "date": DateValidator,
-            "phone": PhoneValidator,
-            "email": EmailValidator,
-            "text": TextValidator,
-        }
+        return VALIDATORS
 
 
 class DateValidator(FieldValidator):
@@ -53,20 +107,197 @@ class DateValidator(FieldValidator):
 
 
 class PhoneValidator(FieldValidator):
+    pattern = re.compile(r"^\+?[1-9]\d{0,2} \d{3} \d{3} \d{2} \d{2}$")
+
     @staticmethod
     def validate(value: str) -> bool:
-        return bool(re.match(r"^\+?[1-9]\d{0,2} \d{3} \d{3} \d{2} \d{2}$", value))
+        return PhoneValidator.pattern.match(value) is not None
 
 
 class EmailValidator(FieldValidator):
+    pattern = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
     @staticmethod
     def validate(value: str) -> bool:
-        return bool(
-            re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", value)
-        )
+        return EmailValidator.pattern.match(value) is not None
 
 
 class TextValidator(FieldValidator):
+    pattern = re.compile(r"^[\w\s.,!?'-]{1,256}$")
+
     @staticmethod
     def validate(value: str) -> bool:
-        return bool(re.match(r"^[\w\s.,!?'-]{1,256}$", value))
+        return TextValidator.pattern.match(value) is not None
+
+
+#: Валидаторы в порядке приоритета определения типа
+VALIDATORS: ValidatorMap = {
+    "date": DateValidator,
+    "phone": PhoneValidator,
+    "email": EmailValidator,
+    "text": TextValidator,
+}
+
+
+class FieldTypeDetector:
+    """
+    Однопроходный определитель типа значения поля.
+
+    Выражения всех типов реестра, определяемых по значению, объединяются
+    в одно выражение с именованной группой на каждый тип в порядке
+    приоритета. Значение сканируется один раз независимо от количества
+    типов, а тип определяется по имени совпавшей группы (`lastgroup`).
+    Если дополнительная проверка типа не подтвердила значение, поиск
+    продолжается выражением из оставшихся типов с меньшим приоритетом.
+
+    Для встроенных типов дает тот же результат, что и последовательный
+    перебор валидаторов из `FieldValidator.get_validators()`.
+    """
+
+    def __init__(self, registry: Optional[FieldTypeRegistry] = None):
+        """
+        :param registry: Реестр типов (по умолчанию — реестр сервиса).
+        """
+        if registry is None:
+            registry = field_types
+        self.fallback = registry.fallback
+        specs = registry.detectable()
+        self._match = self._compile(specs)
+        self._checks: Dict[str, Tuple[Optional[Check], Optional[Matcher]]] = {}
+        while specs:
+            spec = specs.pop(0)
+            rest = self._compile(specs) if spec.check is not None else None
+            self._checks[spec.name] = (spec.check, rest)
+
+    def detect(self, value: str) -> FieldType:
+        """
+        Определяет тип значения поля.
+
+        :param value: Значение поля.
+        :return: Тип поля.
+        """
+        match = self._match
+        found = match(value) if match is not None else None
+        while found is not None:
+            field_type = found.lastgroup
+            check, rest = self._checks[field_type]
+            if check is None or check(value):
+                return field_type
+            found = rest(value) if rest is not None else None
+        return self.fallback
+
+    @staticmethod
+    def _compile(specs: List[FieldTypeSpec]) -> Optional[Matcher]:
+        """
+        Объединяет выражения типов в одно выражение с именованными группами.
+        """
+        if not specs:
+            return None
+        return re.compile(combine_patterns(specs)).fullmatch
+
+
+def detect_field_type(value: str) -> FieldType:
+    """
+    Определяет тип значения поля по типам реестра `field_types`.
+
+    Из подходящих типов выбирается тип с наибольшим приоритетом; если
+    ни один не подошел, значение считается текстом. Проверка выполняется
+    однопроходным `FieldTypeDetector`, а результаты для повторяющихся
+    значений берутся из кеша, если он включен.
+
+    :param value: Значение поля.
+    :return: Тип поля.
+    """
+    cache = _detection_cache
+    if cache is None:
+        return _detector.detect(value)
+
+    field_type = cache.get(value)
+    if field_type is None:
+        field_type = _detector.detect(value)
+        cache.put(value, field_type)
+    return field_type
+
+
+def register_field_type(
+    name: str,
+    pattern: str,
+    priority: int = 0,
+    check: Optional[Check] = None,
+    code: Optional[int] = None,
+) -> FieldTypeSpec:
+    """
+    Объявляет тип поля в реестре сервиса и перестраивает определитель типов.
+
+    Типы следует объявлять при запуске, до загрузки каталога: код типа
+    должен совпадать во всех процессах, работающих с одним снимком каталога.
+
+    Определитель строится по копии реестра с новым типом; реестр сервиса
+    изменяется только после этого, поэтому при ошибке он остается прежним.
+
+    :param name: Имя типа (идентификатор Python).
+    :param pattern: Регулярное выражение для всего значения.
+    :param priority: Приоритет при совпадении нескольких типов
+                     (встроенные: date — 300, phone — 200, email — 100).
+    :param check: Дополнительная проверка значения.
+    :param code: Код типа (по умолчанию — первый свободный).
+    :return: Объявление типа.
+    :raises ValueError: Если объявление некорректно.
+    """
+    global _detector
+    with _register_lock:
+        registry = field_types.copy()
+        spec = registry.register(name, pattern, priority, check, code)
+        detector = FieldTypeDetector(registry)
+        field_types.add(spec)
+        _detector = detector
+        if _detection_cache is not None:
+            _detection_cache.clear()
+    return spec
+
+
+def configure_detection_cache(
+    max_entries: int, max_bytes: int = 0, max_value_bytes: int = 0
+) -> Optional[LRUCache[str, FieldType]]:
+    """
+    Включает (или отключает при `max_entries == 0`) кеш определения типов.
+
+    Кеш общий для всех запросов процесса и безопасен для использования
+    из нескольких потоков.
+
+    :param max_entries: Максимальное число запоминаемых значений.
+    :param max_bytes: Максимальный суммарный размер значений в байтах.
+    :param max_value_bytes: Значения большего размера не запоминаются.
+    :return: Новый кеш или `None`, если кеш отключен.
+    """
+    global _detection_cache
+    _detection_cache = (
+        LRUCache(max_entries, max_bytes=max_bytes, max_item_bytes=max_value_bytes)
+        if max_entries
+        else None
+    )
+    return _detection_cache
+
+
+def get_detection_cache() -> Optional[LRUCache[str, FieldType]]:
+    """
+    Возвращает текущий кеш определения типов (для статистики попаданий).
+
+    :return: Кеш или `None`, если кеш отключен.
+    """
+    return _detection_cache
+
+
+#: Реестр типов полей сервиса
+field_types: FieldTypeRegistry = default_registry(
+    FieldTypesConfig().get_params()["TYPES"]
+)
+
+_detector = FieldTypeDetector(field_types)
+_register_lock = threading.Lock()
+_detection_cache: Optional[LRUCache[str, FieldType]] = None
+
+_params = DetectionCacheConfig().get_params()
+configure_detection_cache(
+    _params["SIZE"], _params["MAX_BYTES"], _params["MAX_VALUE_BYTES"]
+)
@@ -3,7 +3,7 @@ from typing import Dict
 from pydantic import BaseModel, Field, model_validator
 
 from app.models.field_validator import FieldType
-from app.models.field_validator import FieldValidator
+from app.models.field_validator import detect_field_type
 
 
 class FormTemplate(BaseModel):
@@ -70,15 +70,7 @@ class FormData(BaseModel):
         Автоматически определяет типы полей на основе переданных данных.
         """
         data = values.get("data", {})
-        validators = FieldValidator.get_validators()
-
-        def detect_type(value: str) -> FieldType:
-            for field_type, validator_cls in validators.items():
-                if validator_cls.validate(value):
-                    return field_type
-            return "text"
-
         values["field_types"] = {
-            field: detect_type(value) for field, value in data.items()
+            field: detect_field_type(value) for field, value in data.items()
         }
         return values
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 from pydantic import BaseModel, RootModel
 
@@ -25,3 +25,66 @@ class FieldTypeResponse(RootModel):
     """
 
     root: Dict[str, FieldType]
+
+
+class TemplateCandidate(BaseModel):
+    """
+    Кандидат ранжированного подбора шаблона.
+
+    Поля:
+    - `template_name`: Имя шаблона формы.
+    - `score`: Доля полей шаблона, совпавших с формой (1.0 — полное совпадение).
+    - `matched_fields`: Количество совпавших полей шаблона.
+    - `template_fields`: Количество полей шаблона.
+    """
+
+    template_name: str
+    score: float
+    matched_fields: int
+    template_fields: int
+
+
+class RankedTemplatesResponse(BaseModel):
+    """
+    Ответ со списком кандидатов, упорядоченных по убыванию соответствия.
+
+    Поля:
+    - `candidates`: Кандидаты; сначала полностью подходящие шаблоны.
+    """
+
+    candidates: List[TemplateCandidate]
+
+
+class TemplateResponse(BaseModel):
+    """
+    Шаблон формы.
+
+    Поля:
+    - `name`: Имя шаблона формы.
+    - `fields`: Словарь с именами полей и их типами.
+    """
+
+    name: str
+    fields: Dict[str, FieldType]
+
+
+class TemplateListResponse(BaseModel):
+    """
+    Ответ со списком шаблонов в порядке хранилища.
+
+    Поля:
+    - `templates`: Шаблоны форм.
+    """
+
+    templates: List[TemplateResponse]
+
+
+class BulkUpsertResponse(BaseModel):
+    """
+    Ответ на пакетное добавление или замену шаблонов.
+
+    Поля:
+    - `upserted`: Количество записанных шаблонов.
+    """
+
+    upserted: int
@@ -0,0 +1,351 @@
+"""
+Многопроцессный запуск сервиса с общим предзагруженным каталогом шаблонов.
+
+Родительский процесс загружает каталог и строит индекс один раз, замораживает
+сборщик мусора (`gc.freeze`), открывает сокет и порождает воркеры через
+`fork`. Воркеры разделяют страницы памяти с каталогом по принципу
+copy-on-write и обслуживают запросы через uvicorn на общем сокете.
+
+Клиенты хранилища (например, `MongoClient`) и пулы потоков не переживают
+`fork`, поэтому каждый воркер сбрасывает их сразу после запуска
+(`FormService.after_fork`) и подключается к хранилищу заново при первом
+обращении; загруженный каталог при этом сохраняется.
+
+Изменения каталога воркеры подхватывают сами: каждый проверяет версию
+данных раз в `TEMPLATE_CACHE_CHECK_INTERVAL` секунд, поэтому запись через
+`/templates`, принятая одним воркером, видна остальным без перезапуска.
+Родитель обновляет общую копию каталога лениво: по сигналу `SIGHUP`
+или когда новая версия данных (проверяется раз в `--reload-interval`
+секунд) не меняется дольше `--reload-delay` секунд, он загружает новый
+каталог, запускает новое поколение воркеров и, когда оно готово, плавно
+останавливает старое. Поток записей поэтому не перезапускает воркеры
+на каждой проверке.
+
+Сигнал готовности: каждый воркер после запуска сервера (lifespan
+приложения и открытия сокета) сообщает родителю о готовности через канал
+(`os.pipe`). Родитель создает файл `--ready-file` (если указан), только
+когда готовы все воркеры поколения; каждый воркер отвечает 200
+на `GET /ready` только при загруженном каталоге.
+
+Запуск:
+    python -m app.serve --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import argparse
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Hashable, List, Optional, Set, Tuple
+
+import uvicorn
+
+logger = logging.getLogger("app.serve")
+
+
+class PreforkServer:
+    """
+    Родительский процесс, управляющий поколениями воркеров.
+
+    Атрибуты:
+    - `workers`: Количество воркеров.
+    - `reload_interval`: Интервал проверки версии данных (0 — не проверять).
+    - `reload_delay`: Время в секундах, в течение которого новая версия
+                      данных не должна меняться до замены поколения.
+    - `ready_file`: Файл, создаваемый после готовности воркеров.
+    - `ready_timeout`: Время ожидания готовности поколения воркеров в секундах.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        workers: int,
+        reload_interval: float = 5.0,
+        ready_file: Optional[str] = None,
+        log_level: str = "info",
+        ready_timeout: float = 60.0,
+        reload_delay: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reload_interval = reload_interval
+        self.ready_file = ready_file
+        self.log_level = log_level
+        self.ready_timeout = ready_timeout
+        self.reload_delay = reload_delay
+        self.pids: List[int] = []
+        self._socket: Optional[socket.socket] = None
+        self._ready_pipe: Optional[Tuple[int, int]] = None
+        self._stopping = False
+        self._reload_requested = False
+        self._pending_version: Optional[Hashable] = None
+        self._pending_since = 0.0
+
+    def run(self) -> None:
+        """
+        Загружает каталог, запускает воркеры и следит за ними до остановки.
+        """
+        from app.api.endpoints import app, service
+
+        self.app = app
+        self.service = service
+        self._socket = self._bind()
+        self._load_catalog()
+        pids = self._spawn_generation()
+        if pids is None:
+            raise RuntimeError("Workers did not become ready.")
+        self.pids = pids
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        last_check = time.monotonic()
+        while not self._stopping:
+            time.sleep(0.2)
+            self._reap()
+            if self.reload_interval and (
+                time.monotonic() - last_check >= self.reload_interval
+            ):
+                last_check = time.monotonic()
+                self._reload_requested |= self._catalog_settled()
+            if self._reload_requested:
+                self._reload_requested = False
+                self._reload()
+
+        self._stop_workers(self.pids)
+        if self.ready_file and os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _load_catalog(self) -> None:
+        """
+        Загружает каталог в родительском процессе и замораживает объекты,
+        чтобы сборщик мусора воркеров не копировал их страницы.
+        """
+        started = time.monotonic()
+        invalidate = getattr(self.service.storage, "invalidate", None)
+        if invalidate is not None:
+            invalidate()
+        self.service.warmup()
+        gc.collect()
+        gc.freeze()
+        logger.info("Template catalog loaded in %.2fs", time.monotonic() - started)
+
+    def _catalog_settled(self) -> bool:
+        """
+        Проверяет, пора ли заменить поколение воркеров: версия данных
+        отличается от загруженной родителем и не менялась `reload_delay`
+        секунд.
+
+        :return: `True`, если каталог нужно перезагрузить.
+        """
+        storage = self.service.storage
+        if not hasattr(storage, "loaded_version"):
+            return False
+        try:
+            version = storage.get_version()
+        except Exception:
+            logger.exception("Template catalog version check failed")
+            return False
+        now = time.monotonic()
+        if version == storage.loaded_version:
+            self._pending_version = None
+            return False
+        if version != self._pending_version:
+            self._pending_version, self._pending_since = version, now
+            return False
+        return now - self._pending_since >= self.reload_delay
+
+    def _spawn_generation(self) -> Optional[List[int]]:
+        """
+        Запускает поколение воркеров и ждет их готовности.
+
+        :return: PID воркеров или `None`, если они не стали готовы
+                 за `ready_timeout` секунд (такие воркеры останавливаются).
+        """
+        previous = self._ready_pipe
+        self._ready_pipe = os.pipe()
+        os.set_blocking(self._ready_pipe[1], False)
+        pids = [self._spawn_worker() for _ in range(self.workers)]
+        if previous is not None:
+            for fd in previous:
+                os.close(fd)
+        if not self._wait_ready(pids):
+            logger.error("Workers %s did not become ready", pids)
+            self._stop_workers(pids)
+            return None
+        if self.ready_file:
+            with open(self.ready_file, "w") as f:
+                f.write(f"{os.getpid()}\n")
+        logger.info("Started %d workers: %s", len(pids), pids)
+        return pids
+
+    def _wait_ready(self, pids: List[int]) -> bool:
+        """
+        Ждет сообщений о готовности от всех воркеров поколения.
+
+        :param pids: PID воркеров.
+        :return: `True`, если все воркеры готовы; `False`, если истекло
+                 время ожидания или воркер завершился, не став готовым.
+        """
+        waiting: Set[int] = set(pids)
+        deadline = time.monotonic() + self.ready_timeout
+        buffer = b""
+        while waiting:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return False
+            fd = self._ready_pipe[0]
+            readable, _, _ = select.select([fd], [], [], min(timeout, 0.2))
+            if not readable:
+                if any(os.waitpid(pid, os.WNOHANG)[0] for pid in waiting):
+                    return False
+                continue
+            buffer += os.read(self._ready_pipe[0], 4096)
+            *lines, buffer = buffer.split(b"\n")
+            waiting.difference_update(int(line) for line in lines if line)
+        return True
+
+    def _spawn_worker(self) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        os.close(self._ready_pipe[0])
+        self.service.after_fork()
+        try:
+            config = uvicorn.Config(self.app, log_level=self.log_level, lifespan="on")
+            WorkerServer(config, self._ready_pipe[1]).run(sockets=[self._socket])
+        finally:
+            os._exit(0)
+
+    def _reload(self) -> None:
+        """
+        Загружает новый каталог и заменяет поколение воркеров.
+        """
+        logger.info("Reloading template catalog")
+        self._pending_version = None
+        gc.unfreeze()
+        try:
+            self._load_catalog()
+        except Exception:
+            logger.exception("Template catalog reload failed, keeping workers")
+            gc.freeze()
+            return
+        pids = self._spawn_generation()
+        if pids is None:
+            logger.error("New workers are not ready, keeping the old generation")
+            return
+        old, self.pids = self.pids, pids
+        self._stop_workers(old)
+
+    def _reap(self) -> None:
+        """
+        Перезапускает неожиданно завершившиеся воркеры.
+        """
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.pids and not self._stopping:
+                logger.warning("Worker %d exited, restarting", pid)
+                self.pids[self.pids.index(pid)] = self._spawn_worker()
+
+    def _stop_workers(self, pids: List[int], timeout: float = 30.0) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+            time.sleep(0.05)
+        for pid in remaining:
+            os.kill(pid, signal.SIGKILL)
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self._reload_requested = True
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Сервер uvicorn воркера, сообщающий родителю о готовности.
+
+    После запуска (lifespan приложения и открытие сокета) записывает
+    свой PID в канал готовности родителя.
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        """
+        :param config: Конфигурация uvicorn.
+        :param ready_fd: Дескриптор записи канала готовности.
+        """
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            try:
+                os.write(self.ready_fd, f"{os.getpid()}\n".encode())
+            except OSError:
+                logger.warning("Could not report worker readiness")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Multi-process form service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count()))
+    )
+    parser.add_argument("--reload-interval", type=float, default=5.0)
+    parser.add_argument("--reload-delay", type=float, default=60.0)
+    parser.add_argument("--ready-file")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
+    PreforkServer(
+        args.host,
+        args.port,
+        args.workers,
+        reload_interval=args.reload_interval,
+        reload_delay=args.reload_delay,
+        ready_file=args.ready_file,
+        log_level=args.log_level,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from importlib import import_module
+from typing import Callable, Dict, Iterable
+
+from app.models.form_template import FormTemplate
+from app.services.matcher import TemplateIndex
+
+#: Тип фабрики индекса: строит индекс по списку шаблонов
+IndexFactory = Callable[[Iterable[FormTemplate]], TemplateIndex]
+
+#: Движки подбора шаблонов: имя -> путь к классу индекса.
+#: Классы импортируются при выборе, поэтому необязательные зависимости
+#: (NumPy для `bitset`) нужны только при использовании движка.
+MATCH_ENGINES: Dict[str, str] = {
+    "index": "app.services.matcher.TemplateIndex",
+    "bitset": "app.services.bitset.BitsetTemplateIndex",
+}
+
+
+def get_match_engine(name: str) -> IndexFactory:
+    """
+    Возвращает класс индекса для движка подбора шаблонов.
+
+    :param name: Имя движка (`index` или `bitset`).
+    :return: Класс индекса, принимающий список шаблонов.
+    :raises ValueError: Если движок с таким именем неизвестен.
+    """
+    if name not in MATCH_ENGINES:
+        raise ValueError(f"Match engine '{name}' is not registered.")
+    module_name, _, class_name = MATCH_ENGINES[name].rpartition(".")
+    return getattr(import_module(module_name), class_name)
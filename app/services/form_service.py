@@ -1,9 +1,32 @@
-from typing import Dict, Union, List
+import asyncio
+from typing import (
+    AsyncIterable,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
 
+from app.core.cache import ResultCacheConfig
+from app.core.exceptions import ReadOnlyStorageError
+from app.core.matching import MatchingConfig
+from app.models.field_validator import detect_field_type
 from app.models.form_template import FieldType
 from app.models.form_template import FormData, FormTemplate
-from app.storage.base import Storage
+from app.services.engines import get_match_engine
+from app.services.matcher import MatchMode, TemplateIndex, TemplateScore
+from app.services.metrics import metrics
+from app.services.result_cache import NO_MATCH, ResultCache, signature
+from app.storage.base import AsyncStorage, Storage
+from app.storage.cache import CachedStorage, storage_health
 from app.storage.factory import StorageFactory
+from app.storage.threaded import is_async_storage, to_async
 
 
 class FormService:
@@ -11,14 +34,108 @@ class FormService:
     Сервис для обработки данных форм и подбора подходящих шаблонов.
 
     Атрибуты:
-    - `storage`: Хранилище данных шаблонов.
+    - `storage`: Хранилище данных шаблонов (по умолчанию — с кешем в памяти).
+    - `async_storage`: Асинхронный интерфейс к хранилищу.
+    - `index_factory`: Класс индекса выбранного движка подбора шаблонов.
+    - `result_cache`: Кеш результатов подбора по набору типизированных полей
+      (`None` — отключен).
     """
 
-    def __init__(self):
-        self.storage: Storage = StorageFactory.get_storage()
+    def __init__(self, engine: Optional[str] = None):
+        """
+        Инициализация сервиса.
+
+        :param engine: Движок подбора шаблонов (`index` или `bitset`);
+                       по умолчанию берется из `MATCH_ENGINE`.
+        """
+        self.index_factory = get_match_engine(
+            engine or MatchingConfig().get_params()["ENGINE"]
+        )
+        self.storage: Union[Storage, AsyncStorage] = StorageFactory.get_cached_storage(
+            self.index_factory
+        )
+        self.async_storage: AsyncStorage = to_async(self.storage)
+        cache_params = ResultCacheConfig().get_params()
+        self.result_cache: Optional[ResultCache] = (
+            ResultCache(cache_params["SIZE"], cache_params["MAX_BYTES"])
+            if cache_params["SIZE"]
+            else None
+        )
+        self._warm = False
+
+    @property
+    def ready(self) -> bool:
+        """
+        Загружен ли каталог шаблонов: после `warmup` или первой загрузки кеша.
+        """
+        return self._warm or getattr(self.storage, "is_loaded", False)
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние сервиса: готовность, состояние каталога
+        в памяти (если включен кеш) и хранилища (если оно его сообщает).
+
+        Статус:
+        - `ok` — каталог загружен и актуален, хранилище доступно;
+        - `degraded` — запросы обслуживаются последним загруженным каталогом,
+          но хранилище недоступно или каталог не удалось обновить;
+        - `unavailable` — каталог не загружен.
+
+        :return: Словарь с ключами `status`, `ready`, `catalog`, `storage`.
+        """
+        if isinstance(self.storage, CachedStorage):
+            report = self.storage.health()
+        else:
+            report = {"catalog": None, "storage": storage_health(self.storage)}
+        catalog, storage = report["catalog"], report["storage"]
+        if not self.ready:
+            status = "unavailable"
+        elif (catalog is not None and catalog["degraded"]) or (
+            storage is not None and storage.get("state", "closed") != "closed"
+        ):
+            status = "degraded"
+        else:
+            status = "ok"
+        return {"status": status, "ready": self.ready, **report}
+
+    def warmup(self) -> None:
+        """
+        Загружает каталог шаблонов и строит индекс заранее, до первых запросов.
+        """
+        if is_async_storage(self.storage):
+            asyncio.run(self.aget_index())
+        else:
+            self.get_index()
+        self._warm = True
+
+    async def aclose(self) -> None:
+        """
+        Закрывает пулы потоков и клиенты хранилища. После закрытия
+        сервис не используется.
+        """
+        aclose = getattr(self.async_storage, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def after_fork(self) -> None:
+        """
+        Готовит сервис к работе в дочернем процессе после `fork`:
+        пулы потоков и клиенты хранилища создаются заново, загруженный
+        каталог сохраняется.
+        """
+        after_fork = getattr(self.async_storage, "after_fork", None)
+        if after_fork is not None:
+            after_fork()
+
+    async def awarmup(self) -> None:
+        """
+        Асинхронный вариант `warmup`.
+        """
+        await self.aget_index()
+        self._warm = True
 
     def process_form(
-        self, form_data: FormData
+        self, form_data: FormData, match: MatchMode = "first"
     ) -> Union[FormTemplate, Dict[str, FieldType]]:
         """
         Универсальный метод для обработки формы:
@@ -26,33 +143,429 @@ class FormService:
         - Возвращает словарь с типами полей, если шаблон не найден.
 
         :param form_data: Данные формы, которые нужно обработать.
+        :param match: Режим подбора: `"first"` — первый подходящий шаблон
+                      в порядке хранилища, `"best"` — подходящий шаблон
+                      с наибольшим числом полей.
+        :return: Если шаблон найден, возвращается объект FormTemplate.
+                 В противном случае возвращается словарь с типами полей.
+        """
+        stage = metrics.now()
+        templates = self.candidates(form_data.field_types)
+        stage = metrics.stage("load", stage)
+        return self._measured_match(form_data, templates, match, stage)
+
+    async def aprocess_form(
+        self, form_data: FormData, match: MatchMode = "first"
+    ) -> Union[FormTemplate, Dict[str, FieldType]]:
+        """
+        Асинхронный вариант `process_form`, не блокирующий цикл событий
+        обращениями к хранилищу.
+
+        :param form_data: Данные формы, которые нужно обработать.
+        :param match: Режим подбора (см. `process_form`).
         :return: Если шаблон найден, возвращается объект FormTemplate.
                  В противном случае возвращается словарь с типами полей.
         """
-        templates = self.storage.get_templates()
-        return FormService.match_template(form_data, templates)
+        stage = metrics.now()
+        templates = await self.acandidates(form_data.field_types)
+        stage = metrics.stage("load", stage)
+        return self._measured_match(form_data, templates, match, stage)
+
+    def rank_form(self, form_data: FormData, limit: int = 5) -> List[TemplateScore]:
+        """
+        Возвращает лучших кандидатов среди шаблонов с оценками совпадения.
+
+        Частично совпавшие шаблоны ищутся по всему каталогу, поэтому
+        без кеша шаблонов (`TEMPLATE_CACHE_ENABLED=false`) каталог
+        загружается из хранилища при каждом вызове.
+
+        :param form_data: Данные формы, которые нужно обработать.
+        :param limit: Максимальное количество кандидатов.
+        :return: Список кандидатов: сначала полностью подходящие шаблоны,
+                 затем частично, по убыванию количества совпавших полей.
+        """
+        return self.get_index().rank(form_data.field_types, limit)
+
+    async def arank_form(
+        self, form_data: FormData, limit: int = 5
+    ) -> List[TemplateScore]:
+        """
+        Асинхронный вариант `rank_form`.
+
+        :param form_data: Данные формы, которые нужно обработать.
+        :param limit: Максимальное количество кандидатов.
+        :return: Список кандидатов с оценками.
+        """
+        return (await self.aget_index()).rank(form_data.field_types, limit)
+
+    def list_templates(self) -> List[FormTemplate]:
+        """
+        Возвращает все шаблоны каталога в порядке хранилища.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        return self.get_index().templates()
+
+    async def alist_templates(self) -> List[FormTemplate]:
+        """
+        Асинхронный вариант `list_templates`.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        return (await self.aget_index()).templates()
+
+    def get_template(self, name: str) -> Optional[FormTemplate]:
+        """
+        Возвращает шаблон по имени.
+
+        :param name: Имя шаблона.
+        :return: Шаблон или `None`, если его нет.
+        """
+        return FormService._find_template(self.get_index(), name)
+
+    async def aget_template(self, name: str) -> Optional[FormTemplate]:
+        """
+        Асинхронный вариант `get_template`.
+
+        :param name: Имя шаблона.
+        :return: Шаблон или `None`, если его нет.
+        """
+        return FormService._find_template(await self.aget_index(), name)
+
+    def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Атомарно добавляет или заменяет шаблоны по именам.
+
+        :param templates: Новые версии шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        self._writer("upsert_templates")(templates)
+
+    async def aupsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Асинхронный вариант `upsert_templates`.
+
+        :param templates: Новые версии шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        aupsert_templates = getattr(self.storage, "aupsert_templates", None)
+        if aupsert_templates is not None:
+            return await aupsert_templates(templates)
+        self._writer("upsert_templates")
+        await self.async_storage.upsert_templates(templates)
+
+    def delete_templates(self, names: List[str]) -> int:
+        """
+        Атомарно удаляет шаблоны по именам.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        return self._writer("delete_templates")(names)
+
+    async def adelete_templates(self, names: List[str]) -> int:
+        """
+        Асинхронный вариант `delete_templates`.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        adelete_templates = getattr(self.storage, "adelete_templates", None)
+        if adelete_templates is not None:
+            return await adelete_templates(names)
+        self._writer("delete_templates")
+        return await self.async_storage.delete_templates(names)
+
+    def process_forms(
+        self,
+        forms: Iterable[Mapping[str, str]],
+        index: Optional[TemplateIndex] = None,
+    ) -> Iterator[Union[FormTemplate, Dict[str, FieldType]]]:
+        """
+        Обрабатывает набор форм, возвращая результаты в порядке входных данных.
+
+        Индекс шаблонов загружается один раз на весь набор, а тип каждого
+        уникального значения определяется один раз.
+
+        :param forms: Данные форм (словари поле -> значение).
+        :param index: Готовый индекс шаблонов; по умолчанию берется из хранилища.
+        :return: Итератор результатов, аналогичных `process_form`.
+        """
+        process = FormService.form_processor(
+            self.get_index() if index is None else index
+        )
+        for data in forms:
+            yield process(data)
+
+    async def aprocess_forms(
+        self, forms: AsyncIterable[Mapping[str, str]]
+    ) -> AsyncIterator[Union[FormTemplate, Dict[str, FieldType]]]:
+        """
+        Асинхронный вариант `process_forms` для потоковых источников данных.
+
+        :param forms: Асинхронный источник данных форм.
+        :return: Асинхронный итератор результатов в порядке входных данных.
+        """
+        process = FormService.form_processor(await self.aget_index())
+        async for data in forms:
+            yield process(data)
+
+    @staticmethod
+    def form_processor(
+        index: TemplateIndex, cache_size: int = 65536
+    ) -> Callable[[Mapping[str, str]], Union[FormTemplate, Dict[str, FieldType]]]:
+        """
+        Создает обработчик форм для одного набора данных.
+
+        Обработчик запоминает типы уже встреченных значений (не более
+        `cache_size` штук), поэтому повторяющиеся значения не проверяются
+        валидаторами повторно.
+
+        :param index: Индекс шаблонов.
+        :param cache_size: Максимальное число запоминаемых значений.
+        :return: Функция, принимающая данные формы и возвращающая результат.
+        """
+        value_types: Dict[str, FieldType] = {}
+
+        def detect(value: str) -> FieldType:
+            field_type = value_types.get(value)
+            if field_type is None:
+                if len(value_types) >= cache_size:
+                    value_types.clear()
+                field_type = value_types[value] = detect_field_type(value)
+            return field_type
+
+        def process(
+            data: Mapping[str, str],
+        ) -> Union[FormTemplate, Dict[str, FieldType]]:
+            field_types = {name: detect(value) for name, value in data.items()}
+            template = index.match(field_types)
+            return field_types if template is None else template
+
+        return process
+
+    def match_index(
+        self,
+        index: TemplateIndex,
+        field_types: Mapping[str, FieldType],
+        match: MatchMode = "first",
+    ) -> Optional[FormTemplate]:
+        """
+        Подбирает шаблон по индексу, используя кеш результатов.
+
+        Результат для уже встречавшегося набора типизированных полей берется
+        из кеша, пока каталог не изменился.
+
+        :param index: Индекс шаблонов.
+        :param field_types: Типы полей формы.
+        :param match: Режим подбора: `"first"` или `"best"`.
+        :return: Подходящий шаблон или `None`, если такого нет.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return _match(index, field_types, match)
+
+        key = signature(field_types, match)
+        revision = getattr(index, "revision", 0)
+        cached = cache.get(index, key)
+        metrics.result_cache(cached is not None)
+        if cached is not None:
+            return None if cached is NO_MATCH else cached
+
+        template = _match(index, field_types, match)
+        cache.put(index, revision, key, NO_MATCH if template is None else template)
+        return template
+
+    def match_index_name(
+        self,
+        index: TemplateIndex,
+        field_types: Mapping[str, FieldType],
+        match: MatchMode = "first",
+    ) -> Optional[str]:
+        """
+        Возвращает имя подходящего шаблона (см. `match_index`).
+
+        Без кеша результатов `FormTemplate` не создается.
+
+        :param index: Индекс шаблонов.
+        :param field_types: Типы полей формы.
+        :param match: Режим подбора: `"first"` или `"best"`.
+        :return: Имя шаблона или `None`, если такого нет.
+        """
+        if self.result_cache is None:
+            if match == "best":
+                return index.match_best_name(field_types)
+            return index.match_name(field_types)
+        template = self.match_index(index, field_types, match)
+        return None if template is None else template.name
+
+    def match_name(
+        self,
+        templates: Union[List[FormTemplate], TemplateIndex],
+        field_types: Mapping[str, FieldType],
+        match: MatchMode = "first",
+    ) -> Optional[str]:
+        """
+        Возвращает имя подходящего шаблона среди кандидатов
+        (см. `candidates`).
+
+        :param templates: Шаблоны-кандидаты или индекс.
+        :param field_types: Типы полей формы.
+        :param match: Режим подбора: `"first"` или `"best"`.
+        :return: Имя шаблона или `None`, если такого нет.
+        """
+        if isinstance(templates, list):
+            template = _match(TemplateIndex(templates), field_types, match)
+            return None if template is None else template.name
+        return self.match_index_name(templates, field_types, match)
+
+    def _measured_match(
+        self,
+        form_data: FormData,
+        templates: Union[List[FormTemplate], TemplateIndex],
+        match: MatchMode,
+        started: float,
+    ) -> Union[FormTemplate, Dict[str, FieldType]]:
+        """
+        Подбирает шаблон (см. `match_template`), учитывая этап и результат
+        в метриках.
+
+        :param form_data: Данные формы.
+        :param templates: Шаблоны-кандидаты или индекс.
+        :param match: Режим подбора.
+        :param started: Отметка начала этапа подбора.
+        :return: Шаблон или типизация полей формы.
+        """
+        if isinstance(templates, list):
+            result = FormService.match_template(form_data, templates, match)
+        else:
+            template = self.match_index(templates, form_data.field_types, match)
+            result = form_data.field_types if template is None else template
+        metrics.stage("match", started)
+        metrics.result(result.name if isinstance(result, FormTemplate) else None)
+        return result
+
+    def _writer(self, method: str) -> Callable[..., Any]:
+        """
+        Возвращает метод записи хранилища.
+
+        :param method: Имя метода.
+        :return: Метод хранилища.
+        :raises ReadOnlyStorageError: Если хранилище его не реализует.
+        """
+        write = getattr(self.storage, method, None)
+        if write is None:
+            raise ReadOnlyStorageError(
+                f"{type(self.storage).__name__} does not support template writes."
+            )
+        return write
+
+    @staticmethod
+    def _find_template(index: TemplateIndex, name: str) -> Optional[FormTemplate]:
+        get = getattr(index, "get", None)
+        if get is not None:
+            return get(name)
+        return next((t for t in index.templates() if t.name == name), None)
+
+    def _finds_templates(self) -> bool:
+        """
+        Отбирает ли хранилище шаблоны-кандидаты само (`find_templates`).
+
+        Используется, только если хранилище не держит готовый индекс.
+        """
+        return hasattr(self.storage, "find_templates") and not hasattr(
+            self.storage, "get_index"
+        )
+
+    def candidates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> Union[List[FormTemplate], TemplateIndex]:
+        """
+        Возвращает шаблоны, среди которых нужно искать подходящий форме:
+        кандидатов, отобранных хранилищем, или индекс всего каталога.
+
+        :param field_types: Типы полей формы.
+        :return: Список шаблонов-кандидатов или индекс.
+        """
+        if self._finds_templates():
+            return self.storage.find_templates(field_types)
+        return self.get_index()
+
+    async def acandidates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> Union[List[FormTemplate], TemplateIndex]:
+        """
+        Асинхронный вариант `candidates`.
+
+        :param field_types: Типы полей формы.
+        :return: Список шаблонов-кандидатов или индекс.
+        """
+        if self._finds_templates():
+            return await self.async_storage.find_templates(field_types)
+        return await self.aget_index()
+
+    def get_index(self) -> TemplateIndex:
+        """
+        Возвращает индекс шаблонов для подбора.
+
+        Если хранилище кеширует индекс, используется готовый,
+        иначе индекс строится по текущему списку шаблонов.
+
+        :return: Объект `TemplateIndex`.
+        """
+        get_index = getattr(self.storage, "get_index", None)
+        if get_index is not None:
+            return get_index()
+        return self.index_factory(self.storage.get_templates())
+
+    async def aget_index(self) -> TemplateIndex:
+        """
+        Асинхронно возвращает индекс шаблонов для подбора.
+
+        :return: Объект `TemplateIndex`.
+        """
+        aget_index = getattr(self.storage, "aget_index", None)
+        if aget_index is not None:
+            return await aget_index()
+        return self.index_factory(await self.async_storage.get_templates())
 
     @staticmethod
     def match_template(
-        form_data: FormData, templates: List[FormTemplate]
+        form_data: FormData,
+        templates: Union[List[FormTemplate], TemplateIndex],
+        match: MatchMode = "first",
     ) -> Union[FormTemplate, Dict[str, FieldType]]:
         """
         Подбирает подходящий шаблон из списка.
         Если подходящий шаблон не найден, возвращает типизацию полей.
 
+        Поиск выполняется по инвертированному индексу `TemplateIndex`.
+        В режиме `"first"` результат совпадает с первым подходящим шаблоном
+        в порядке списка, в режиме `"best"` — с подходящим шаблоном,
+        у которого больше всего полей.
+
         :param form_data: Данные формы, которые нужно проверить.
-        :param templates: Список доступных шаблонов.
+        :param templates: Список доступных шаблонов или готовый индекс по ним.
+        :param match: Режим подбора: `"first"` или `"best"`.
         :return: Если шаблон найден, возвращается объект FormTemplate.
                  В противном случае возвращается типизация полей формы в виде словаря.
         """
-        input_field_types = form_data.field_types
+        if isinstance(templates, list):
+            templates = TemplateIndex(templates)
 
-        for template in templates:
-            if all(
-                field_name in input_field_types
-                and input_field_types[field_name] == field_type
-                for field_name, field_type in template.fields.items()
-            ):
-                return template
+        input_field_types = form_data.field_types
+        template = _match(templates, input_field_types, match)
+        if template is not None:
+            return template
 
         return input_field_types
+
+
+def _match(
+    index: TemplateIndex, field_types: Mapping[str, FieldType], match: MatchMode
+) -> Optional[FormTemplate]:
+    if match == "best":
+        return index.match_best(field_types)
+    return index.match(field_types)
@@ -0,0 +1,395 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Literal, Mapping, Optional
+
+from app.models.compact import TYPE_CODES, CompactTemplate, FieldVocabulary, pack
+from app.models.field_validator import FieldType
+from app.models.form_template import FormTemplate
+
+#: Режим подбора шаблона: первый подходящий или наиболее специфичный
+MatchMode = Literal["first", "best"]
+
+#: Количество полей удаленного шаблона: не совпадает ни с одним числом совпадений
+REMOVED = 0xFFFFFFFF
+
+
+def _insert(positions: array, position: int) -> None:
+    """
+    Вставляет позицию в отсортированный массив позиций.
+
+    :param positions: Отсортированный массив позиций.
+    :param position: Вставляемая позиция.
+    """
+    if not positions or positions[-1] < position:
+        positions.append(position)
+    else:
+        positions.insert(bisect_left(positions, position), position)
+
+
+class TemplateScore:
+    """
+    Кандидат ранжированного подбора шаблона.
+
+    Атрибуты:
+    - `template`: Шаблон формы.
+    - `matched`: Количество полей шаблона, совпавших с формой (с учетом типа).
+    - `total`: Количество полей шаблона.
+    """
+
+    __slots__ = ("template", "matched", "total")
+
+    def __init__(self, template: FormTemplate, matched: int, total: int):
+        self.template = template
+        self.matched = matched
+        self.total = total
+
+    @property
+    def complete(self) -> bool:
+        """
+        Подходит ли шаблон форме полностью.
+        """
+        return self.matched == self.total
+
+    @property
+    def score(self) -> float:
+        """
+        Доля совпавших полей шаблона (1.0 — полное совпадение).
+        """
+        return self.matched / self.total if self.total else 1.0
+
+
+class TemplateIndex:
+    """
+    Инвертированный индекс шаблонов форм.
+
+    Для каждой пары (имя поля, тип поля) хранит отсортированный список
+    позиций шаблонов, в которых она встречается, а для каждого шаблона —
+    количество его полей. Шаблон подходит форме, если число совпавших
+    пар равно числу его полей, поэтому поиск затрагивает только шаблоны,
+    имеющие с формой хотя бы одно общее типизированное поле.
+
+    Шаблоны хранятся в компактном виде (`CompactTemplate`): имена полей
+    заменены идентификаторами общего словаря, а `FormTemplate` создается
+    только для возвращаемого результата.
+
+    Индекс изменяется на месте (`upsert`, `delete`): обновленный шаблон
+    сохраняет свою позицию, новый добавляется в конец, удаленный оставляет
+    пустую позицию. Каждый пакет изменений применяется под блокировкой,
+    поэтому поиск видит каталог либо до пакета, либо после него.
+
+    Атрибуты:
+    - `vocabulary`: Словарь имен полей каталога.
+    - `_templates`: Компактные шаблоны в порядке хранилища (`None` — удален).
+    - `_field_counts`: Количество полей каждого шаблона (`REMOVED` — удален).
+    - `_postings`: Словарь упакованная пара (поле, тип) -> позиции шаблонов.
+    - `_empty`: Позиции шаблонов без полей (подходят любой форме).
+    - `_names`: Словарь имя шаблона -> его позиции; строится при первом
+      изменении или поиске по имени.
+    - `revision`: Номер ревизии, увеличивается при каждом изменении на месте.
+    """
+
+    def __init__(self, templates: Iterable[FormTemplate] = ()):
+        """
+        Строит индекс по списку шаблонов.
+
+        :param templates: Шаблоны в порядке, в котором они должны проверяться.
+        """
+        self.vocabulary = FieldVocabulary()
+        self._templates: List[Optional[CompactTemplate]] = []
+        self._field_counts = array("I")
+        self._postings: Dict[int, array] = {}
+        self._empty = array("I")
+        self._names: Optional[Dict[str, List[int]]] = None
+        self._removed = 0
+        self.revision = 0
+        self._lock = threading.Lock()
+
+        for template in templates:
+            self._append(CompactTemplate.from_template(template, self.vocabulary))
+
+    def __len__(self) -> int:
+        return len(self._templates) - self._removed
+
+    def _append(self, template: CompactTemplate) -> None:
+        """
+        Добавляет шаблон в конец индекса.
+
+        :param template: Добавляемый шаблон.
+        """
+        position = len(self._templates)
+        self._templates.append(template)
+        self._field_counts.append(len(template))
+        if self._names is not None:
+            self._names.setdefault(template.name, []).append(position)
+        self._index(position, template)
+
+    def _index(self, position: int, template: CompactTemplate) -> None:
+        """
+        Добавляет позицию шаблона в списки позиций, сохраняя их порядок.
+
+        :param position: Позиция шаблона.
+        :param template: Шаблон.
+        """
+        if not len(template):
+            _insert(self._empty, position)
+        for key in template.fields:
+            positions = self._postings.get(key)
+            if positions is None:
+                self._postings[key] = array("I", (position,))
+            else:
+                _insert(positions, position)
+
+    def _unindex(self, position: int, template: CompactTemplate) -> None:
+        """
+        Удаляет позицию шаблона из списков позиций.
+
+        :param position: Позиция шаблона.
+        :param template: Шаблон.
+        """
+        if not len(template):
+            self._empty.remove(position)
+        for key in template.fields:
+            positions = self._postings[key]
+            positions.remove(position)
+            if not positions:
+                del self._postings[key]
+
+    def _name_positions(self) -> Dict[str, List[int]]:
+        """
+        Возвращает словарь имя шаблона -> позиции, строя его при первом вызове.
+
+        :return: Словарь позиций по именам.
+        """
+        if self._names is None:
+            names: Dict[str, List[int]] = {}
+            for position, template in enumerate(self._templates):
+                if template is not None:
+                    names.setdefault(template.name, []).append(position)
+            self._names = names
+        return self._names
+
+    def upsert(self, templates: Iterable[FormTemplate]) -> None:
+        """
+        Атомарно добавляет или заменяет шаблоны (по имени).
+
+        Шаблон с уже известным именем заменяется на его позициях,
+        новый — добавляется в конец.
+
+        :param templates: Новые версии шаблонов.
+        """
+        compact = [
+            CompactTemplate.from_template(template, self.vocabulary)
+            for template in templates
+        ]
+        with self._lock:
+            for template in compact:
+                positions = self._name_positions().get(template.name)
+                if not positions:
+                    self._append(template)
+                    continue
+                for position in positions:
+                    self._unindex(position, self._templates[position])
+                    self._templates[position] = template
+                    self._field_counts[position] = len(template)
+                    self._index(position, template)
+            self.revision += 1
+
+    def delete(self, names: Iterable[str]) -> int:
+        """
+        Атомарно удаляет шаблоны по именам.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        deleted = 0
+        with self._lock:
+            for name in names:
+                for position in self._name_positions().pop(name, ()):
+                    self._unindex(position, self._templates[position])
+                    self._templates[position] = None
+                    self._field_counts[position] = REMOVED
+                    deleted += 1
+            self._removed += deleted
+            self.revision += 1
+        return deleted
+
+    def get(self, name: str) -> Optional[FormTemplate]:
+        """
+        Возвращает шаблон по имени.
+
+        :param name: Имя шаблона.
+        :return: Шаблон или `None`, если его нет в индексе.
+        """
+        with self._lock:
+            positions = self._name_positions().get(name)
+            if not positions:
+                return None
+            return self._templates[positions[0]].to_template(self.vocabulary)
+
+    def templates(self) -> List[FormTemplate]:
+        """
+        Возвращает все шаблоны индекса в порядке хранилища.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        with self._lock:
+            return [
+                template.to_template(self.vocabulary)
+                for template in self._templates
+                if template is not None
+            ]
+
+    def match(self, field_types: Mapping[str, FieldType]) -> Optional[FormTemplate]:
+        """
+        Возвращает первый (в порядке хранилища) шаблон, все поля которого
+        присутствуют в форме с теми же типами.
+
+        :param field_types: Типы полей формы.
+        :return: Подходящий шаблон или `None`, если такого нет.
+        """
+        with self._lock:
+            position = self._match_position(field_types)
+            if position is None:
+                return None
+            return self._templates[position].to_template(self.vocabulary)
+
+    def match_name(self, field_types: Mapping[str, FieldType]) -> Optional[str]:
+        """
+        Возвращает имя первого подходящего шаблона без создания `FormTemplate`.
+
+        :param field_types: Типы полей формы.
+        :return: Имя шаблона или `None`, если такого нет.
+        """
+        with self._lock:
+            position = self._match_position(field_types)
+            return None if position is None else self._templates[position].name
+
+    def match_best(
+        self, field_types: Mapping[str, FieldType]
+    ) -> Optional[FormTemplate]:
+        """
+        Возвращает наиболее специфичный подходящий шаблон: полностью
+        совпавший шаблон с наибольшим числом полей. При равенстве
+        выбирается шаблон, стоящий раньше в хранилище.
+
+        :param field_types: Типы полей формы.
+        :return: Подходящий шаблон или `None`, если такого нет.
+        """
+        with self._lock:
+            position = self._best_position(field_types)
+            if position is None:
+                return None
+            return self._templates[position].to_template(self.vocabulary)
+
+    def match_best_name(self, field_types: Mapping[str, FieldType]) -> Optional[str]:
+        """
+        Возвращает имя наиболее специфичного подходящего шаблона.
+
+        :param field_types: Типы полей формы.
+        :return: Имя шаблона или `None`, если такого нет.
+        """
+        with self._lock:
+            position = self._best_position(field_types)
+            return None if position is None else self._templates[position].name
+
+    def rank(
+        self, field_types: Mapping[str, FieldType], limit: int = 5
+    ) -> List[TemplateScore]:
+        """
+        Возвращает до `limit` лучших кандидатов за один проход по индексу.
+
+        Кандидатами считаются шаблоны, имеющие с формой хотя бы одно общее
+        типизированное поле, и шаблоны без полей. Сначала идут полностью
+        подходящие шаблоны, затем частично; внутри групп — по убыванию
+        количества совпавших полей, затем в порядке хранилища.
+
+        :param field_types: Типы полей формы.
+        :param limit: Максимальное количество кандидатов.
+        :return: Список кандидатов с оценками.
+        """
+        with self._lock:
+            counts = self._field_counts
+            candidates = [
+                (count != counts[position], -count, position)
+                for position, count in self._hits(field_types).items()
+            ]
+            candidates.extend((False, 0, position) for position in self._empty[:limit])
+            return [
+                TemplateScore(
+                    self._templates[position].to_template(self.vocabulary),
+                    -negative_count,
+                    counts[position],
+                )
+                for _, negative_count, position in heapq.nsmallest(limit, candidates)
+            ]
+
+    def _hits(self, field_types: Mapping[str, FieldType]) -> Dict[int, int]:
+        """
+        Считает совпавшие поля для всех шаблонов, имеющих общие поля с формой.
+
+        :param field_types: Типы полей формы.
+        :return: Словарь позиция шаблона -> количество совпавших полей.
+        """
+        postings = self._postings
+        field_ids = self.vocabulary.get
+        hits: Dict[int, int] = {}
+
+        for name, field_type in field_types.items():
+            field_id = field_ids(name)
+            if field_id is None:
+                continue
+            for position in postings.get(pack(field_id, TYPE_CODES[field_type]), ()):
+                hits[position] = hits.get(position, 0) + 1
+        return hits
+
+    def _best_position(self, field_types: Mapping[str, FieldType]) -> Optional[int]:
+        """
+        Возвращает позицию наиболее специфичного подходящего шаблона.
+
+        :param field_types: Типы полей формы.
+        :return: Позиция шаблона или `None`.
+        """
+        counts = self._field_counts
+        best = self._empty[0] if self._empty else None
+        best_count = 0
+
+        for position, count in self._hits(field_types).items():
+            if count == counts[position] and (
+                count > best_count or (count == best_count and position < best)
+            ):
+                best, best_count = position, count
+        return best
+
+    def _match_position(self, field_types: Mapping[str, FieldType]) -> Optional[int]:
+        """
+        Возвращает позицию первого подходящего шаблона.
+
+        :param field_types: Типы полей формы.
+        :return: Позиция шаблона или `None`.
+        """
+        best = self._empty[0] if self._empty else None
+        counts = self._field_counts
+        postings = self._postings
+        field_ids = self.vocabulary.get
+        hits: Dict[int, int] = {}
+
+        for name, field_type in field_types.items():
+            field_id = field_ids(name)
+            if field_id is None:
+                continue
+            positions = postings.get(pack(field_id, TYPE_CODES[field_type]))
+            if not positions:
+                continue
+            for position in positions:
+                # Списки позиций отсортированы: дальше только шаблоны,
+                # которые не могут оказаться раньше уже найденного.
+                if best is not None and position >= best:
+                    break
+                count = hits.get(position, 0) + 1
+                if count == counts[position]:
+                    best = position
+                hits[position] = count
+
+        return best
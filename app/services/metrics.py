@@ -0,0 +1,306 @@
+"""
+Метрики сервиса в текстовом формате Prometheus.
+
+Собираются гистограммы длительности этапов обработки формы, время
+загрузки каталога из хранилища, счетчики найденных и ненайденных
+шаблонов, число совпадений по каждому шаблону и размер каталога.
+
+Метрики включаются переменной `METRICS_ENABLED`. Если они выключены,
+вызовы инструментирования сводятся к проверке флага и не обращаются
+к часам. Метрики хранятся в памяти процесса: при многопроцессном
+запуске каждый воркер отдает свои значения.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.metrics import MetricsConfig
+
+#: Границы интервалов гистограмм длительности (в секундах)
+LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+#: Тип содержимого ответа `/metrics`
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Монотонный счетчик с необязательной меткой.
+
+    Атрибуты:
+    - `name`: Имя метрики.
+    - `label`: Имя метки (`None` — без метки).
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str = "", amount: float = 1) -> None:
+        """
+        Увеличивает счетчик.
+
+        :param label_value: Значение метки.
+        :param amount: Величина увеличения.
+        """
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str = "") -> float:
+        return self._values.get(label_value, 0)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_value, value in values:
+            yield self.name, self._pairs(label_value), value
+
+    def _pairs(self, label_value: str) -> List[Tuple[str, str]]:
+        return [(self.label, label_value)] if self.label else []
+
+
+class Gauge(Counter):
+    """
+    Значение, которое может как расти, так и уменьшаться.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, label_value: str = "") -> None:
+        """
+        Устанавливает значение.
+
+        :param value: Новое значение.
+        :param label_value: Значение метки.
+        """
+        with self._lock:
+            self._values[label_value] = value
+
+
+class Histogram(Counter):
+    """
+    Гистограмма значений с фиксированными границами интервалов.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label: Optional[str] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List[float]] = {}
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        """
+        Добавляет наблюдение.
+
+        :param value: Наблюдаемое значение.
+        :param label_value: Значение метки.
+        """
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Счетчики интервалов (последний — `+Inf`), затем количество
+                # и сумма наблюдений.
+                series = self._series[label_value] = [0] * (len(self.buckets) + 3)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, label_value: str = "") -> int:
+        series = self._series.get(label_value)
+        return series[-2] if series else 0
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        with self._lock:
+            series = sorted((key, list(value)) for key, value in self._series.items())
+        for label_value, values in series:
+            pairs = self._pairs(label_value)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                yield f"{self.name}_bucket", pairs + [
+                    ("le", _number(bound))
+                ], cumulative
+            yield f"{self.name}_count", pairs, values[-2]
+            yield f"{self.name}_sum", pairs, values[-1]
+
+
+class Metrics:
+    """
+    Реестр метрик сервиса.
+
+    Атрибуты:
+    - `enabled`: Собираются ли метрики.
+    - `stage_seconds`: Длительность этапов обработки `/get_form`
+      (`parse`, `detect`, `load`, `match`, `serialize`, `total`).
+    - `storage_load_seconds`: Время загрузки каталога из хранилища.
+    - `forms`: Обработанные формы по результату (`matched`, `unmatched`).
+    - `template_matches`: Совпадения по именам шаблонов.
+    - `templates`: Количество шаблонов в загруженном каталоге.
+    - `result_cache_lookups`: Обращения к кешу результатов подбора
+      (`hit`, `miss`).
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stage_seconds = Histogram(
+            "form_stage_duration_seconds",
+            "Duration of form processing stages.",
+            "stage",
+        )
+        self.storage_load_seconds = Histogram(
+            "template_storage_load_duration_seconds",
+            "Duration of template catalog loads from storage.",
+        )
+        self.forms = Counter(
+            "forms_processed_total", "Processed forms by result.", "result"
+        )
+        self.template_matches = Counter(
+            "template_matches_total", "Matched forms by template.", "template"
+        )
+        self.templates = Gauge(
+            "template_catalog_size", "Number of templates in the loaded catalog."
+        )
+        self.result_cache_lookups = Counter(
+            "result_cache_lookups_total", "Match result cache lookups.", "result"
+        )
+        self._metrics = (
+            self.stage_seconds,
+            self.storage_load_seconds,
+            self.forms,
+            self.template_matches,
+            self.templates,
+            self.result_cache_lookups,
+        )
+
+    def now(self) -> float:
+        """
+        Возвращает отметку времени для измерения этапа (0, если метрики выключены).
+
+        :return: Значение `time.perf_counter()` или 0.
+        """
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stage(self, name: str, started: float) -> float:
+        """
+        Записывает длительность этапа, начавшегося в `started`.
+
+        :param name: Имя этапа.
+        :param started: Отметка начала этапа (см. `now`).
+        :return: Отметка конца этапа, она же начало следующего.
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        self.stage_seconds.observe(now - started, name)
+        return now
+
+    def result(self, template_name: Optional[str] = None) -> None:
+        """
+        Учитывает результат обработки формы.
+
+        :param template_name: Имя найденного шаблона (`None` — не найден).
+        """
+        if not self.enabled:
+            return
+        if template_name is None:
+            self.forms.inc("unmatched")
+        else:
+            self.forms.inc("matched")
+            self.template_matches.inc(template_name)
+
+    def result_cache(self, hit: bool) -> None:
+        """
+        Учитывает обращение к кешу результатов подбора.
+
+        :param hit: Найден ли результат в кеше.
+        """
+        if self.enabled:
+            self.result_cache_lookups.inc("hit" if hit else "miss")
+
+    def catalog_loaded(self, seconds: float, size: int) -> None:
+        """
+        Учитывает загрузку каталога из хранилища.
+
+        :param seconds: Длительность загрузки.
+        :param size: Количество загруженных шаблонов.
+        """
+        if not self.enabled:
+            return
+        self.storage_load_seconds.observe(seconds)
+        self.templates.set(size)
+
+    def catalog_size(self, size: int) -> None:
+        """
+        Обновляет размер каталога после изменения шаблонов.
+
+        :param size: Количество шаблонов.
+        """
+        if self.enabled:
+            self.templates.set(size)
+
+    def render(self) -> str:
+        """
+        Возвращает значения всех метрик в текстовом формате Prometheus.
+
+        :return: Текст для ответа `/metrics`.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, pairs, value in metric.samples():
+                lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+#: Метрики процесса
+metrics = Metrics(MetricsConfig().get_params()["ENABLED"])
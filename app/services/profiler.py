@@ -0,0 +1,313 @@
+"""
+Статистический профилировщик запросов.
+
+Пока профилируемый запрос выполняется, фоновый поток с интервалом
+`interval` снимает стек потока, обрабатывающего запрос (цикла событий),
+и считает одинаковые стеки. Профиль сохраняется в формате collapsed
+stacks (`корень;...;лист количество` — по строке на стек), который
+принимают `flamegraph.pl`, speedscope и аналогичные инструменты.
+
+Сохраняются запросы, выбранные случайно с вероятностью `sample_rate`,
+и запросы дольше `slow_seconds`. Чтобы поймать медленный запрос, стеки
+снимаются со всех запросов, пока задан порог длительности, а профили
+быстрых запросов отбрасываются. В каталоге хранятся `max_files`
+последних профилей. Из асинхронного кода профиль сохраняется в пуле
+потоков (`afinish`), чтобы запись файлов не блокировала цикл событий.
+
+Цикл событий обрабатывает запросы конкурентно, поэтому в профиль попадает
+все, что поток выполнял за время запроса, включая работу других запросов.
+"""
+
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Set
+
+#: Расширение файлов профилей
+PROFILE_SUFFIX = ".collapsed"
+
+
+class Recording:
+    """
+    Стеки, снятые за время одного запроса.
+
+    Атрибуты:
+    - `thread_id`: Поток, стек которого снимается.
+    - `sampled`: Выбран ли запрос случайно (сохраняется независимо от длительности).
+    - `started`: Время начала запроса (`time.perf_counter()`).
+    - `stacks`: Количество снимков по каждому стеку.
+    """
+
+    __slots__ = ("thread_id", "sampled", "started", "stacks")
+
+    def __init__(self, thread_id: int, sampled: bool):
+        self.thread_id = thread_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+
+
+class StackSampler:
+    """
+    Фоновый поток, снимающий стеки для активных записей.
+
+    Поток запускается при первой записи и простаивает, пока записей нет.
+    """
+
+    def __init__(self, interval: float):
+        """
+        :param interval: Интервал между снимками в секундах.
+        """
+        self.interval = interval
+        self._recordings: Set[Recording] = set()
+        self._labels: Dict[CodeType, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, recording: Recording) -> None:
+        """
+        Начинает снимать стеки для записи.
+
+        :param recording: Запись запроса.
+        """
+        with self._lock:
+            self._recordings.add(recording)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+            self._wakeup.set()
+
+    def remove(self, recording: Recording) -> None:
+        """
+        Прекращает снимать стеки для записи.
+
+        :param recording: Запись запроса.
+        """
+        with self._lock:
+            self._recordings.discard(recording)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                recordings = list(self._recordings)
+                if not recordings:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            for recording in recordings:
+                frame = frames.get(recording.thread_id)
+                if frame is not None:
+                    recording.stacks[self._collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    def _collapse(self, frame: Optional[FrameType]) -> str:
+        """
+        Сворачивает стек в строку от корня к листу.
+
+        :param frame: Текущий кадр потока.
+        :return: Строка `кадр;кадр;...`.
+        """
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _label(code)
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+
+class Profiler:
+    """
+    Профилировщик запросов с настройками, изменяемыми во время работы.
+
+    Атрибуты:
+    - `enabled`: Включено ли профилирование.
+    - `sample_rate`: Доля запросов, профилируемых случайно.
+    - `slow_seconds`: Порог длительности запроса (0 — не отбирать по длительности).
+    - `directory`: Каталог для файлов профилей.
+    - `max_files`: Количество хранимых профилей.
+    """
+
+    def __init__(
+        self,
+        ENABLED: bool = False,
+        SAMPLE_RATE: float = 0.01,
+        SLOW_MS: float = 250.0,
+        INTERVAL_MS: float = 5.0,
+        DIR: str = "profiles",
+        MAX_FILES: int = 100,
+    ):
+        """
+        Инициализация профилировщика параметрами `ProfilingConfig`.
+
+        :param ENABLED: Включено ли профилирование.
+        :param SAMPLE_RATE: Доля запросов, профилируемых случайно.
+        :param SLOW_MS: Порог длительности запроса в миллисекундах.
+        :param INTERVAL_MS: Интервал снятия стеков в миллисекундах.
+        :param DIR: Каталог для файлов профилей.
+        :param MAX_FILES: Количество хранимых профилей.
+        """
+        self.enabled = ENABLED
+        self.sample_rate = SAMPLE_RATE
+        self.slow_seconds = SLOW_MS / 1000
+        self.directory = DIR
+        self.max_files = MAX_FILES
+        self.sampler = StackSampler(INTERVAL_MS / 1000)
+        self._sequence = 0
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Возвращает текущие настройки.
+
+        :return: Словарь с ключами `enabled`, `sample_rate`, `slow_ms`.
+        """
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_seconds * 1000,
+        }
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+    ) -> None:
+        """
+        Изменяет настройки; `None` оставляет значение без изменений.
+
+        :param enabled: Включено ли профилирование.
+        :param sample_rate: Доля запросов, профилируемых случайно.
+        :param slow_ms: Порог длительности запроса в миллисекундах.
+        """
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_ms is not None:
+            self.slow_seconds = slow_ms / 1000
+        if enabled is not None:
+            self.enabled = enabled
+
+    def start(self) -> Optional[Recording]:
+        """
+        Начинает профилирование запроса в текущем потоке, если он отобран.
+
+        :return: Запись запроса или `None`, если запрос не профилируется.
+        """
+        if not self.enabled:
+            return None
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_seconds:
+            return None
+        recording = Recording(threading.get_ident(), sampled)
+        self.sampler.add(recording)
+        return recording
+
+    def finish(self, recording: Recording, label: str) -> Optional[str]:
+        """
+        Завершает профилирование запроса и сохраняет профиль, если запрос
+        был выбран случайно или оказался медленным.
+
+        :param recording: Запись запроса.
+        :param label: Описание запроса для имени файла (например, `POST /get_form`).
+        :return: Путь к файлу профиля или `None`, если профиль не сохранен.
+        """
+        name = self._stop(recording, label)
+        if name is None:
+            return None
+        return self._write(recording.stacks, name)
+
+    async def afinish(self, recording: Recording, label: str) -> Optional[str]:
+        """
+        Асинхронная версия `finish`: профиль записывается в пуле потоков.
+
+        :param recording: Запись запроса.
+        :param label: Описание запроса для имени файла.
+        :return: Путь к файлу профиля или `None`, если профиль не сохранен.
+        """
+        name = self._stop(recording, label)
+        if name is None:
+            return None
+        return await asyncio.to_thread(self._write, recording.stacks, name)
+
+    def profiles(self) -> List[str]:
+        """
+        Возвращает пути сохраненных профилей, от старых к новым.
+
+        :return: Список путей.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        paths = [
+            os.path.join(self.directory, name)
+            for name in names
+            if name.endswith(PROFILE_SUFFIX)
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def _stop(self, recording: Recording, label: str) -> Optional[str]:
+        """
+        Прекращает снимать стеки и решает, сохранять ли профиль.
+
+        :param recording: Запись запроса.
+        :param label: Описание запроса.
+        :return: Имя файла профиля или `None`, если профиль не сохраняется.
+        """
+        self.sampler.remove(recording)
+        duration = time.perf_counter() - recording.started
+        slow = self.slow_seconds and duration >= self.slow_seconds
+        if not (recording.sampled or slow) or not recording.stacks:
+            return None
+        self._sequence += 1
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        return (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._sequence}"
+            f"-{slug}-{duration * 1000:.0f}ms{PROFILE_SUFFIX}"
+        )
+
+    def _write(self, stacks: Counter, name: str) -> str:
+        """
+        Записывает профиль и удаляет самые старые профили сверх `max_files`.
+
+        :param stacks: Количество снимков по стекам.
+        :param name: Имя файла профиля.
+        :return: Путь к файлу профиля.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        for old in self.profiles()[: -self.max_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+
+def _label(code: CodeType) -> str:
+    """
+    Возвращает подпись кадра: функция и ее расположение.
+
+    :param code: Объект кода функции.
+    :return: Строка вида `process_form (app/services/form_service.py:89)`.
+    """
+    filename = code.co_filename.removeprefix(os.getcwd() + os.sep)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
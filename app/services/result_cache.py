@@ -0,0 +1,111 @@
+"""
+Кеш результатов подбора шаблонов по набору типизированных полей формы.
+
+Результат подбора зависит только от множества пар (имя поля, тип поля),
+а не от значений, поэтому разные отправки одной и той же формы имеют
+одну сигнатуру. Кеш хранит для сигнатуры найденный шаблон или отметку
+«не найден» и привязан к снимку каталога: к объекту индекса и номеру
+его ревизии. После перезагрузки каталога или изменения индекса на месте
+кеш очищается при первом обращении.
+"""
+
+import sys
+import threading
+from typing import Any, Dict, FrozenSet, Hashable, Mapping, Optional, Tuple, Union
+
+from app.core.lru import LRUCache
+from app.models.field_validator import FieldType
+from app.models.form_template import FormTemplate
+
+#: Отметка «подходящий шаблон не найден»
+NO_MATCH = "no match"
+
+#: Сигнатура формы: режим подбора и множество пар (поле, тип)
+Signature = Tuple[str, FrozenSet[Tuple[str, FieldType]]]
+
+
+def signature(field_types: Mapping[str, FieldType], match: str = "first") -> Signature:
+    """
+    Возвращает каноническую сигнатуру формы, не зависящую от порядка полей.
+
+    :param field_types: Типы полей формы.
+    :param match: Режим подбора.
+    :return: Хешируемая сигнатура.
+    """
+    return match, frozenset(field_types.items())
+
+
+class ResultCache:
+    """
+    Ограниченный LRU-кеш результатов подбора, привязанный к снимку каталога.
+
+    Атрибуты:
+    - `_cache`: Кеш сигнатура -> шаблон или `NO_MATCH`.
+    - `_snapshot`: Индекс и ревизия, для которых действительны записи.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0):
+        """
+        :param max_entries: Максимальное число записей.
+        :param max_bytes: Максимальный суммарный размер ключей в байтах.
+        """
+        self._cache: LRUCache[Signature, Union[FormTemplate, str]] = LRUCache(
+            max_entries, max_bytes=max_bytes
+        )
+        self._snapshot: Optional[Tuple[Any, Hashable]] = None
+        self._lock = threading.Lock()
+
+    def get(self, index: Any, key: Signature) -> Optional[Union[FormTemplate, str]]:
+        """
+        Возвращает сохраненный результат для снимка каталога.
+
+        :param index: Индекс, по которому выполняется подбор.
+        :param key: Сигнатура формы.
+        :return: Шаблон, `NO_MATCH` или `None`, если результата нет.
+        """
+        revision = _revision(index)
+        if not self._is_current(index, revision):
+            with self._lock:
+                if not self._is_current(index, revision):
+                    self._cache.clear()
+                    self._snapshot = (index, revision)
+        return self._cache.get(key)
+
+    def put(
+        self,
+        index: Any,
+        revision: Hashable,
+        key: Signature,
+        result: Union[FormTemplate, str],
+    ) -> None:
+        """
+        Сохраняет результат, если снимок каталога не изменился с момента
+        начала подбора.
+
+        :param index: Индекс, по которому выполнен подбор.
+        :param revision: Ревизия индекса на момент начала подбора.
+        :param key: Сигнатура формы.
+        :param result: Шаблон или `NO_MATCH`.
+        """
+        if self._is_current(index, revision) and _revision(index) == revision:
+            self._cache.put(key, result, _key_size(key))
+
+    def _is_current(self, index: Any, revision: Hashable) -> bool:
+        snapshot = self._snapshot
+        return snapshot is not None and snapshot[0] is index and snapshot[1] == revision
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кеша.
+
+        :return: Словарь с ключами `hits`, `misses`, `hit_rate`, `entries`, `bytes`.
+        """
+        return self._cache.stats()
+
+
+def _revision(index: Any) -> Hashable:
+    return getattr(index, "revision", 0)
+
+
+def _key_size(key: Signature) -> int:
+    return sys.getsizeof(key[1]) + sum(sys.getsizeof(name) for name, _ in key[1])
@@ -0,0 +1,335 @@
+"""
+Бинарный снимок каталога шаблонов.
+
+Снимок содержит словарь имен полей, записи шаблонов и готовый
+инвертированный индекс в виде плоских массивов `uint32`. Файл
+отображается в память (`mmap`), и `SnapshotIndex` выполняет подбор
+прямо по этим массивам: при открытии разбирается только словарь имен
+полей, а шаблоны декодируются лишь при выдаче результата. Процессы,
+открывшие один снимок, разделяют его страницы через страничный кеш ОС.
+
+Формат (little-endian):
+- заголовок: сигнатура `FORMSNAP`, версия формата, число секций, число
+  шаблонов, CRC32 данных после заголовка и таблица секций (смещение и
+  длина каждой секции в байтах);
+- секции (`SECTIONS`), выровненные по 8 байтам:
+  - `vocabulary_offsets`, `vocabulary` — имена полей в порядке
+    идентификаторов (границы в UTF-8 блоке);
+  - `name_offsets`, `names` — имена шаблонов в порядке хранилища;
+  - `field_offsets`, `fields` — упакованные пары (поле, тип) шаблонов;
+  - `field_counts` — количество полей каждого шаблона;
+  - `posting_keys`, `posting_offsets`, `positions` — отсортированные
+    упакованные пары и списки позиций шаблонов для каждой из них;
+  - `empty` — позиции шаблонов без полей;
+  - `type_offsets`, `types` — имена типов полей по кодам, использованным
+    в снимке (пустое имя для неиспользованных кодов); при открытии они
+    сверяются с реестром типов процесса.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.exceptions import SnapshotError
+from app.models.compact import TYPE_NAMES, CompactTemplate, FieldVocabulary, unpack
+from app.models.form_template import FormTemplate
+from app.services.matcher import TemplateIndex
+
+#: Сигнатура файла снимка
+MAGIC = b"FORMSNAP"
+
+#: Версия формата снимка
+FORMAT_VERSION = 2
+
+#: Секции снимка в порядке записи
+SECTIONS: Tuple[str, ...] = (
+    "vocabulary_offsets",
+    "vocabulary",
+    "name_offsets",
+    "names",
+    "field_offsets",
+    "fields",
+    "field_counts",
+    "posting_keys",
+    "posting_offsets",
+    "positions",
+    "empty",
+    "type_offsets",
+    "types",
+)
+
+#: Секции с байтовыми строками; остальные — массивы `uint32`
+BYTE_SECTIONS = frozenset({"vocabulary", "names", "types"})
+
+_HEADER = struct.Struct("<8sIIQI4x")
+_SECTION = struct.Struct("<QQ")
+_HEADER_SIZE = _HEADER.size + _SECTION.size * len(SECTIONS)
+_ALIGNMENT = 8
+
+
+def write_snapshot(path: str, templates: Iterable[FormTemplate]) -> int:
+    """
+    Записывает снимок каталога.
+
+    Файл записывается во временный файл рядом с `path` и атомарно
+    заменяет его, поэтому процессы, открывшие предыдущий снимок,
+    продолжают работать с ним.
+
+    :param path: Путь к файлу снимка.
+    :param templates: Шаблоны в порядке, в котором они должны проверяться.
+    :return: Количество шаблонов в снимке.
+    """
+    vocabulary = FieldVocabulary()
+    names = bytearray()
+    sections: Dict[str, array] = {
+        name: array("I", [0]) if name.endswith("_offsets") else array("I")
+        for name in SECTIONS
+        if name not in BYTE_SECTIONS
+    }
+    postings: Dict[int, array] = {}
+    count = 0
+
+    for position, template in enumerate(templates):
+        compact = CompactTemplate.from_template(template, vocabulary)
+        names += compact.name.encode("utf-8")
+        sections["name_offsets"].append(len(names))
+        sections["fields"].fromlist(compact.fields.tolist())
+        sections["field_offsets"].append(len(sections["fields"]))
+        sections["field_counts"].append(len(compact))
+        if not len(compact):
+            sections["empty"].append(position)
+        for key in compact.fields:
+            postings.setdefault(key, array("I")).append(position)
+        count += 1
+
+    field_names = bytearray()
+    for field_id in range(len(vocabulary)):
+        field_names += vocabulary.name(field_id).encode("utf-8")
+        sections["vocabulary_offsets"].append(len(field_names))
+    for key in sorted(postings):
+        sections["posting_keys"].append(key)
+        sections["positions"].extend(postings[key])
+        sections["posting_offsets"].append(len(sections["positions"]))
+
+    type_names = bytearray()
+    used = {unpack(key)[1] for key in postings}
+    for type_code in range(max(used, default=-1) + 1):
+        if type_code in used:
+            type_names += TYPE_NAMES[type_code].encode("utf-8")
+        sections["type_offsets"].append(len(type_names))
+
+    data: Dict[str, bytes] = {
+        "vocabulary": bytes(field_names),
+        "names": bytes(names),
+        "types": bytes(type_names),
+    }
+    for name, values in sections.items():
+        if sys.byteorder != "little":
+            values.byteswap()
+        data[name] = values.tobytes()
+
+    table = []
+    body = bytearray()
+    for name in SECTIONS:
+        table.append((_HEADER_SIZE + len(body), len(data[name])))
+        body += data[name]
+        body += bytes(-len(body) % _ALIGNMENT)
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(SECTIONS), count, zlib.crc32(body))
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        for offset, length in table:
+            f.write(_SECTION.pack(offset, length))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return count
+
+
+class _SnapshotTemplates:
+    """
+    Последовательность компактных шаблонов, декодируемых из снимка по запросу.
+    """
+
+    __slots__ = ("_names", "_name_offsets", "_fields", "_field_offsets")
+
+    def __init__(
+        self,
+        names: memoryview,
+        name_offsets: memoryview,
+        fields: memoryview,
+        field_offsets: memoryview,
+    ):
+        self._names = names
+        self._name_offsets = name_offsets
+        self._fields = fields
+        self._field_offsets = field_offsets
+
+    def __len__(self) -> int:
+        return len(self._name_offsets) - 1
+
+    def __getitem__(self, position: int) -> CompactTemplate:
+        start, end = self._name_offsets[position], self._name_offsets[position + 1]
+        name = str(self._names[start:end], "utf-8")
+        start, end = self._field_offsets[position], self._field_offsets[position + 1]
+        return CompactTemplate(name, self._fields[start:end])
+
+    def __iter__(self) -> Iterator[CompactTemplate]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+class _SnapshotPostings:
+    """
+    Списки позиций шаблонов по упакованным парам (поле, тип) из снимка.
+    """
+
+    __slots__ = ("_keys", "_offsets", "_positions")
+
+    def __init__(self, keys: memoryview, offsets: memoryview, positions: memoryview):
+        self._keys = keys
+        self._offsets = offsets
+        self._positions = positions
+
+    def get(self, key: int, default=None):
+        """
+        Возвращает позиции шаблонов, содержащих пару.
+
+        :param key: Упакованная пара (поле, тип).
+        :param default: Значение, если пары нет в каталоге.
+        :return: Отсортированные позиции шаблонов или `default`.
+        """
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return default
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._positions[start:end]
+
+
+class SnapshotIndex(TemplateIndex):
+    """
+    Индекс шаблонов поверх отображенного в память снимка.
+
+    Подбор выполняется теми же алгоритмами, что и в `TemplateIndex`,
+    но списки позиций, количества полей и шаблоны читаются прямо из
+    файла. Индекс доступен только для чтения и не требует блокировок;
+    для изменения каталога снимок собирается заново.
+
+    Атрибуты:
+    - `path`: Путь к файлу снимка.
+    - `checksum`: CRC32 данных снимка из заголовка.
+    """
+
+    def __init__(self, path: str):
+        """
+        Открывает снимок.
+
+        :param path: Путь к файлу снимка.
+        :raises SnapshotError: Если файл не является снимком поддерживаемой версии.
+        """
+        if sys.byteorder != "little":
+            raise SnapshotError("Snapshots can only be used on little-endian hosts.")
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"Snapshot {path} is empty.")
+        self.checksum, sections = _read_sections(self._mmap, path)
+        _check_types(sections["types"], sections["type_offsets"], path)
+
+        self.vocabulary = FieldVocabulary()
+        offsets = sections["vocabulary_offsets"]
+        for field_id in range(len(offsets) - 1):
+            start, end = offsets[field_id], offsets[field_id + 1]
+            self.vocabulary.intern(str(sections["vocabulary"][start:end], "utf-8"))
+
+        self._templates = _SnapshotTemplates(
+            sections["names"],
+            sections["name_offsets"],
+            sections["fields"],
+            sections["field_offsets"],
+        )
+        self._field_counts = sections["field_counts"]
+        self._postings = _SnapshotPostings(
+            sections["posting_keys"],
+            sections["posting_offsets"],
+            sections["positions"],
+        )
+        self._empty = sections["empty"]
+        self._names: Optional[Dict[str, List[int]]] = None
+        self._removed = 0
+        self.revision = 0
+        self._lock = nullcontext()
+
+    def verify_checksum(self) -> bool:
+        """
+        Проверяет, что данные снимка не повреждены.
+
+        :return: `True`, если CRC32 данных совпадает с заголовком.
+        """
+        return zlib.crc32(memoryview(self._mmap)[_HEADER_SIZE:]) == self.checksum
+
+    def upsert(self, templates: Iterable[FormTemplate]) -> None:
+        raise TypeError("Snapshot index is read-only; rebuild the snapshot.")
+
+    def delete(self, names: Iterable[str]) -> int:
+        raise TypeError("Snapshot index is read-only; rebuild the snapshot.")
+
+
+def _check_types(types: memoryview, offsets: memoryview, path: str) -> None:
+    """
+    Сверяет коды типов полей снимка с реестром типов процесса.
+
+    :param types: Имена типов снимка в UTF-8.
+    :param offsets: Границы имен по кодам.
+    :param path: Путь к файлу (для сообщений об ошибках).
+    :raises SnapshotError: Если код типа в снимке означает другой тип.
+    """
+    for type_code in range(len(offsets) - 1):
+        start, end = offsets[type_code], offsets[type_code + 1]
+        name = str(types[start:end], "utf-8")
+        if name and (type_code >= len(TYPE_NAMES) or TYPE_NAMES[type_code] != name):
+            raise SnapshotError(
+                f"Snapshot {path} uses field type '{name}' that is not registered"
+                f" with code {type_code}; rebuild the snapshot or enable the type."
+            )
+
+
+def _read_sections(buffer: mmap.mmap, path: str) -> Tuple[int, Dict[str, memoryview]]:
+    """
+    Разбирает заголовок снимка и возвращает представления секций.
+
+    :param buffer: Отображенный в память файл.
+    :param path: Путь к файлу (для сообщений об ошибках).
+    :return: Кортеж `(checksum, секции)`.
+    :raises SnapshotError: Если заголовок или таблица секций некорректны.
+    """
+    if len(buffer) < _HEADER_SIZE:
+        raise SnapshotError(f"Snapshot {path} is truncated.")
+    magic, version, section_count, _, checksum = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a template snapshot.")
+    if version != FORMAT_VERSION or section_count != len(SECTIONS):
+        raise SnapshotError(
+            f"Snapshot {path} has unsupported format version {version}."
+        )
+
+    view = memoryview(buffer)
+    sections = {}
+    for i, name in enumerate(SECTIONS):
+        offset, length = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+        end = offset + length
+        if end > len(buffer) or (name not in BYTE_SECTIONS and length % 4):
+            raise SnapshotError(f"Snapshot {path} is truncated.")
+        section = view[offset:end]
+        sections[name] = section if name in BYTE_SECTIONS else section.cast("I")
+    return checksum, sections
@@ -1,7 +1,10 @@
-from app.storage.mongodb import MongoDBStorage
 from app.storage.registry import StorageRegistry
-from app.storage.tinydb import TinyDBStorage
 
-# Регистрация хранилищ
-StorageRegistry.register("TinyDB", TinyDBStorage)
-StorageRegistry.register("MongoDB", MongoDBStorage)
+# Регистрация хранилищ: модули импортируются при первом обращении
+StorageRegistry.register("TinyDB", "app.storage.tinydb.TinyDBStorage")
+StorageRegistry.register("MongoDB", "app.storage.mongodb.MongoDBStorage")
+StorageRegistry.register(
+    "AsyncMongoDB", "app.storage.async_mongodb.AsyncMongoDBStorage"
+)
+StorageRegistry.register("IndexedFile", "app.storage.indexed_file.IndexedFileStorage")
+StorageRegistry.register("Snapshot", "app.storage.snapshot.SnapshotStorage")
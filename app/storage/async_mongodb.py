@@ -0,0 +1,307 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from pymongo import ASCENDING, AsyncMongoClient
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+
+from app.core.exceptions import StorageUnavailableError
+from app.models.form_template import FieldType, FormTemplate
+from app.storage.base import AsyncStorage
+from app.storage.mongodb import (
+    FIELDS_KEY,
+    LAST_ORDER,
+    LOCK_ID,
+    NORMALIZED_KEY,
+    ORDER_KEY,
+    STAGING_SUFFIX,
+    TEMPLATE_PROJECTION,
+    MongoDBStorage,
+    PoolStats,
+    candidate_query,
+    client_options,
+    supports_transactions,
+    upsert_documents,
+    upsert_operations,
+    warn_unless_normalized,
+)
+from app.storage.circuit import CircuitBreaker
+
+T = TypeVar("T")
+
+
+class AsyncMongoDBStorage(AsyncStorage):
+    """
+    Асинхронная реализация хранилища на основе MongoDB.
+
+    Использует асинхронный клиент pymongo с пулом соединений, поэтому
+    запросы к MongoDB не блокируют цикл событий. Формат данных и
+    отслеживание версии, атомарные изменения каталога, параметры клиента
+    и автоматический выключатель совпадают с `MongoDBStorage`.
+    """
+
+    def __init__(
+        self,
+        HOST: str,
+        NAME: str,
+        COLLECTION: str,
+        BREAKER_THRESHOLD: int = 5,
+        BREAKER_RESET_TIMEOUT: float = 30.0,
+        **options,
+    ):
+        """
+        Инициализация асинхронного хранилища MongoDB.
+
+        Соединения открываются лениво, при первом запросе.
+
+        :param HOST: Адрес подключения к MongoDB.
+        :param NAME: Имя базы данных.
+        :param COLLECTION: Имя коллекции в базе данных.
+        :param BREAKER_THRESHOLD: Количество ошибок соединения подряд
+                                  до приостановки обращений.
+        :param BREAKER_RESET_TIMEOUT: Время в секундах до повторной попытки.
+        :param options: Параметры пула и таймаутов (см. `client_options`).
+        """
+        self.pool_stats = PoolStats()
+        self.breaker = CircuitBreaker(
+            (ConnectionFailure,), BREAKER_THRESHOLD, BREAKER_RESET_TIMEOUT
+        )
+        self.client = AsyncMongoClient(
+            HOST, event_listeners=[self.pool_stats], **client_options(**options)
+        )
+        self.database = self.client[NAME]
+        self.collection_name = COLLECTION
+        self.collection = self.database[COLLECTION]
+        self.meta = self.database[f"{COLLECTION}_meta"]
+        self.transactions: Optional[bool] = None
+        self.normalized: Optional[bool] = None
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние выключателя и статистику пула соединений
+        (см. `MongoDBStorage.health`).
+
+        :return: Словарь с ключами `state`, `failures`, `last_error`, `pool`.
+        """
+        return {**self.breaker.as_dict(), "pool": self.pool_stats.as_dict()}
+
+    async def close(self) -> None:
+        """
+        Закрывает клиент MongoDB (соединения и фоновые задачи мониторинга).
+        """
+        await self.client.close()
+
+    async def get_templates(self) -> List[FormTemplate]:
+        """
+        Возвращает список всех шаблонов из коллекции в порядке каталога
+        (см. `MongoDBStorage.get_templates`).
+
+        :return: Список объектов `FormTemplate`, созданных из записей коллекции.
+        """
+        with self.breaker:
+            cursor = self.collection.find({}, TEMPLATE_PROJECTION).sort(
+                ORDER_KEY, ASCENDING
+            )
+            return [FormTemplate(**template) async for template in cursor]
+
+    async def find_templates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> List[FormTemplate]:
+        """
+        Возвращает шаблоны, подходящие форме, отбирая их на стороне MongoDB
+        (см. `MongoDBStorage.find_templates`).
+
+        :param field_types: Типы полей формы.
+        :return: Шаблоны-кандидаты в порядке каталога.
+        """
+        if not await self.is_normalized():
+            return await self.get_templates()
+        with self.breaker:
+            cursor = (
+                self.collection.find(candidate_query(field_types), TEMPLATE_PROJECTION)
+                .sort(ORDER_KEY, ASCENDING)
+                .batch_size(MongoDBStorage.BATCH_SIZE)
+            )
+            return [FormTemplate(**template) async for template in cursor]
+
+    async def is_normalized(self) -> bool:
+        """
+        Переведена ли коллекция в нормализованный формат
+        (см. `MongoDBStorage.is_normalized`).
+
+        :return: `True`, если миграция выполнена.
+        """
+        if not self.normalized:
+            with self.breaker:
+                meta = await self.meta.find_one(
+                    {"_id": MongoDBStorage.VERSION_ID}, {NORMALIZED_KEY: 1}
+                )
+            self.normalized = warn_unless_normalized(
+                meta, self.collection_name, self.normalized
+            )
+        return self.normalized
+
+    async def get_version(self) -> Tuple[int, int]:
+        """
+        Возвращает версию каталога: значение счетчика и число документов.
+
+        :return: Кортеж `(version, count)`.
+        """
+        with self.breaker:
+            meta = await self.meta.find_one(
+                {"_id": MongoDBStorage.VERSION_ID}, {"version": 1}
+            )
+            count = await self.collection.estimated_document_count()
+            return (meta or {}).get("version", 0), count
+
+    async def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Добавляет или заменяет шаблоны по именам
+        (см. `MongoDBStorage.upsert_templates`).
+
+        :param templates: Список шаблонов.
+        """
+        if not templates:
+            return
+
+        async def upsert(
+            collection: AsyncCollection, session: Optional[AsyncClientSession]
+        ) -> None:
+            cursor = collection.find(
+                {"name": {"$in": [template.name for template in templates]}},
+                {"name": 1, ORDER_KEY: 1},
+                session=session,
+            )
+            orders = {
+                doc["name"]: doc[ORDER_KEY] async for doc in cursor if ORDER_KEY in doc
+            }
+            last = await collection.find_one(
+                {}, {ORDER_KEY: 1}, sort=LAST_ORDER, session=session
+            )
+            documents = upsert_documents(templates, orders, (last or {}).get(ORDER_KEY))
+            await collection.bulk_write(
+                upsert_operations(documents), ordered=True, session=session
+            )
+
+        with self.breaker:
+            await self._write(upsert)
+
+    async def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам и увеличивает счетчик версии
+        (см. `MongoDBStorage.delete_templates`).
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        query = {"name": {"$in": list(names)}}
+
+        async def delete(
+            collection: AsyncCollection, session: Optional[AsyncClientSession]
+        ) -> int:
+            result = await collection.delete_many(query, session=session)
+            return result.deleted_count
+
+        with self.breaker:
+            if not await self.collection.count_documents(query, limit=1):
+                return 0
+            return await self._write(delete)
+
+    async def bump_version(self, session: Optional[AsyncClientSession] = None) -> None:
+        """
+        Увеличивает счетчик версии каталога (см. `MongoDBStorage.bump_version`).
+
+        :param session: Сессия транзакции, в которой выполняется запись.
+        """
+        with self.breaker:
+            await self.meta.update_one(
+                {"_id": MongoDBStorage.VERSION_ID},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                session=session,
+            )
+
+    async def _write(
+        self,
+        apply: Callable[[AsyncCollection, Optional[AsyncClientSession]], Awaitable[T]],
+    ) -> T:
+        """
+        Атомарно применяет изменение каталога и увеличивает счетчик версии
+        (см. `MongoDBStorage._write`).
+
+        :param apply: Функция, записывающая изменение в переданную коллекцию.
+        :return: Результат `apply`.
+        """
+        if self.transactions is None:
+            self.transactions = supports_transactions(
+                await self.client.admin.command("hello")
+            )
+        if self.transactions:
+            async with self.client.start_session() as session:
+
+                async def transaction(session: AsyncClientSession) -> T:
+                    result = await apply(self.collection, session)
+                    await self.bump_version(session)
+                    return result
+
+                return await session.with_transaction(transaction)
+
+        async with self._write_lock():
+            staging = self.database[self.collection_name + STAGING_SUFFIX]
+            await staging.drop()
+            await self.collection.aggregate([{"$match": {}}, {"$out": staging.name}])
+            result = await apply(staging, None)
+            await staging.create_index([(FIELDS_KEY, ASCENDING)])
+            await staging.create_index([(ORDER_KEY, ASCENDING)])
+            await staging.rename(self.collection_name, dropTarget=True)
+            await self.bump_version()
+            return result
+
+    @asynccontextmanager
+    async def _write_lock(self) -> AsyncIterator[None]:
+        """
+        Блокировка записи каталога, общая для всех процессов
+        (см. `MongoDBStorage._write_lock`).
+
+        :raises StorageUnavailableError: Если блокировку не удалось получить.
+        """
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + MongoDBStorage.LOCK_TIMEOUT
+        while True:
+            now = time.time()
+            try:
+                await self.meta.insert_one(
+                    {
+                        "_id": LOCK_ID,
+                        "owner": owner,
+                        "expires": now + MongoDBStorage.LOCK_LEASE,
+                    }
+                )
+                break
+            except DuplicateKeyError:
+                await self.meta.delete_one({"_id": LOCK_ID, "expires": {"$lt": now}})
+                if time.monotonic() >= deadline:
+                    raise StorageUnavailableError(
+                        "Catalog is being modified by another writer."
+                    )
+                await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            await self.meta.delete_one({"_id": LOCK_ID, "owner": owner})
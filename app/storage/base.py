@@ -1,4 +1,4 @@
-from typing import List, Protocol
+from typing import Hashable, Iterable, List, Optional, Protocol
 
 from app.models.form_template import FormTemplate
 
@@ -15,3 +15,68 @@ class Storage(Protocol):
         :return: Список объектов типа `FormTemplate`.
         """
         pass
+
+    def get_version(self) -> Optional[Hashable]:
+        """
+        Возвращает дешево вычисляемую метку версии данных хранилища.
+
+        Метка меняется при изменении шаблонов и используется кешем для
+        инвалидации. Хранилища, не умеющие отслеживать изменения,
+        возвращают `None`, и кеш полагается только на TTL.
+
+        :return: Метка версии или `None`.
+        """
+        return None
+
+
+class WritableStorage(Storage, Protocol):
+    """
+    Интерфейс хранилища, поддерживающего изменение шаблонов.
+
+    Шаблоны идентифицируются по имени. Каждый вызов применяется атомарно:
+    читатели видят каталог либо до изменения, либо после него целиком.
+    """
+
+    def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Добавляет новые шаблоны и заменяет существующие с теми же именами.
+
+        Замененный шаблон сохраняет свое место в порядке хранилища,
+        новый добавляется в конец.
+
+        :param templates: Список шаблонов.
+        """
+        pass
+
+    def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        pass
+
+
+class AsyncStorage(Protocol):
+    """
+    Асинхронный интерфейс для работы с хранилищами данных.
+
+    Реализации не должны блокировать цикл событий на операциях ввода-вывода.
+    """
+
+    async def get_templates(self) -> List[FormTemplate]:
+        """
+        Получает список всех шаблонов форм.
+
+        :return: Список объектов типа `FormTemplate`.
+        """
+        pass
+
+    async def get_version(self) -> Optional[Hashable]:
+        """
+        Возвращает метку версии данных хранилища (см. `Storage.get_version`).
+
+        :return: Метка версии или `None`.
+        """
+        return None
@@ -0,0 +1,699 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from app.core.exceptions import ReadOnlyStorageError
+from app.models.form_template import FormTemplate
+from app.services.engines import IndexFactory
+from app.services.matcher import TemplateIndex
+from app.services.metrics import metrics
+from app.storage.base import AsyncStorage, Storage
+from app.storage.threaded import is_async_storage, to_async
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """
+    Счетчики работы кеша шаблонов.
+
+    Атрибуты:
+    - `hits`: Запросы, обслуженные из памяти.
+    - `misses`: Загрузки из хранилища при пустом кеше.
+    - `reloads`: Перезагрузки из-за смены версии данных или истечения TTL.
+    - `updates`: Изменения, примененные к загруженному индексу без перезагрузки.
+    - `stale`: Запросы, обслуженные предыдущим снимком, пока новый загружается
+      или хранилище недоступно.
+    """
+
+    __slots__ = ("hits", "misses", "reloads", "updates", "stale")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.updates = 0
+        self.stale = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Возвращает значения счетчиков.
+
+        :return: Словарь с ключами `hits`, `misses`, `reloads`, `updates`, `stale`.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "updates": self.updates,
+            "stale": self.stale,
+        }
+
+
+class _CacheEntry:
+    """
+    Загруженный снимок каталога шаблонов.
+    """
+
+    __slots__ = ("index", "version", "loaded_at", "checked_at")
+
+    def __init__(
+        self,
+        index: TemplateIndex,
+        version: Optional[Hashable],
+        loaded_at: float,
+    ):
+        self.index = index
+        self.version = version
+        self.loaded_at = loaded_at
+        self.checked_at = loaded_at
+
+
+class _Flight:
+    """
+    Выполняющаяся загрузка каталога, результат которой ждут все вызывающие.
+
+    Атрибуты:
+    - `future`: Результат загрузки (`_CacheEntry`) или ее ошибка; доступен
+      как из потоков, так и из корутин (через `asyncio.wrap_future`).
+    - `generation`: Поколение кеша на момент начала загрузки.
+    """
+
+    __slots__ = ("future", "generation")
+
+    def __init__(self, generation: int):
+        self.future: Future = Future()
+        # Запущенный Future нельзя отменить: отмена ожидающей корутины
+        # не должна прерывать загрузку для остальных.
+        self.future.set_running_or_notify_cancel()
+        self.generation = generation
+
+
+class CachedStorage(Storage):
+    """
+    Кеширующая обертка над любым хранилищем шаблонов.
+
+    Держит в памяти индекс для подбора шаблонов, в котором шаблоны хранятся
+    в компактном виде; `get_templates()` восстанавливает из него `FormTemplate`.
+    Кеш перезагружается, если:
+    - истек TTL (`ttl > 0`);
+    - изменилась версия данных, которую хранилище возвращает из
+      `get_version()`; версия проверяется не чаще, чем раз в
+      `check_interval` секунд.
+
+    Пока данные не меняются, запросы не обращаются к хранилищу.
+
+    Загрузка выполняется в одном экземпляре (single-flight): ее выполняет
+    первый вызвавший поток или корутина, остальные ждут тот же результат,
+    если каталог еще не загружен, или получают предыдущий снимок, пока
+    новый не будет подставлен целиком. После ошибки загрузки следующая
+    попытка откладывается на `retry_backoff` секунд с удвоением до
+    `max_retry_backoff`; в это время отдается предыдущий снимок, а при его
+    отсутствии — последняя ошибка. Ошибка проверки версии также не
+    прерывает запрос: он обслуживается предыдущим снимком.
+
+    Если хранилище умеет загружать готовый индекс (`load_index`, например
+    снимок каталога), он используется вместо построения индекса из списка
+    шаблонов (для движка `TemplateIndex`).
+
+    Изменения шаблонов (`upsert_templates`, `delete_templates`) записываются
+    в хранилище и применяются к загруженному индексу на месте, если он
+    это поддерживает (`TemplateIndex`) и до записи был актуален; иначе
+    кеш сбрасывается и следующий запрос загрузит каталог заново.
+
+    Синхронные методы (`get_templates`, `get_index`, `upsert_templates`,
+    `delete_templates`) доступны только для синхронных хранилищ.
+    Асинхронные (`aget_templates`, `aget_index`, `aupsert_templates`,
+    `adelete_templates`) работают с любыми: синхронные хранилища
+    вызываются в пуле потоков.
+    """
+
+    def __init__(
+        self,
+        storage: Union[Storage, AsyncStorage],
+        ttl: float = 300.0,
+        check_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_workers: int = 4,
+        index_factory: IndexFactory = TemplateIndex,
+        retry_backoff: float = 1.0,
+        max_retry_backoff: float = 30.0,
+    ):
+        """
+        Инициализация кеширующего хранилища.
+
+        :param storage: Оборачиваемое синхронное или асинхронное хранилище.
+        :param ttl: Время жизни кеша в секундах (0 — без ограничения).
+        :param check_interval: Минимальный интервал между проверками версии.
+        :param clock: Источник времени (для тестов).
+        :param max_workers: Размер пула потоков для синхронного хранилища.
+        :param index_factory: Класс индекса (движок подбора шаблонов).
+        :param retry_backoff: Пауза перед повторной загрузкой после ошибки.
+        :param max_retry_backoff: Максимальная пауза после нескольких ошибок подряд.
+        """
+        self.storage = storage
+        self.async_storage = to_async(storage, max_workers=max_workers)
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.clock = clock
+        self.index_factory = index_factory
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.stats = CacheStats()
+        self._entry: Optional[_CacheEntry] = None
+        # Блокировки записи; загрузки координирует `_flight`.
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+        self._flight: Optional[_Flight] = None
+        self._flight_lock = threading.Lock()
+        self._generation = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._error: Optional[BaseException] = None
+        self._degraded = False
+        self._tasks: set = set()
+
+    def get_templates(self) -> List[FormTemplate]:
+        """
+        Возвращает список шаблонов из кеша, при необходимости перезагружая его.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        return self._get_entry().index.templates()
+
+    def get_index(self) -> TemplateIndex:
+        """
+        Возвращает индекс для подбора шаблонов из кеша.
+
+        :return: Объект `TemplateIndex`.
+        """
+        return self._get_entry().index
+
+    def get_version(self) -> Optional[Hashable]:
+        """
+        Возвращает версию данных оборачиваемого хранилища.
+
+        :return: Метка версии или `None`.
+        """
+        get_version = getattr(self.storage, "get_version", None)
+        return get_version() if get_version is not None else None
+
+    async def aget_templates(self) -> List[FormTemplate]:
+        """
+        Асинхронно возвращает список шаблонов из кеша.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        return (await self._aget_entry()).index.templates()
+
+    async def aget_index(self) -> TemplateIndex:
+        """
+        Асинхронно возвращает индекс для подбора шаблонов из кеша.
+
+        :return: Объект `TemplateIndex`.
+        """
+        return (await self._aget_entry()).index
+
+    def upsert_templates(self, templates: Iterable[FormTemplate]) -> None:
+        """
+        Добавляет или заменяет шаблоны в хранилище и в загруженном индексе.
+
+        :param templates: Новые версии шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        templates = list(templates)
+        write = self._writer("upsert_templates")
+        with self._lock:
+            before = self.get_version()
+            write(templates)
+            self._apply(before, self.get_version(), "upsert", templates)
+
+    def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам из хранилища и из загруженного индекса.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        names = list(names)
+        write = self._writer("delete_templates")
+        with self._lock:
+            before = self.get_version()
+            deleted = write(names)
+            self._apply(before, self.get_version(), "delete", names)
+        return deleted
+
+    async def aupsert_templates(self, templates: Iterable[FormTemplate]) -> None:
+        """
+        Асинхронно добавляет или заменяет шаблоны (см. `upsert_templates`).
+
+        :param templates: Новые версии шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        templates = list(templates)
+        self._writer("upsert_templates", asynchronous=True)
+        async with self._async_lock:
+            before = await self.async_storage.get_version()
+            await self.async_storage.upsert_templates(templates)
+            after = await self.async_storage.get_version()
+            self._apply(before, after, "upsert", templates)
+
+    async def adelete_templates(self, names: Iterable[str]) -> int:
+        """
+        Асинхронно удаляет шаблоны по именам (см. `delete_templates`).
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        :raises ReadOnlyStorageError: Если хранилище не поддерживает запись.
+        """
+        names = list(names)
+        self._writer("delete_templates", asynchronous=True)
+        async with self._async_lock:
+            before = await self.async_storage.get_version()
+            deleted = await self.async_storage.delete_templates(names)
+            after = await self.async_storage.get_version()
+            self._apply(before, after, "delete", names)
+        return deleted
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Загружен ли каталог в память.
+        """
+        return self._entry is not None
+
+    @property
+    def loaded_version(self) -> Optional[Hashable]:
+        """
+        Версия данных, из которой построен текущий снимок каталога.
+        """
+        entry = self._entry
+        return None if entry is None else entry.version
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние каталога и оборачиваемого хранилища.
+
+        :return: Словарь с ключами `catalog` (загружен ли каталог, количество
+                 шаблонов, `degraded` — не удалось обновить каталог или
+                 проверить его версию, количество ошибок загрузки подряд,
+                 последняя ошибка и счетчики кеша) и `storage`
+                 (см. `storage_health`).
+        """
+        entry = self._entry
+        return {
+            "catalog": {
+                "loaded": entry is not None,
+                "templates": len(entry.index) if entry is not None else 0,
+                "degraded": self._degraded,
+                "load_failures": self._failures,
+                "last_error": str(self._error) if self._degraded else None,
+                "cache": self.stats.as_dict(),
+            },
+            "storage": storage_health(self.storage),
+        }
+
+    def invalidate(self) -> None:
+        """
+        Сбрасывает кеш; следующий запрос загрузит шаблоны заново.
+
+        Результат загрузки, начатой до сброса, не подставляется в кеш.
+        """
+        with self._flight_lock:
+            self._generation += 1
+            self._entry = None
+
+    async def aclose(self) -> None:
+        """
+        Закрывает пул потоков и клиенты хранилища; загруженный каталог
+        остается доступен через уже полученные индексы.
+        """
+        aclose = getattr(self.async_storage, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def after_fork(self) -> None:
+        """
+        Готовит кеш к работе в дочернем процессе после `fork`.
+
+        Загруженный каталог сохраняется, блокировки и незавершенная загрузка
+        родителя сбрасываются, а пул потоков и клиенты хранилища создаются
+        заново (см. `LazyStorage.after_fork`).
+        """
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+        self._flight = None
+        self._flight_lock = threading.Lock()
+        self._tasks = set()
+        after_fork = getattr(self.async_storage, "after_fork", None)
+        if after_fork is not None:
+            after_fork()
+
+    def _writer(self, method: str, asynchronous: bool = False) -> Callable[..., Any]:
+        """
+        Возвращает метод записи оборачиваемого хранилища.
+
+        :param method: Имя метода.
+        :param asynchronous: Вызывается ли метод из асинхронного кода.
+        :return: Метод хранилища.
+        :raises ReadOnlyStorageError: Если хранилище его не реализует.
+        :raises TypeError: Если асинхронное хранилище вызывается синхронно.
+        """
+        write = getattr(self.storage, method, None)
+        if write is None:
+            raise ReadOnlyStorageError(
+                f"{type(self.storage).__name__} does not support template writes."
+            )
+        if not asynchronous and is_async_storage(self.storage):
+            raise TypeError(f"Asynchronous storage must be used through `a{method}`.")
+        return write
+
+    def _apply(
+        self,
+        before: Optional[Hashable],
+        after: Optional[Hashable],
+        operation: str,
+        argument: list,
+    ) -> None:
+        """
+        Применяет записанное изменение к загруженному индексу.
+
+        Индекс изменяется на месте, только если он был построен из версии,
+        предшествовавшей записи, то есть других изменений он не пропустил.
+
+        :param before: Версия данных до записи.
+        :param after: Версия данных после записи.
+        :param operation: Метод индекса: `"upsert"` или `"delete"`.
+        :param argument: Шаблоны или имена шаблонов.
+        """
+        with self._flight_lock:
+            # Загрузка, начатая до записи, могла прочитать прежние данные.
+            self._generation += 1
+            entry = self._entry
+        apply = getattr(entry.index, operation, None) if entry is not None else None
+        if apply is None or before is None or entry.version != before:
+            self.invalidate()
+            return
+        apply(argument)
+        entry.version = after
+        self.stats.updates += 1
+        metrics.catalog_size(len(entry.index))
+
+    def _state(self, entry: Optional[_CacheEntry], now: float) -> str:
+        """
+        Определяет, что нужно сделать со снимком без обращения к хранилищу.
+
+        :param entry: Текущий снимок.
+        :param now: Текущее время.
+        :return: `"hit"`, `"check"` (нужна проверка версии) или `"reload"`.
+        """
+        if entry is None:
+            return "reload"
+        if self.ttl and now - entry.loaded_at >= self.ttl:
+            return "reload"
+        if now - entry.checked_at >= self.check_interval:
+            return "check"
+        return "hit"
+
+    def _hit(self, entry: _CacheEntry) -> _CacheEntry:
+        self.stats.hits += 1
+        return entry
+
+    def _stale(
+        self, entry: _CacheEntry, error: Optional[BaseException] = None
+    ) -> _CacheEntry:
+        if error is not None:
+            self._error = error
+            self._degraded = True
+        self.stats.stale += 1
+        return entry
+
+    def _current(self, entry: _CacheEntry) -> _CacheEntry:
+        """
+        Возвращает новый снимок, если его уже подставили, иначе — предыдущий.
+
+        :param entry: Снимок, который вызывающий считает устаревшим.
+        :return: Снимок каталога.
+        """
+        current = self._entry
+        if current is not None and current is not entry:
+            return self._hit(current)
+        return self._stale(entry)
+
+    def _count_load(self, stale: Optional[_CacheEntry]) -> None:
+        if stale is None:
+            self.stats.misses += 1
+        else:
+            self.stats.reloads += 1
+
+    def _get_entry(self) -> _CacheEntry:
+        """
+        Возвращает актуальный снимок каталога.
+
+        :return: Объект `_CacheEntry`.
+        :raises TypeError: Если оборачиваемое хранилище асинхронное.
+        """
+        entry = self._entry
+        now = self.clock()
+        state = self._state(entry, now)
+
+        if state == "check":
+            entry.checked_at = now
+            try:
+                version = self.get_version()
+            except Exception as e:
+                return self._stale(entry, e)
+            if version == entry.version:
+                self._degraded = False
+                return self._hit(entry)
+        elif state == "hit":
+            return self._hit(entry)
+
+        if is_async_storage(self.storage):
+            raise TypeError(
+                "Asynchronous storage must be used through `aget_templates`."
+            )
+        flight, leader = self._join(entry, now)
+        if leader:
+            self._fly(flight, self._load, now)
+        elif entry is not None:
+            return self._current(entry)
+        elif flight is None:
+            # Каталог успели загрузить и снова сбросить: повторяем.
+            return self._get_entry()
+        return self._result(flight.future.result, entry)
+
+    async def _aget_entry(self) -> _CacheEntry:
+        """
+        Асинхронно возвращает актуальный снимок каталога.
+
+        Загрузка выполняется в отдельной задаче, поэтому отмена
+        вызвавшей ее корутины не прерывает загрузку для остальных.
+
+        :return: Объект `_CacheEntry`.
+        """
+        entry = self._entry
+        now = self.clock()
+        state = self._state(entry, now)
+
+        if state == "check":
+            entry.checked_at = now
+            try:
+                version = await self.async_storage.get_version()
+            except Exception as e:
+                return self._stale(entry, e)
+            if version == entry.version:
+                self._degraded = False
+                return self._hit(entry)
+        elif state == "hit":
+            return self._hit(entry)
+
+        flight, leader = self._join(entry, now)
+        if leader:
+            task = asyncio.ensure_future(self._afly(flight, now))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif entry is not None:
+            return self._current(entry)
+        elif flight is None:
+            return await self._aget_entry()
+        try:
+            return await asyncio.wrap_future(flight.future)
+        except Exception:
+            return self._result(flight.future.result, entry)
+
+    def _fly(
+        self, flight: _Flight, load: Callable[[float], _CacheEntry], now: float
+    ) -> None:
+        try:
+            entry = load(now)
+        except Exception as e:
+            self._fail(flight, e)
+        except BaseException as e:
+            self._abandon(flight, e)
+            raise
+        else:
+            self._land(flight, entry)
+
+    async def _afly(self, flight: _Flight, now: float) -> None:
+        try:
+            entry = await self._aload(now)
+        except Exception as e:
+            self._fail(flight, e)
+        except BaseException as e:
+            # Отмена при остановке цикла событий: ожидающие получают ошибку,
+            # следующий запрос начнет загрузку заново без паузы.
+            self._abandon(flight, e)
+            raise
+        else:
+            self._land(flight, entry)
+
+    def _join(
+        self, entry: Optional[_CacheEntry], now: float
+    ) -> Tuple[Optional[_Flight], bool]:
+        """
+        Присоединяет вызывающего к выполняющейся загрузке или начинает новую.
+
+        :param entry: Снимок, который вызывающий считает устаревшим.
+        :param now: Текущее время.
+        :return: Кортеж `(загрузка, ведущий ли вызывающий)`; загрузка `None`,
+                 если она не нужна (снимок уже заменен) или отложена после ошибки.
+        :raises Exception: Последняя ошибка загрузки, если загрузка отложена,
+                           а каталог еще не загружен.
+        """
+        with self._flight_lock:
+            if self._entry is not None and self._entry is not entry:
+                return None, False
+            if self._flight is not None:
+                return self._flight, False
+            if now < self._retry_at:
+                if entry is None:
+                    raise self._error
+                return None, False
+            self._count_load(entry)
+            self._flight = _Flight(self._generation)
+            return self._flight, True
+
+    def _land(self, flight: _Flight, entry: _CacheEntry) -> None:
+        """
+        Завершает загрузку и атомарно подставляет новый снимок.
+
+        :param flight: Загрузка.
+        :param entry: Новый снимок.
+        """
+        with self._flight_lock:
+            self._flight = None
+            self._failures = 0
+            self._degraded = False
+            if flight.generation == self._generation:
+                self._entry = entry
+        flight.future.set_result(entry)
+
+    def _fail(self, flight: _Flight, error: Exception) -> None:
+        """
+        Завершает загрузку с ошибкой и откладывает следующую попытку.
+
+        :param flight: Загрузка.
+        :param error: Ошибка загрузки.
+        """
+        with self._flight_lock:
+            self._flight = None
+            self._failures += 1
+            self._error = error
+            self._degraded = True
+            backoff = self.retry_backoff * 2 ** (self._failures - 1)
+            self._retry_at = self.clock() + min(backoff, self.max_retry_backoff)
+        logger.warning("Template catalog load failed: %s", error)
+        flight.future.set_exception(error)
+
+    def _abandon(self, flight: _Flight, error: BaseException) -> None:
+        with self._flight_lock:
+            self._flight = None
+        flight.future.set_exception(error)
+
+    def _result(
+        self, result: Callable[[], _CacheEntry], stale: Optional[_CacheEntry]
+    ) -> _CacheEntry:
+        """
+        Возвращает результат загрузки, а при ошибке — предыдущий снимок.
+
+        :param result: Функция, возвращающая результат загрузки.
+        :param stale: Предыдущий снимок.
+        :return: Снимок каталога.
+        :raises Exception: Ошибка загрузки, если предыдущего снимка нет.
+        """
+        try:
+            return result()
+        except Exception:
+            if stale is None:
+                raise
+            return self._stale(stale)
+
+    def _load(self, now: float) -> _CacheEntry:
+        """
+        Загружает шаблоны из хранилища и строит индекс.
+
+        Версия считывается до загрузки, чтобы изменение, произошедшее
+        во время чтения, привело к повторной перезагрузке.
+
+        :param now: Текущее время.
+        :return: Новый снимок каталога.
+        """
+        started = time.perf_counter()
+        version = self.get_version()
+        load_index = self._index_loader()
+        if load_index is not None:
+            index = load_index()
+        else:
+            index = self.index_factory(self.storage.get_templates())
+        metrics.catalog_loaded(time.perf_counter() - started, len(index))
+        return _CacheEntry(index, version, now)
+
+    async def _aload(self, now: float) -> _CacheEntry:
+        """
+        Асинхронно загружает шаблоны и строит индекс вне цикла событий.
+
+        :param now: Текущее время.
+        :return: Новый снимок каталога.
+        """
+        started = time.perf_counter()
+        version = await self.async_storage.get_version()
+        load_index = self._index_loader()
+        if load_index is not None:
+            index = await asyncio.to_thread(load_index)
+        else:
+            templates = await self.async_storage.get_templates()
+            index = await asyncio.to_thread(self.index_factory, templates)
+        metrics.catalog_loaded(time.perf_counter() - started, len(index))
+        return _CacheEntry(index, version, now)
+
+    def _index_loader(self) -> Optional[Callable[[], TemplateIndex]]:
+        """
+        Возвращает метод хранилища, загружающий готовый индекс (`load_index`),
+        если хранилище его предоставляет и выбран движок `TemplateIndex`.
+
+        :return: Метод загрузки индекса или `None`.
+        """
+        if self.index_factory is not TemplateIndex:
+            return None
+        return getattr(self.storage, "load_index", None)
+
+
+def storage_health(storage: Union[Storage, AsyncStorage]) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает состояние хранилища, если оно его сообщает (`health()`).
+
+    Отложенное хранилище (`LazyStorage`), к которому еще не обращались,
+    не подключается ради отчета.
+
+    :param storage: Хранилище.
+    :return: Словарь состояния или `None`.
+    """
+    if not getattr(storage, "connected", True):
+        return None
+    health = getattr(storage, "health", None)
+    return health() if health is not None else None
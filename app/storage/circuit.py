@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from app.core.exceptions import StorageUnavailableError
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель обращений к хранилищу.
+
+    После `threshold` ошибок соединения подряд выключатель размыкается,
+    и обращения завершаются `StorageUnavailableError` сразу, не дожидаясь
+    таймаутов драйвера. Через `reset_timeout` секунд обращения снова
+    пропускаются (полуоткрытое состояние): первое успешное замыкает
+    выключатель, ошибка размыкает его на следующие `reset_timeout` секунд.
+
+    Используется как контекстный менеджер вокруг обращения к хранилищу;
+    ошибки из `errors` при этом заменяются на `StorageUnavailableError`.
+
+    Атрибуты:
+    - `threshold`: Количество ошибок подряд, после которого выключатель размыкается.
+    - `reset_timeout`: Время в секундах до повторной попытки.
+    - `failures`: Количество ошибок подряд.
+    """
+
+    def __init__(
+        self,
+        errors: Tuple[Type[BaseException], ...],
+        threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param errors: Типы ошибок, означающие недоступность хранилища.
+        :param threshold: Количество ошибок подряд до размыкания.
+        :param reset_timeout: Время в секундах до повторной попытки.
+        :param clock: Источник времени (для тестов).
+        """
+        self.errors = errors
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Состояние выключателя: `"closed"`, `"open"` или `"half-open"`.
+        """
+        opened_at = self._opened_at
+        if opened_at is None:
+            return "closed"
+        if self.clock() - opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def __enter__(self) -> "CircuitBreaker":
+        opened_at = self._opened_at
+        if opened_at is not None:
+            retry_in = opened_at + self.reset_timeout - self.clock()
+            if retry_in > 0:
+                raise StorageUnavailableError(
+                    f"Storage is unavailable ({self.last_error});"
+                    f" retrying in {retry_in:.1f}s."
+                )
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None and issubclass(exc_type, self.errors):
+            self._failure(exc)
+            raise StorageUnavailableError(f"Storage is unavailable: {exc}") from exc
+        if exc_type is None or (
+            issubclass(exc_type, Exception)
+            and not issubclass(exc_type, StorageUnavailableError)
+        ):
+            # Хранилище ответило (в том числе ошибкой запроса).
+            self._success()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние выключателя для отчета о здоровье.
+
+        :return: Словарь с ключами `state`, `failures`, `last_error`.
+        """
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+    def _success(self) -> None:
+        if self.failures or self._opened_at is not None:
+            with self._lock:
+                self.failures = 0
+                self._opened_at = None
+
+    def _failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.failures >= self.threshold:
+                self._opened_at = self.clock()
@@ -1,5 +1,12 @@
-from app.core.config import CONFIG
-from app.storage.base import Storage
+from typing import Union
+
+from app.core.cache import TemplateCacheConfig
+from app.core import config
+from app.services.engines import IndexFactory
+from app.services.matcher import TemplateIndex
+from app.storage.base import AsyncStorage, Storage
+from app.storage.cache import CachedStorage
+from app.storage.lazy import LazyStorage
 from app.storage.registry import StorageRegistry
 
 
@@ -9,10 +16,36 @@ class StorageFactory:
     """
 
     @staticmethod
-    def get_storage() -> Storage:
+    def get_storage() -> Union[Storage, AsyncStorage]:
         """
         Возвращает экземпляр хранилища на основе конфигурации.
+
+        Хранилище создается (открывает файл или подключается к базе данных)
+        при первом обращении к данным, см. `LazyStorage`.
         """
-        storage_type = CONFIG.get("STORAGE_TYPE", "TinyDB")
+        storage_type = config.CONFIG.get("STORAGE_TYPE", "TinyDB")
         storage_cls = StorageRegistry.get_storage(storage_type)
-        return storage_cls(**CONFIG.get("STORAGE_PARAMS", {}))
+        return LazyStorage(storage_cls, **config.CONFIG.get("STORAGE_PARAMS", {}))
+
+    @staticmethod
+    def get_cached_storage(
+        index_factory: IndexFactory = TemplateIndex,
+    ) -> Union[Storage, AsyncStorage]:
+        """
+        Возвращает хранилище, обернутое в кеш шаблонов, если кеш включен.
+
+        :param index_factory: Класс индекса, который строит кеш.
+        """
+        storage = StorageFactory.get_storage()
+        params = TemplateCacheConfig().get_params()
+        if not params["ENABLED"]:
+            return storage
+        return CachedStorage(
+            storage,
+            ttl=params["TTL"],
+            check_interval=params["CHECK_INTERVAL"],
+            retry_backoff=params["RETRY_BACKOFF"],
+            max_retry_backoff=params["MAX_RETRY_BACKOFF"],
+            max_workers=params["THREAD_POOL_SIZE"],
+            index_factory=index_factory,
+        )
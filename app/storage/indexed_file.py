@@ -0,0 +1,546 @@
+"""
+Файловое хранилище шаблонов с индексом по именам полей.
+
+Данные хранятся в журнале `NAME` — по одной JSON-записи на строку:
+- `{"id": 1, "template": {"name": "...", "email": "email"}}` — шаблон;
+- `{"id": 1, "deleted": true}` — удаление шаблона;
+- `{"batch": 3}` — заголовок пакета: следующие три записи применяются
+  только вместе; пакет, оборванный сбоем, при чтении отбрасывается.
+
+Запись только дописывается в конец файла; новая версия шаблона
+с тем же `id` заменяет прежнюю и сохраняет его позицию в каталоге.
+Рядом хранится индекс `NAME.idx`: смещения и имена актуальных записей
+и списки шаблонов для каждого имени поля. Журнал отображается в память (`mmap`),
+и при поиске кандидатов декодируются только шаблоны, все поля которых
+присутствуют в форме.
+
+Индекс сохраняется не после каждой записи, а раз в `INDEX_CHECKPOINT`
+записей, при компакции и при закрытии хранилища; записи журнала после
+сохраненного индекса дочитываются из хвоста при загрузке. В индексе
+хранятся inode и время изменения журнала и контрольная сумма (CRC32)
+проиндексированной части журнала: если журнал заменен или его начало
+не совпадает с суммой, индекс строится заново.
+
+Когда доля устаревших записей превышает `COMPACT_RATIO`, журнал
+переписывается без них (компакция). Если индекс отстает от журнала
+(например, после сбоя или записи другим процессом), недостающие записи
+дочитываются из хвоста журнала.
+
+Журнал рассчитан на одного пишущего и любое число читающих процессов.
+"""
+
+import json
+import mmap
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from app.models.form_template import FieldType, FormTemplate
+from app.storage.base import Storage
+
+#: Версия формата файла индекса
+INDEX_FORMAT = 3
+
+#: Размер блока при подсчете контрольной суммы журнала
+CHECKSUM_CHUNK = 1 << 20
+
+
+class IndexedFileStorage(Storage):
+    """
+    Хранилище шаблонов в файле-журнале с постоянным индексом по именам полей.
+
+    Атрибуты:
+    - `path`: Путь к файлу журнала.
+    - `index_path`: Путь к файлу индекса.
+    - `compact_ratio`: Доля устаревших данных, после которой выполняется компакция.
+    - `compact_min_bytes`: Минимальный объем устаревших данных для компакции.
+    - `index_checkpoint`: Число записей, после которого индекс сохраняется в файл.
+    """
+
+    def __init__(
+        self,
+        NAME: str,
+        COMPACT_RATIO: float = 0.5,
+        COMPACT_MIN_BYTES: int = 64 * 1024,
+        INDEX_CHECKPOINT: int = 100,
+    ):
+        """
+        Инициализация хранилища: загрузка или построение индекса.
+
+        :param NAME: Путь к файлу журнала.
+        :param COMPACT_RATIO: Доля устаревших данных для запуска компакции.
+        :param COMPACT_MIN_BYTES: Минимальный объем устаревших данных в байтах.
+        :param INDEX_CHECKPOINT: Число записей между сохранениями индекса.
+        """
+        self.path = NAME
+        self.index_path = f"{NAME}.idx"
+        self.compact_ratio = float(COMPACT_RATIO)
+        self.compact_min_bytes = int(COMPACT_MIN_BYTES)
+        self.index_checkpoint = max(int(INDEX_CHECKPOINT), 1)
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+        if not os.path.exists(self.path):
+            open(self.path, "ab").close()
+        self._inode = _file_stat(self.path)[0]
+        self._load_index()
+        self._refresh()
+
+    def get_templates(self) -> List[FormTemplate]:
+        """
+        Возвращает список всех шаблонов в порядке добавления.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        with self._lock:
+            self._refresh()
+            return [self._decode(record_id) for record_id in sorted(self._records)]
+
+    def find_templates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> List[FormTemplate]:
+        """
+        Возвращает шаблоны, все поля которых присутствуют в форме.
+
+        Кандидаты отбираются по индексу имен полей, и декодируются только
+        они; совпадение типов полей проверяет вызывающий код.
+
+        :param field_types: Типы полей формы.
+        :return: Шаблоны-кандидаты в порядке добавления.
+        """
+        with self._lock:
+            self._refresh()
+            hits: Dict[int, int] = {}
+            for name in field_types:
+                for record_id in self._fields.get(name, ()):
+                    hits[record_id] = hits.get(record_id, 0) + 1
+
+            candidates = [
+                record_id
+                for record_id, count in hits.items()
+                if count == len(self._records[record_id][3])
+            ]
+            candidates.extend(self._empty)
+            return [self._decode(record_id) for record_id in sorted(candidates)]
+
+    def get_version(self) -> Optional[Tuple[int, int]]:
+        """
+        Возвращает версию данных по времени изменения и размеру журнала.
+
+        :return: Кортеж `(mtime_ns, size)` или `None`, если файл недоступен.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def upsert_templates(self, templates: Iterable[FormTemplate]) -> None:
+        """
+        Атомарно добавляет или заменяет шаблоны по именам.
+
+        Замененный шаблон сохраняет свою позицию в каталоге,
+        новый добавляется в конец.
+
+        :param templates: Новые версии шаблонов.
+        """
+        with self._lock:
+            self._refresh()
+            assigned: Dict[str, List[int]] = {}
+            entries = []
+            for template in templates:
+                ids = assigned.get(template.name)
+                if ids is None:
+                    ids = sorted(self._names.get(template.name, ()))
+                    if not ids:
+                        ids = [self._next_id]
+                        self._next_id += 1
+                    assigned[template.name] = ids
+                document = _document(template)
+                entries.extend(
+                    {"id": record_id, "template": document} for record_id in ids
+                )
+            self._append(entries)
+
+    def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Атомарно удаляет шаблоны по именам.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        with self._lock:
+            self._refresh()
+            ids = set()
+            for name in names:
+                ids.update(self._names.get(name, ()))
+            self._append(
+                [{"id": record_id, "deleted": True} for record_id in sorted(ids)]
+            )
+            return len(ids)
+
+    def add_templates(self, templates: Iterable[FormTemplate]) -> List[int]:
+        """
+        Добавляет шаблоны в конец каталога.
+
+        :param templates: Добавляемые шаблоны.
+        :return: Идентификаторы добавленных шаблонов.
+        """
+        with self._lock:
+            self._refresh()
+            ids = []
+            entries = []
+            for template in templates:
+                ids.append(self._next_id)
+                entries.append({"id": self._next_id, "template": _document(template)})
+                self._next_id += 1
+            self._append(entries)
+            return ids
+
+    def add_template(self, template: FormTemplate) -> int:
+        """
+        Добавляет шаблон в конец каталога.
+
+        :param template: Добавляемый шаблон.
+        :return: Идентификатор шаблона.
+        """
+        return self.add_templates([template])[0]
+
+    def update_template(self, record_id: int, template: FormTemplate) -> None:
+        """
+        Заменяет шаблон, сохраняя его позицию в каталоге.
+
+        :param record_id: Идентификатор шаблона.
+        :param template: Новая версия шаблона.
+        :raises KeyError: Если шаблона с таким идентификатором нет.
+        """
+        with self._lock:
+            self._refresh()
+            if record_id not in self._records:
+                raise KeyError(record_id)
+            self._append([{"id": record_id, "template": _document(template)}])
+
+    def delete_template(self, record_id: int) -> None:
+        """
+        Удаляет шаблон.
+
+        :param record_id: Идентификатор шаблона.
+        :raises KeyError: Если шаблона с таким идентификатором нет.
+        """
+        with self._lock:
+            self._refresh()
+            if record_id not in self._records:
+                raise KeyError(record_id)
+            self._append([{"id": record_id, "deleted": True}])
+
+    def compact(self) -> None:
+        """
+        Переписывает журнал, оставляя только актуальные записи.
+
+        Новые журнал и индекс записываются во временные файлы и затем
+        атомарно заменяют старые.
+        """
+        with self._lock:
+            self._refresh()
+            records: Dict[int, Tuple[int, int, str, List[str]]] = {}
+            tmp_path = f"{self.path}.tmp"
+            offset = checksum = 0
+            with open(tmp_path, "wb") as f:
+                for record_id in sorted(self._records):
+                    start, length, name, fields = self._records[record_id]
+                    end = start + length + 1
+                    line = self._map[start:end]
+                    f.write(line)
+                    checksum = zlib.crc32(line, checksum)
+                    records[record_id] = (offset, length, name, fields)
+                    offset += length + 1
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._close_map()
+            os.replace(tmp_path, self.path)
+            self._inode = _file_stat(self.path)[0]
+            self._records = records
+            self._size = offset
+            self._live = offset
+            self._checksum = checksum
+            self._save_index()
+
+    def close(self) -> None:
+        """
+        Сохраняет индекс, если в нем есть несохраненные записи,
+        и освобождает отображение файла в память.
+        """
+        with self._lock:
+            if self._unsaved:
+                self._save_index()
+            self._close_map()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _append(self, entries: List[dict]) -> None:
+        """
+        Дописывает записи в журнал, обновляет индекс и при необходимости
+        запускает компакцию.
+
+        Несколько записей предваряются заголовком пакета. Оборванный хвост
+        журнала, оставшийся после сбоя, перед записью отрезается. Индекс
+        сохраняется раз в `index_checkpoint` записей.
+
+        :param entries: Записи журнала.
+        """
+        if not entries:
+            return
+        lines = [_encode(entry) for entry in entries]
+        header = _encode({"batch": len(lines)}) if len(lines) > 1 else b""
+        if _file_stat(self.path)[1] > self._size:
+            self._close_map()
+            os.truncate(self.path, self._size)
+        data = header + b"".join(lines)
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        offset = self._size + len(header)
+        for entry, line in zip(entries, lines):
+            self._apply(entry, offset, len(line) - 1)
+            offset += len(line)
+        self._size = offset
+        self._checksum = zlib.crc32(data, self._checksum)
+        self._unsaved += 1
+        if self._unsaved >= self.index_checkpoint:
+            self._save_index()
+
+        dead = self._size - self._live
+        if dead >= self.compact_min_bytes and dead > self.compact_ratio * self._size:
+            self.compact()
+
+    def _apply(self, entry: dict, offset: int, length: int) -> None:
+        """
+        Применяет запись журнала к индексу в памяти.
+
+        :param entry: Запись журнала.
+        :param offset: Смещение записи в журнале.
+        :param length: Длина записи без перевода строки.
+        """
+        record_id = entry["id"]
+        self._remove(record_id)
+        self._next_id = max(self._next_id, record_id + 1)
+        if entry.get("deleted"):
+            return
+
+        name = entry["template"]["name"]
+        fields = [key for key in entry["template"] if key != "name"]
+        self._records[record_id] = (offset, length, name, fields)
+        self._live += length + 1
+        self._index_fields(record_id, name, fields)
+
+    def _remove(self, record_id: int) -> None:
+        previous = self._records.pop(record_id, None)
+        if previous is None:
+            return
+        self._live -= previous[1] + 1
+        self._empty.discard(record_id)
+        _discard(self._names, previous[2], record_id)
+        for name in previous[3]:
+            _discard(self._fields, name, record_id)
+
+    def _index_fields(self, record_id: int, name: str, fields: List[str]) -> None:
+        self._names.setdefault(name, set()).add(record_id)
+        if not fields:
+            self._empty.add(record_id)
+        for name in fields:
+            self._fields.setdefault(name, set()).add(record_id)
+
+    def _load_index(self) -> None:
+        """
+        Загружает индекс из файла; при отсутствии или несоответствии
+        журналу индекс строится по журналу заново.
+
+        Индекс соответствует журналу, если совпадают inode, а журнал
+        не изменялся после сохранения индекса или контрольная сумма
+        его проиндексированной части совпадает с сохраненной.
+        """
+        self._reset_index()
+        try:
+            with open(self.index_path, "rb") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if (
+            data.get("format") != INDEX_FORMAT
+            or data["inode"] != stat.st_ino
+            or data["size"] > stat.st_size
+        ):
+            return
+        unchanged = data["mtime"] == stat.st_mtime_ns and data["size"] == stat.st_size
+        if not unchanged and _checksum(self.path, data["size"]) != data["checksum"]:
+            return
+
+        for key, (offset, length, name, fields) in data["records"].items():
+            self._records[int(key)] = (offset, length, name, fields)
+            self._names.setdefault(name, set()).add(int(key))
+            self._live += length + 1
+        for name, ids in data["fields"].items():
+            self._fields[name] = set(ids)
+        self._empty = set(data["empty"])
+        self._next_id = data["next_id"]
+        self._size = data["size"]
+        self._checksum = data["checksum"]
+
+    def _reset_index(self) -> None:
+        self._records: Dict[int, Tuple[int, int, str, List[str]]] = {}
+        self._names: Dict[str, Set[int]] = {}
+        self._fields: Dict[str, Set[int]] = {}
+        self._empty: Set[int] = set()
+        self._next_id = 1
+        self._size = 0
+        self._live = 0
+        self._checksum = 0
+
+    def _save_index(self) -> None:
+        """
+        Атомарно записывает индекс в файл.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        data = {
+            "format": INDEX_FORMAT,
+            "inode": stat.st_ino,
+            "mtime": stat.st_mtime_ns,
+            "size": self._size,
+            "checksum": self._checksum,
+            "next_id": self._next_id,
+            "records": {
+                str(record_id): record for record_id, record in self._records.items()
+            },
+            "fields": {name: sorted(ids) for name, ids in self._fields.items()},
+            "empty": sorted(self._empty),
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        self._unsaved = 0
+
+    def _refresh(self) -> None:
+        """
+        Согласует индекс с журналом, измененным другим процессом.
+
+        Если журнал вырос, дочитываются новые записи; если файл был
+        заменен (компакция в другом процессе), индекс загружается заново.
+        """
+        inode, size = _file_stat(self.path)
+        if inode != self._inode or size < self._size:
+            self._close_map()
+            self._load_index()
+            self._inode = inode
+        if size != self._mapped_size:
+            self._remap(size)
+        if size > self._size:
+            self._replay(self._size, size)
+
+    def _replay(self, start: int, end: int) -> None:
+        """
+        Применяет к индексу записи журнала в диапазоне `[start, end)`.
+
+        Незавершенная последняя строка и незавершенный пакет (прерванная
+        запись) пропускаются.
+        """
+        offset = applied = start
+        batch: List[Tuple[dict, int, int]] = []
+        expected = 0
+        while offset < end:
+            newline = self._map.find(b"\n", offset, end)
+            if newline < 0:
+                break
+            line = self._map[offset:newline]
+            if line.strip():
+                entry = json.loads(line)
+                if "batch" in entry:
+                    expected = entry["batch"]
+                else:
+                    batch.append((entry, offset, newline - offset))
+            offset = newline + 1
+            if len(batch) >= expected:
+                for entry, entry_offset, length in batch:
+                    self._apply(entry, entry_offset, length)
+                batch = []
+                expected = 0
+                applied = offset
+        self._checksum = zlib.crc32(self._map[start:applied], self._checksum)
+        self._size = applied
+
+    def _remap(self, size: int) -> None:
+        self._close_map()
+        if size:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self._mapped_size = size
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._mapped_size = 0
+
+    def _decode(self, record_id: int) -> FormTemplate:
+        """
+        Декодирует шаблон из отображенного в память журнала.
+
+        :param record_id: Идентификатор шаблона.
+        :return: Объект `FormTemplate`.
+        """
+        offset, length = self._records[record_id][:2]
+        end = offset + length
+        entry = json.loads(self._map[offset:end])
+        return FormTemplate(**entry["template"])
+
+
+def _document(template: FormTemplate) -> dict:
+    return {"name": template.name, **template.fields}
+
+
+def _discard(ids_by_key: Dict[str, Set[int]], key: str, record_id: int) -> None:
+    ids = ids_by_key[key]
+    ids.discard(record_id)
+    if not ids:
+        del ids_by_key[key]
+
+
+def _encode(entry: dict) -> bytes:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def _checksum(path: str, size: int) -> int:
+    """
+    Считает CRC32 первых `size` байт файла.
+    """
+    checksum = 0
+    with open(path, "rb") as f:
+        while size > 0:
+            chunk = f.read(min(size, CHECKSUM_CHUNK))
+            if not chunk:
+                break
+            checksum = zlib.crc32(chunk, checksum)
+            size -= len(chunk)
+    return checksum
+
+
+def _file_stat(path: str) -> Tuple[int, int]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0, 0
+    return stat.st_ino, stat.st_size
@@ -0,0 +1,101 @@
+import functools
+import inspect
+import threading
+from typing import Any, Dict, Optional, Type, Union
+
+from app.storage.base import AsyncStorage, Storage
+
+
+class LazyStorage:
+    """
+    Хранилище, создаваемое при первом обращении к данным.
+
+    Конструкторы хранилищ открывают файлы и создают клиентов базы данных,
+    поэтому создание откладывается до первого вызова метода: импорт
+    приложения и создание сервиса не обращаются к хранилищу, а недоступная
+    база данных проявляется ошибкой запроса, а не зависанием при запуске.
+
+    Методы хранилища определяются по его классу, поэтому проверки
+    `hasattr(storage, "find_templates")` и асинхронности хранилища
+    не приводят к подключению.
+
+    Атрибуты:
+    - `storage_cls`: Класс хранилища.
+    - `params`: Параметры конструктора хранилища.
+    """
+
+    def __init__(self, storage_cls: Type[Union[Storage, AsyncStorage]], **params):
+        """
+        :param storage_cls: Класс хранилища.
+        :param params: Параметры конструктора хранилища.
+        """
+        self.storage_cls = storage_cls
+        self.params: Dict[str, Any] = params
+        self._storage: Optional[Union[Storage, AsyncStorage]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        """
+        Создано ли хранилище.
+        """
+        return self._storage is not None
+
+    def connect(self) -> Union[Storage, AsyncStorage]:
+        """
+        Возвращает хранилище, создавая его при первом вызове.
+
+        Если создание завершилось ошибкой, следующий вызов повторит попытку.
+
+        :return: Экземпляр хранилища.
+        """
+        if self._storage is None:
+            with self._lock:
+                if self._storage is None:
+                    self._storage = self.storage_cls(**self.params)
+        return self._storage
+
+    async def aclose(self) -> None:
+        """
+        Закрывает созданное хранилище (если у него есть `close`) и забывает
+        его; следующее обращение создаст хранилище заново.
+        """
+        storage, self._storage = self._storage, None
+        close = getattr(storage, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    def after_fork(self) -> None:
+        """
+        Забывает созданное хранилище в дочернем процессе после `fork`.
+
+        Клиенты баз данных (например, `MongoClient`) нельзя использовать
+        после `fork`: хранилище будет создано заново при следующем обращении.
+        Унаследованный экземпляр не закрывается — его соединения принадлежат
+        родительскому процессу.
+        """
+        self._storage = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attribute = getattr(self.storage_cls, name, None)
+        if attribute is None or not callable(attribute):
+            if self._storage is None:
+                raise AttributeError(name)
+            return getattr(self._storage, name)
+
+        if inspect.iscoroutinefunction(attribute):
+
+            async def method(*args, **kwargs):
+                return await getattr(self.connect(), name)(*args, **kwargs)
+
+        else:
+
+            def method(*args, **kwargs):
+                return getattr(self.connect(), name)(*args, **kwargs)
+
+        return functools.wraps(attribute)(method)
@@ -0,0 +1,98 @@
+"""
+Перенос шаблонов между хранилищами.
+
+Запуск:
+    python -m app.storage.migrate indexed-file data/forms.json data/forms.db
+    python -m app.storage.migrate mongo mongodb://mongo form_storage forms \
+        --source data/forms_mongo.json
+"""
+
+import argparse
+import json
+from typing import List, Optional
+
+from tinydb import TinyDB
+
+from app.models.form_template import FormTemplate
+from app.storage.indexed_file import IndexedFileStorage
+from app.storage.mongodb import MongoDBStorage
+
+
+def to_indexed_file(source: str, target: str, collection: str = "forms") -> int:
+    """
+    Переносит шаблоны из файла TinyDB в файловое хранилище с индексом.
+
+    :param source: Файл TinyDB.
+    :param target: Файл журнала.
+    :param collection: Имя коллекции TinyDB.
+    :return: Количество перенесенных шаблонов.
+    """
+    db = TinyDB(source)
+    try:
+        documents = db.table(collection).all()
+    finally:
+        db.close()
+    storage = IndexedFileStorage(target)
+    try:
+        return len(storage.add_templates(FormTemplate(**doc) for doc in documents))
+    finally:
+        storage.close()
+
+
+def to_normalized_mongo(
+    host: str, name: str, collection: str, source: Optional[str] = None
+) -> int:
+    """
+    Переводит коллекцию MongoDB в нормализованный формат (см. `MongoDBStorage.migrate`).
+
+    :param host: Адрес подключения к MongoDB.
+    :param name: Имя базы данных.
+    :param collection: Имя коллекции.
+    :param source: JSON-массив шаблонов в плоском формате
+                   (как `data/forms_mongo.json`); если указан,
+                   содержимое коллекции заменяется шаблонами из файла.
+    :return: Количество шаблонов в коллекции.
+    """
+    storage = MongoDBStorage(HOST=host, NAME=name, COLLECTION=collection)
+    try:
+        if source is not None:
+            with open(source, encoding="utf-8") as f:
+                documents = json.load(f)
+            storage.collection.delete_many({})
+            if documents:
+                storage.collection.insert_many(documents)
+        return storage.migrate()
+    finally:
+        storage.client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Template storage migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexed_file = commands.add_parser(
+        "indexed-file", help="TinyDB -> файловое хранилище с индексом"
+    )
+    indexed_file.add_argument("source", help="Файл TinyDB")
+    indexed_file.add_argument("target", help="Файл журнала")
+    indexed_file.add_argument("--collection", default="forms")
+
+    mongo = commands.add_parser(
+        "mongo", help="MongoDB: плоский формат -> нормализованный с индексами"
+    )
+    mongo.add_argument("host", help="Адрес подключения к MongoDB")
+    mongo.add_argument("name", help="Имя базы данных")
+    mongo.add_argument("collection", help="Имя коллекции")
+    mongo.add_argument("--source", help="JSON-массив шаблонов для загрузки")
+    args = parser.parse_args(argv)
+
+    if args.command == "mongo":
+        count = to_normalized_mongo(args.host, args.name, args.collection, args.source)
+        print(f"Migrated {count} templates in {args.name}.{args.collection}")
+    else:
+        count = to_indexed_file(args.source, args.target, args.collection)
+        print(f"Imported {count} templates into {args.target}")
+
+
+if __name__ == "__main__":
+    main()
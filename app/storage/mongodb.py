@@ -1,32 +1,613 @@
-from typing import List
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, DeleteMany, InsertOne, MongoClient
+from pymongo.client_session import ClientSession
+from pymongo.collection import Collection
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+from pymongo.monitoring import ConnectionPoolListener
 
-from app.models.form_template import FormTemplate
-from app.storage.base import Storage
+from app.core.exceptions import StorageUnavailableError
+from app.models.form_template import FieldType, FormTemplate
+from app.storage.base import WritableStorage
+from app.storage.circuit import CircuitBreaker
 
+logger = logging.getLogger(__name__)
 
-class MongoDBStorage(Storage):
+#: Нормализованное множество типизированных полей шаблона (мультиключевой индекс)
+FIELDS_KEY = "_fields"
+
+#: Позиция шаблона в каталоге
+ORDER_KEY = "_order"
+
+#: Признак нормализованного формата коллекции в документе версии каталога
+NORMALIZED_KEY = "normalized"
+
+#: Проекция, возвращающая шаблон в исходном плоском виде
+TEMPLATE_PROJECTION = {"_id": 0, FIELDS_KEY: 0, ORDER_KEY: 0}
+
+
+def field_key(name: str, field_type: FieldType) -> str:
+    """
+    Возвращает ключ типизированного поля для нормализованного массива.
+
+    Тип записывается последним и не содержит `:`, поэтому ключ однозначен.
+
+    :param name: Имя поля.
+    :param field_type: Тип поля.
+    :return: Строка вида `"email:email"`.
+    """
+    return f"{name}:{field_type}"
+
+
+def normalize_document(document: Mapping[str, Any], order: int) -> Dict[str, Any]:
+    """
+    Дополняет плоский документ шаблона служебными полями нормализованного формата.
+
+    :param document: Документ вида `{"name": ..., <поле>: <тип>, ...}`.
+    :param order: Позиция шаблона в каталоге.
+    :return: Документ с полями `_fields` и `_order`.
+    """
+    template = {
+        key: value
+        for key, value in document.items()
+        if key not in ("_id", FIELDS_KEY, ORDER_KEY)
+    }
+    fields = FormTemplate(**dict(template)).fields
+    keys = sorted(field_key(name, field_type) for name, field_type in fields.items())
+    return {**template, FIELDS_KEY: keys, ORDER_KEY: order}
+
+
+def warn_unless_normalized(
+    meta: Optional[Mapping[str, Any]], collection: str, known: Optional[bool]
+) -> bool:
+    """
+    Проверяет признак нормализованного формата в документе версии каталога
+    и при первой проверке сообщает, что отбор на стороне MongoDB недоступен.
+
+    :param meta: Документ версии каталога (или `None`).
+    :param collection: Имя коллекции шаблонов.
+    :param known: Результат предыдущей проверки (`None` — ее не было).
+    :return: Переведена ли коллекция в нормализованный формат.
+    """
+    normalized = bool((meta or {}).get(NORMALIZED_KEY))
+    if not normalized and known is None:
+        logger.warning(
+            "Collection %r is not normalized; matching templates in the "
+            "application. Run `python -m app.storage.migrate mongo` to enable "
+            "server-side matching.",
+            collection,
+        )
+    return normalized
+
+
+def candidate_query(field_types: Mapping[str, FieldType]) -> Dict[str, Any]:
+    """
+    Возвращает запрос шаблонов, все типизированные поля которых есть в форме.
+
+    Условие `$in` выбирает шаблоны по мультиключевому индексу `_fields`,
+    а `$not`/`$elemMatch`/`$nin` отбрасывает те, у которых есть поле
+    вне формы (эквивалент `$setIsSubset` без этапа агрегации).
+
+    :param field_types: Типы полей формы.
+    :return: Фильтр MongoDB.
+    """
+    keys = [field_key(name, field_type) for name, field_type in field_types.items()]
+    return {
+        "$or": [{FIELDS_KEY: {"$in": keys}}, {FIELDS_KEY: {"$size": 0}}],
+        FIELDS_KEY: {"$not": {"$elemMatch": {"$nin": keys}}},
+    }
+
+
+def upsert_documents(
+    templates: Iterable[FormTemplate],
+    orders: Dict[str, int],
+    last_order: Optional[int],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Готовит нормализованные документы для добавления или замены шаблонов.
+
+    Существующий шаблон сохраняет свою позицию, новые получают позиции
+    после последней. Если имя повторяется, побеждает последняя версия.
+
+    :param templates: Новые версии шаблонов.
+    :param orders: Позиции существующих шаблонов по именам.
+    :param last_order: Наибольшая позиция в каталоге (`None` — каталог пуст).
+    :return: Словарь имя шаблона -> документ.
+    """
+    next_order = -1 if last_order is None else last_order
+    documents = {}
+    for template in templates:
+        order = orders.get(template.name)
+        if order is None:
+            next_order += 1
+            order = orders[template.name] = next_order
+        documents[template.name] = normalize_document(
+            {"name": template.name, **template.fields}, order
+        )
+    return documents
+
+
+def upsert_operations(documents: Mapping[str, Dict[str, Any]]) -> List[Any]:
+    """
+    Возвращает операции `bulk_write`, заменяющие шаблоны документами.
+
+    Старые версии шаблонов удаляются, новые вставляются; при упорядоченном
+    выполнении (`ordered=True`) замена выполняется целиком в указанном порядке.
+
+    :param documents: Словарь имя шаблона -> нормализованный документ.
+    :return: Список операций.
+    """
+    return [
+        DeleteMany({"name": {"$in": list(documents)}}),
+        *(InsertOne(document) for document in documents.values()),
+    ]
+
+
+def supports_transactions(hello: Mapping[str, Any]) -> bool:
+    """
+    Проверяет по ответу команды `hello`, поддерживает ли развертывание
+    транзакции (набор реплик или `mongos`).
+
+    :param hello: Ответ команды `hello`.
+    :return: `True`, если транзакции поддерживаются.
+    """
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+#: Сортировка для поиска последней позиции каталога
+LAST_ORDER = [(ORDER_KEY, DESCENDING)]
+
+#: Суффикс промежуточной коллекции для записи на отдельном сервере
+STAGING_SUFFIX = "_staging"
+
+#: Идентификатор документа блокировки записи в служебной коллекции
+LOCK_ID = "write_lock"
+
+T = TypeVar("T")
+
+
+def client_options(
+    MAX_POOL_SIZE: int = 100,
+    MIN_POOL_SIZE: int = 0,
+    SERVER_SELECTION_TIMEOUT_MS: int = 2000,
+    CONNECT_TIMEOUT_MS: int = 2000,
+    SOCKET_TIMEOUT_MS: int = 5000,
+    WAIT_QUEUE_TIMEOUT_MS: int = 1000,
+    READ_PREFERENCE: str = "primary",
+) -> Dict[str, Any]:
+    """
+    Переводит параметры конфигурации хранилища в параметры клиента pymongo.
+
+    :param MAX_POOL_SIZE: Максимальный размер пула соединений.
+    :param MIN_POOL_SIZE: Минимальный размер пула соединений.
+    :param SERVER_SELECTION_TIMEOUT_MS: Время ожидания доступного сервера.
+    :param CONNECT_TIMEOUT_MS: Таймаут установки соединения.
+    :param SOCKET_TIMEOUT_MS: Таймаут чтения ответа (0 — без ограничения).
+    :param WAIT_QUEUE_TIMEOUT_MS: Время ожидания свободного соединения в пуле.
+    :param READ_PREFERENCE: Предпочтение чтения.
+    :return: Именованные параметры `MongoClient`.
+    """
+    return {
+        "maxPoolSize": MAX_POOL_SIZE,
+        "minPoolSize": MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": SOCKET_TIMEOUT_MS or None,
+        "waitQueueTimeoutMS": WAIT_QUEUE_TIMEOUT_MS,
+        "readPreference": READ_PREFERENCE,
+    }
+
+
+class PoolStats(ConnectionPoolListener):
+    """
+    Статистика использования пулов соединений клиента по событиям pymongo.
+
+    Атрибуты:
+    - `open`: Открытых соединений.
+    - `in_use`: Соединений, выданных операциям.
+    - `waiting`: Операций, ожидающих соединения.
+    - `checkout_failures`: Неудачных попыток получить соединение.
+    - `pool_clears`: Сбросов пула (после сетевых ошибок).
+    """
+
+    def __init__(self):
+        self.open = self.in_use = self.waiting = 0
+        self.checkout_failures = self.pool_clears = 0
+        self._lock = threading.Lock()
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Возвращает значения статистики.
+
+        :return: Словарь с ключами `open`, `in_use`, `waiting`,
+                 `checkout_failures`, `pool_clears`.
+        """
+        return {
+            "open": self.open,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "checkout_failures": self.checkout_failures,
+            "pool_clears": self.pool_clears,
+        }
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+
+class MongoDBStorage(WritableStorage):
     """
     Реализация хранилища на основе MongoDB.
+
+    Версия данных отслеживается по счетчику в служебной коллекции
+    `<COLLECTION>_meta` (документ `{"_id": "catalog", "version": N}`),
+    который увеличивают записывающие клиенты, и по количеству документов.
+
+    После миграции (`migrate`) документы дополнительно содержат
+    нормализованный массив типизированных полей `_fields` и позицию
+    `_order`, и подходящие форме шаблоны отбираются на стороне MongoDB
+    (`find_templates`). Миграция отмечает коллекцию признаком `normalized`
+    в документе версии; без него `find_templates` возвращает весь каталог.
+
+    Обращения к MongoDB проходят через автоматический выключатель
+    (`breaker`): после нескольких ошибок соединения подряд они завершаются
+    `StorageUnavailableError` сразу, без ожидания таймаутов, а кеш шаблонов
+    продолжает отдавать последний загруженный каталог.
+
+    Изменения каталога (`upsert_templates`, `delete_templates`) атомарны:
+    в наборе реплик и через `mongos` они выполняются одним `bulk_write`
+    в транзакции вместе с увеличением счетчика версии. Отдельный сервер
+    транзакций не поддерживает, поэтому изменение применяется к копии
+    коллекции, которая затем атомарно заменяет исходную
+    (`renameCollection`); записи разных процессов упорядочиваются
+    блокировкой в служебной коллекции.
+
+    Атрибуты:
+    - `transactions`: Поддерживает ли развертывание транзакции
+                      (`None` — определяется командой `hello` при первой записи).
     """
 
-    def __init__(self, HOST: str, NAME: str, COLLECTION: str):
+    #: Идентификатор документа со счетчиком версии каталога
+    VERSION_ID = "catalog"
+
+    #: Размер пакета курсора при поиске кандидатов
+    BATCH_SIZE = 1000
+
+    #: Время в секундах, после которого блокировка записи считается брошенной
+    LOCK_LEASE = 60.0
+
+    #: Время ожидания блокировки записи в секундах
+    LOCK_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        HOST: str,
+        NAME: str,
+        COLLECTION: str,
+        BREAKER_THRESHOLD: int = 5,
+        BREAKER_RESET_TIMEOUT: float = 30.0,
+        **options,
+    ):
         """
         Инициализация хранилища MongoDB.
 
+        Соединения открываются лениво, при первом запросе.
+
         :param HOST: Адрес подключения к MongoDB.
         :param NAME: Имя базы данных.
         :param COLLECTION: Имя коллекции в базе данных.
+        :param BREAKER_THRESHOLD: Количество ошибок соединения подряд
+                                  до приостановки обращений.
+        :param BREAKER_RESET_TIMEOUT: Время в секундах до повторной попытки.
+        :param options: Параметры пула и таймаутов (см. `client_options`).
+        """
+        self.pool_stats = PoolStats()
+        self.breaker = CircuitBreaker(
+            (ConnectionFailure,), BREAKER_THRESHOLD, BREAKER_RESET_TIMEOUT
+        )
+        self.client = MongoClient(
+            HOST, event_listeners=[self.pool_stats], **client_options(**options)
+        )
+        self.database = self.client[NAME]
+        self.collection_name = COLLECTION
+        self.collection = self.database[COLLECTION]
+        self.meta = self.database[f"{COLLECTION}_meta"]
+        self.transactions: Optional[bool] = None
+        self.normalized: Optional[bool] = None
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние выключателя и статистику пула соединений.
+
+        :return: Словарь с ключами `state`, `failures`, `last_error`, `pool`.
+        """
+        return {**self.breaker.as_dict(), "pool": self.pool_stats.as_dict()}
+
+    def close(self) -> None:
         """
-        self.client = MongoClient(HOST)
-        self.collection = self.client[NAME][COLLECTION]
+        Закрывает клиент MongoDB (соединения и фоновые потоки мониторинга).
+        """
+        self.client.close()
 
     def get_templates(self) -> List[FormTemplate]:
         """
-        Возвращает список всех шаблонов из коллекции.
+        Возвращает список всех шаблонов из коллекции в порядке каталога
+        (по `_order`; документы без него — в естественном порядке).
 
         :return: Список объектов `FormTemplate`, созданных из записей коллекции.
         """
-        templates = self.collection.find({}, {"_id": 0})
-        return [FormTemplate(**template) for template in templates]
+        with self.breaker:
+            templates = self.collection.find({}, TEMPLATE_PROJECTION).sort(
+                ORDER_KEY, ASCENDING
+            )
+            return [FormTemplate(**template) for template in templates]
+
+    def find_templates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> List[FormTemplate]:
+        """
+        Возвращает шаблоны, подходящие форме, отбирая их на стороне MongoDB.
+
+        Если коллекция не переведена в нормализованный формат (см. `migrate`),
+        возвращает весь каталог: шаблоны подбираются в приложении.
+
+        :param field_types: Типы полей формы.
+        :return: Шаблоны-кандидаты в порядке каталога.
+        """
+        if not self.is_normalized():
+            return self.get_templates()
+        with self.breaker:
+            cursor = (
+                self.collection.find(candidate_query(field_types), TEMPLATE_PROJECTION)
+                .sort(ORDER_KEY, ASCENDING)
+                .batch_size(self.BATCH_SIZE)
+            )
+            return [FormTemplate(**template) for template in cursor]
+
+    def is_normalized(self) -> bool:
+        """
+        Переведена ли коллекция в нормализованный формат (см. `migrate`).
+
+        Положительный ответ запоминается: записи сохраняют формат.
+
+        :return: `True`, если миграция выполнена.
+        """
+        if not self.normalized:
+            with self.breaker:
+                meta = self.meta.find_one({"_id": self.VERSION_ID}, {NORMALIZED_KEY: 1})
+            self.normalized = warn_unless_normalized(
+                meta, self.collection_name, self.normalized
+            )
+        return self.normalized
+
+    def get_version(self) -> Tuple[int, int]:
+        """
+        Возвращает версию каталога: значение счетчика и число документов.
+
+        :return: Кортеж `(version, count)`.
+        """
+        with self.breaker:
+            meta = self.meta.find_one({"_id": self.VERSION_ID}, {"version": 1}) or {}
+            return meta.get("version", 0), self.collection.estimated_document_count()
+
+    def bump_version(self, session: Optional[ClientSession] = None) -> None:
+        """
+        Увеличивает счетчик версии каталога, чтобы кеши перезагрузили шаблоны.
+
+        :param session: Сессия транзакции, в которой выполняется запись.
+        """
+        with self.breaker:
+            self.meta.update_one(
+                {"_id": self.VERSION_ID},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                session=session,
+            )
+
+    def migrate(self) -> int:
+        """
+        Переводит документы коллекции из плоского формата в нормализованный
+        и создает индексы по `_fields` и `_order`.
+
+        Позиции шаблонов соответствуют текущему порядку документов.
+        Повторный запуск безопасен.
+
+        :return: Количество обновленных документов.
+        """
+        with self.breaker:
+            documents = list(self.collection.find({}))
+            for order, document in enumerate(documents):
+                self.collection.replace_one(
+                    {"_id": document["_id"]}, normalize_document(document, order)
+                )
+            self.ensure_indexes()
+            self.meta.update_one(
+                {"_id": self.VERSION_ID},
+                {"$set": {NORMALIZED_KEY: True}},
+                upsert=True,
+            )
+            self.bump_version()
+            return len(documents)
+
+    def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Добавляет или заменяет шаблоны по именам в нормализованном формате
+        и увеличивает счетчик версии.
+
+        Все шаблоны записываются атомарно (см. описание класса): читатели
+        видят либо прежний каталог, либо каталог со всеми изменениями.
+
+        :param templates: Список шаблонов.
+        """
+        if not templates:
+            return
+
+        def upsert(collection: Collection, session: Optional[ClientSession]) -> None:
+            existing = collection.find(
+                {"name": {"$in": [template.name for template in templates]}},
+                {"name": 1, ORDER_KEY: 1},
+                session=session,
+            )
+            last = collection.find_one(
+                {}, {ORDER_KEY: 1}, sort=LAST_ORDER, session=session
+            )
+            documents = upsert_documents(
+                templates,
+                {doc["name"]: doc[ORDER_KEY] for doc in existing if ORDER_KEY in doc},
+                (last or {}).get(ORDER_KEY),
+            )
+            collection.bulk_write(
+                upsert_operations(documents), ordered=True, session=session
+            )
+
+        with self.breaker:
+            self._write(upsert)
+
+    def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам и увеличивает счетчик версии.
+
+        Шаблоны удаляются атомарно (см. описание класса).
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        query = {"name": {"$in": list(names)}}
+
+        def delete(collection: Collection, session: Optional[ClientSession]) -> int:
+            return collection.delete_many(query, session=session).deleted_count
+
+        with self.breaker:
+            if not self.collection.count_documents(query, limit=1):
+                return 0
+            return self._write(delete)
+
+    def ensure_indexes(self, collection: Optional[Collection] = None) -> None:
+        """
+        Создает индексы нормализованного формата.
+
+        :param collection: Коллекция (по умолчанию — коллекция каталога).
+        """
+        collection = self.collection if collection is None else collection
+        with self.breaker:
+            collection.create_index([(FIELDS_KEY, ASCENDING)])
+            collection.create_index([(ORDER_KEY, ASCENDING)])
+
+    def _write(self, apply: Callable[[Collection, Optional[ClientSession]], T]) -> T:
+        """
+        Атомарно применяет изменение каталога и увеличивает счетчик версии.
+
+        :param apply: Функция, записывающая изменение в переданную коллекцию
+                      (в транзакции — с переданной сессией).
+        :return: Результат `apply`.
+        """
+        if self.transactions is None:
+            self.transactions = supports_transactions(
+                self.client.admin.command("hello")
+            )
+        if self.transactions:
+            with self.client.start_session() as session:
+
+                def transaction(session: ClientSession) -> T:
+                    result = apply(self.collection, session)
+                    self.bump_version(session)
+                    return result
+
+                return session.with_transaction(transaction)
+
+        with self._write_lock():
+            staging = self.database[self.collection_name + STAGING_SUFFIX]
+            staging.drop()
+            self.collection.aggregate([{"$match": {}}, {"$out": staging.name}])
+            result = apply(staging, None)
+            self.ensure_indexes(staging)
+            staging.rename(self.collection_name, dropTarget=True)
+            self.bump_version()
+            return result
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """
+        Блокировка записи каталога, общая для всех процессов.
+
+        Блокировка — документ `LOCK_ID` в служебной коллекции; брошенная
+        блокировка (процесс завершился во время записи) снимается через
+        `LOCK_LEASE` секунд.
+
+        :raises StorageUnavailableError: Если блокировку не удалось получить
+                                         за `LOCK_TIMEOUT` секунд.
+        """
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while True:
+            now = time.time()
+            try:
+                self.meta.insert_one(
+                    {"_id": LOCK_ID, "owner": owner, "expires": now + self.LOCK_LEASE}
+                )
+                break
+            except DuplicateKeyError:
+                self.meta.delete_one({"_id": LOCK_ID, "expires": {"$lt": now}})
+                if time.monotonic() >= deadline:
+                    raise StorageUnavailableError(
+                        "Catalog is being modified by another writer."
+                    )
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            self.meta.delete_one({"_id": LOCK_ID, "owner": owner})
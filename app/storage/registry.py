@@ -1,4 +1,5 @@
-from typing import Dict, Type
+from importlib import import_module
+from typing import Dict, Type, Union
 
 from app.storage.base import Storage
 
@@ -8,28 +9,34 @@ class StorageRegistry:
     Реестр хранилищ для динамического выбора реализации.
 
     Это класс, который управляет регистрацией и выбором различных типов хранилищ.
+    Хранилище можно зарегистрировать классом или путем к нему
+    (`"пакет.модуль.Класс"`); во втором случае модуль импортируется только
+    при первом обращении к этому типу хранилища, поэтому драйверы
+    неиспользуемых хранилищ (например, `pymongo`) не загружаются.
 
     Атрибуты:
     - `_registry`: Словарь, где ключами являются имена типов хранилищ,
-                   значениями - классы хранилищ.
+                   значениями - классы хранилищ или пути к ним.
     """
 
-    _registry: Dict[str, Type[Storage]] = {}
+    _registry: Dict[str, Union[str, Type[Storage]]] = {}
 
     @classmethod
-    def register(cls, name: str, storage_cls: Type[Storage]) -> None:
+    def register(cls, name: str, storage_cls: Union[str, Type[Storage]]) -> None:
         """
         Регистрирует класс хранилища с заданным именем.
 
         :param name: Имя типа хранилища.
-        :param storage_cls: Класс хранилища, который будет зарегистрирован.
+        :param storage_cls: Класс хранилища или путь к нему
+                            в виде `"пакет.модуль.Класс"`.
         """
         cls._registry[name] = storage_cls
 
     @classmethod
     def get_storage(cls, name: str) -> Type[Storage]:
         """
-        Возвращает зарегистрированный класс хранилища по имени.
+        Возвращает зарегистрированный класс хранилища по имени,
+        импортируя его модуль при первом обращении.
 
         :param name: Имя типа хранилища.
         :return: Класс хранилища, зарегистрированный под данным именем.
@@ -37,4 +44,9 @@ class StorageRegistry:
         """
         if name not in cls._registry:
             raise ValueError(f"Storage type '{name}' is not registered.")
-        return cls._registry[name]
+        storage_cls = cls._registry[name]
+        if isinstance(storage_cls, str):
+            module_name, _, class_name = storage_cls.rpartition(".")
+            storage_cls = getattr(import_module(module_name), class_name)
+            cls._registry[name] = storage_cls
+        return storage_cls
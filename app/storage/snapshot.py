@@ -0,0 +1,190 @@
+"""
+Хранилище-снимок каталога и команды для его сборки и проверки.
+
+Снимок собирается из любого зарегистрированного хранилища. Источник
+задается так же, как для сервиса (`STORAGE_TYPE`, `STORAGE_NAME`, ...),
+или параметрами `--source-*`.
+
+Запуск:
+    python -m app.storage.snapshot build data/forms.snapshot \
+        --source-type TinyDB --source-name data/forms.json
+    python -m app.storage.snapshot verify data/forms.snapshot \
+        --source-type TinyDB --source-name data/forms.json
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from typing import List, Optional, Tuple, Union
+
+from app.core.config import get_storage_config
+from app.models.form_template import FormTemplate
+from app.services.matcher import TemplateIndex
+from app.services.snapshot import SnapshotIndex, write_snapshot
+from app.storage.base import AsyncStorage, Storage
+from app.storage.registry import StorageRegistry
+from app.storage.threaded import is_async_storage
+
+#: Параметры командной строки для источника и соответствующие переменные окружения
+SOURCE_OPTIONS = {
+    "source_type": "STORAGE_TYPE",
+    "source_host": "STORAGE_HOST",
+    "source_name": "STORAGE_NAME",
+    "source_collection": "STORAGE_COLLECTION",
+}
+
+
+class SnapshotStorage(Storage):
+    """
+    Хранилище, читающее каталог из бинарного снимка.
+
+    Кеш шаблонов использует готовый индекс снимка (`load_index`) вместо
+    построения индекса из списка шаблонов. Хранилище доступно только
+    для чтения: чтобы изменить каталог, снимок собирается заново.
+    """
+
+    def __init__(self, NAME: str):
+        """
+        Инициализация хранилища.
+
+        :param NAME: Путь к файлу снимка.
+        """
+        self.path = NAME
+
+    def load_index(self) -> SnapshotIndex:
+        """
+        Открывает снимок и возвращает его индекс.
+
+        :return: Объект `SnapshotIndex`.
+        :raises SnapshotError: Если файл не является снимком поддерживаемой версии.
+        """
+        return SnapshotIndex(self.path)
+
+    def get_templates(self) -> List[FormTemplate]:
+        """
+        Возвращает список всех шаблонов снимка.
+
+        :return: Список объектов `FormTemplate`.
+        """
+        return self.load_index().templates()
+
+    def get_version(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Возвращает версию снимка по времени изменения, размеру и inode файла.
+
+        Снимок заменяется атомарно, поэтому новая сборка меняет inode.
+
+        :return: Кортеж `(mtime_ns, size, inode)` или `None`, если файл недоступен.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def build(path: str, storage: Union[Storage, AsyncStorage]) -> int:
+    """
+    Собирает снимок из хранилища.
+
+    :param path: Путь к файлу снимка.
+    :param storage: Хранилище-источник.
+    :return: Количество шаблонов в снимке.
+    """
+    return write_snapshot(path, _source_templates(storage))
+
+
+def verify(path: str, storage: Union[Storage, AsyncStorage]) -> List[str]:
+    """
+    Проверяет снимок: целостность данных, совпадение шаблонов с источником
+    и совпадение результатов подбора с индексом, построенным из источника.
+
+    :param path: Путь к файлу снимка.
+    :param storage: Хранилище-источник.
+    :return: Список найденных расхождений (пустой, если снимок корректен).
+    :raises SnapshotError: Если файл не является снимком поддерживаемой версии.
+    """
+    snapshot = SnapshotIndex(path)
+    if not snapshot.verify_checksum():
+        return ["checksum mismatch"]
+
+    source = _source_templates(storage)
+    problems = []
+    templates = snapshot.templates()
+    if len(templates) != len(source):
+        problems.append(
+            f"template count: snapshot {len(templates)}, source {len(source)}"
+        )
+    for position, (actual, expected) in enumerate(zip(templates, source)):
+        if (actual.name, actual.fields) != (expected.name, expected.fields):
+            problems.append(f"template #{position} {expected.name!r} differs")
+
+    index = TemplateIndex(source)
+    for template in source:
+        for method in ("match_name", "match_best_name"):
+            actual = getattr(snapshot, method)(template.fields)
+            expected = getattr(index, method)(template.fields)
+            if actual != expected:
+                problems.append(
+                    f"{method} for {template.name!r}: snapshot {actual!r},"
+                    f" source {expected!r}"
+                )
+    return problems
+
+
+def _source_templates(storage: Union[Storage, AsyncStorage]) -> List[FormTemplate]:
+    if is_async_storage(storage):
+        return asyncio.run(storage.get_templates())
+    return storage.get_templates()
+
+
+def _source_storage(args: argparse.Namespace) -> Union[Storage, AsyncStorage]:
+    """
+    Создает хранилище-источник по параметрам командной строки
+    и переменным окружения.
+
+    :param args: Аргументы командной строки.
+    :return: Хранилище.
+    """
+    for option, variable in SOURCE_OPTIONS.items():
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[variable] = value
+
+    config = get_storage_config()
+    storage_cls = StorageRegistry.get_storage(config["STORAGE_TYPE"])
+    return storage_cls(**config["STORAGE_PARAMS"])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Template catalog snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command, help in (
+        ("build", "собрать снимок из хранилища"),
+        ("verify", "сверить снимок с хранилищем"),
+    ):
+        subparser = commands.add_parser(command, help=help)
+        subparser.add_argument("path", help="Файл снимка")
+        subparser.add_argument("--source-type", help="Тип хранилища-источника")
+        subparser.add_argument("--source-host", help="Адрес MongoDB")
+        subparser.add_argument("--source-name", help="Имя файла или базы данных")
+        subparser.add_argument("--source-collection", help="Имя коллекции")
+    args = parser.parse_args(argv)
+
+    storage = _source_storage(args)
+    if args.command == "build":
+        count = build(args.path, storage)
+        print(f"Wrote {count} templates to {args.path}")
+        return
+
+    problems = verify(args.path, storage)
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print(f"Snapshot {args.path} matches the source")
+
+
+if __name__ == "__main__":
+    main()
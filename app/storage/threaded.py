@@ -0,0 +1,137 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Iterable, List, Mapping, Optional, Union
+
+from app.models.form_template import FieldType, FormTemplate
+from app.storage.base import AsyncStorage, Storage
+
+
+class ThreadPoolStorage(AsyncStorage):
+    """
+    Асинхронный адаптер для синхронного хранилища.
+
+    Выполняет блокирующие вызовы оборачиваемого хранилища в ограниченном
+    пуле потоков, не занимая цикл событий.
+    """
+
+    def __init__(self, storage: Storage, max_workers: int = 4):
+        """
+        Инициализация адаптера.
+
+        :param storage: Синхронное хранилище.
+        :param max_workers: Максимальное число потоков пула.
+        """
+        self.storage = storage
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+
+    async def get_templates(self) -> List[FormTemplate]:
+        """
+        Получает список всех шаблонов форм в пуле потоков.
+
+        :return: Список объектов типа `FormTemplate`.
+        """
+        return await self._run(self.storage.get_templates)
+
+    async def get_version(self) -> Optional[Hashable]:
+        """
+        Получает метку версии данных в пуле потоков.
+
+        :return: Метка версии или `None`.
+        """
+        get_version = getattr(self.storage, "get_version", None)
+        if get_version is None:
+            return None
+        return await self._run(get_version)
+
+    async def find_templates(
+        self, field_types: Mapping[str, FieldType]
+    ) -> List[FormTemplate]:
+        """
+        Получает шаблоны-кандидаты для формы в пуле потоков.
+
+        Доступно, если оборачиваемое хранилище реализует `find_templates`.
+
+        :param field_types: Типы полей формы.
+        :return: Список объектов типа `FormTemplate`.
+        """
+        return await self._run(lambda: self.storage.find_templates(field_types))
+
+    async def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Добавляет или заменяет шаблоны в пуле потоков.
+
+        Доступно, если оборачиваемое хранилище реализует `upsert_templates`.
+
+        :param templates: Список шаблонов.
+        """
+        await self._run(lambda: self.storage.upsert_templates(templates))
+
+    async def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам в пуле потоков.
+
+        Доступно, если оборачиваемое хранилище реализует `delete_templates`.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        return await self._run(lambda: self.storage.delete_templates(names))
+
+    async def aclose(self) -> None:
+        """
+        Останавливает пул потоков и закрывает оборачиваемое хранилище.
+        После закрытия адаптер не используется.
+        """
+        self.executor.shutdown(wait=True)
+        aclose = getattr(self.storage, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def after_fork(self) -> None:
+        """
+        Создает пул потоков заново в дочернем процессе после `fork`
+        (потоки пула родителя в нем не существуют) и передает вызов
+        оборачиваемому хранилищу.
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="storage"
+        )
+        after_fork = getattr(self.storage, "after_fork", None)
+        if after_fork is not None:
+            after_fork()
+
+    async def _run(self, func):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func)
+
+
+def is_async_storage(storage: Union[Storage, AsyncStorage]) -> bool:
+    """
+    Проверяет, реализует ли хранилище асинхронный интерфейс.
+
+    :param storage: Хранилище.
+    :return: `True`, если `get_templates` — корутина.
+    """
+    return inspect.iscoroutinefunction(storage.get_templates)
+
+
+def to_async(
+    storage: Union[Storage, AsyncStorage], max_workers: int = 4
+) -> AsyncStorage:
+    """
+    Возвращает асинхронный интерфейс к хранилищу.
+
+    Асинхронные хранилища возвращаются как есть, синхронные оборачиваются
+    в `ThreadPoolStorage`.
+
+    :param storage: Синхронное или асинхронное хранилище.
+    :param max_workers: Размер пула потоков для синхронного хранилища.
+    :return: Асинхронное хранилище.
+    """
+    if is_async_storage(storage):
+        return storage
+    return ThreadPoolStorage(storage, max_workers=max_workers)
@@ -1,11 +1,14 @@
-from typing import List
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from app.models.form_template import FormTemplate
-from app.storage.base import Storage
+from app.storage.base import WritableStorage
 from tinydb import TinyDB
+from tinydb.table import Table
 
 
-class TinyDBStorage(Storage):
+class TinyDBStorage(WritableStorage):
     """
     Реализация хранилища на основе TinyDB.
     """
@@ -17,7 +20,11 @@ class TinyDBStorage(Storage):
         :param NAME: Имя файла базы данных.
         :param COLLECTION: Имя коллекции в базе данных.
         """
-        self.db = TinyDB(NAME).table(COLLECTION)
+        self.path = NAME
+        self.collection = COLLECTION
+        self.database = TinyDB(NAME)
+        self.db = self.database.table(COLLECTION)
+        self._lock = threading.Lock()
 
     def get_templates(self) -> List[FormTemplate]:
         """
@@ -27,3 +34,84 @@ class TinyDBStorage(Storage):
         """
         raw_data = self.db.all()
         return [FormTemplate(**doc) for doc in raw_data]
+
+    def get_version(self) -> Optional[Tuple[int, int]]:
+        """
+        Возвращает версию данных по времени изменения и размеру файла.
+
+        :return: Кортеж `(mtime_ns, size)` или `None`, если файл недоступен.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def upsert_templates(self, templates: List[FormTemplate]) -> None:
+        """
+        Добавляет или заменяет шаблоны по именам одной записью файла.
+
+        Замененный шаблон сохраняет свой идентификатор документа и позицию,
+        новый получает следующий идентификатор.
+
+        :param templates: Список шаблонов.
+        """
+        documents = [{"name": t.name, **t.fields} for t in templates]
+
+        def update(table: Dict[str, dict]) -> None:
+            ids = _ids_by_name(table)
+            next_id = max(map(int, table), default=0) + 1
+            for document in documents:
+                doc_ids = ids.get(document["name"])
+                if not doc_ids:
+                    doc_ids = ids[document["name"]] = [str(next_id)]
+                    next_id += 1
+                for doc_id in doc_ids:
+                    table[doc_id] = dict(document)
+
+        self._update(update)
+
+    def delete_templates(self, names: Iterable[str]) -> int:
+        """
+        Удаляет шаблоны по именам одной записью файла.
+
+        :param names: Имена удаляемых шаблонов.
+        :return: Количество удаленных шаблонов.
+        """
+        names = set(names)
+        deleted = []
+
+        def update(table: Dict[str, dict]) -> None:
+            for name, doc_ids in _ids_by_name(table).items():
+                if name in names:
+                    for doc_id in doc_ids:
+                        del table[doc_id]
+                        deleted.append(doc_id)
+
+        self._update(update)
+        return len(deleted)
+
+    def _update(self, update: Callable[[Dict[str, dict]], None]) -> None:
+        """
+        Изменяет таблицу одной записью файла.
+
+        Данные читаются и записываются через хранилище TinyDB (`storage`),
+        после чего таблица открывается заново: кеши прежнего объекта `Table`
+        (в том числе следующий идентификатор документа) не переживают запись.
+        Записи внутри процесса упорядочиваются блокировкой.
+
+        :param update: Функция, изменяющая документы таблицы по идентификаторам.
+        """
+        with self._lock:
+            storage = self.database.storage
+            data = storage.read() or {}
+            update(data.setdefault(self.collection, {}))
+            storage.write(data)
+            self.db = Table(storage, self.collection)
+
+
+def _ids_by_name(table: Dict[str, dict]) -> Dict[str, List[str]]:
+    ids: Dict[str, List[str]] = {}
+    for doc_id, document in table.items():
+        ids.setdefault(document.get("name"), []).append(doc_id)
+    return ids
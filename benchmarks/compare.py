@@ -0,0 +1,65 @@
+"""
+Сравнение результатов двух запусков `benchmarks.run`.
+
+Запуск:
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+Для каждого общего сценария печатается отношение p50/p99 и пропускной
+способности; сценарии, где p50 вырос больше порога, отмечаются как регрессии.
+Код возврата 1, если найдена хотя бы одна регрессия.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> List[str]:
+    """
+    Печатает сравнение и возвращает список сценариев с регрессией.
+
+    :param base: Результаты базового запуска.
+    :param head: Результаты нового запуска.
+    :param threshold: Допустимый относительный рост p50 (например, 0.1).
+    :return: Имена сценариев с регрессией.
+    """
+    regressions = []
+    print(f"{'case':<45} {'p50':>8} {'p99':>8} {'ops/s':>8}")
+    for name, new in head["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            continue
+        p50 = new["p50_us"] / old["p50_us"] if old["p50_us"] else 1.0
+        p99 = new["p99_us"] / old["p99_us"] if old["p99_us"] else 1.0
+        ops = (
+            new["throughput_per_s"] / old["throughput_per_s"]
+            if old["throughput_per_s"]
+            else 1.0
+        )
+        mark = ""
+        if p50 > 1 + threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(f"{name:<45} {p50:>7.2f}x {p99:>7.2f}x {ops:>7.2f}x{mark}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f"base: {base['meta']['commit']}  head: {head['meta']['commit']}")
+    sys.exit(1 if compare(base, head, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
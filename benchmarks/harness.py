@@ -0,0 +1,79 @@
+"""
+Измерение задержек и пропускной способности для бенчмарков.
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Возвращает перцентиль по отсортированным значениям (метод ближайшего ранга).
+
+    :param sorted_values: Отсортированные значения.
+    :param fraction: Доля от 0 до 1 (например, 0.99).
+    :return: Значение перцентиля.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_ns: List[int], total_ns: int) -> Dict[str, float]:
+    """
+    Считает перцентили задержки (в микросекундах) и пропускную способность.
+
+    :param latencies_ns: Задержки отдельных операций в наносекундах.
+    :param total_ns: Суммарное время измерения в наносекундах.
+    :return: Словарь с ключами `count`, `p50_us`, `p95_us`, `p99_us`,
+             `max_us`, `mean_us`, `throughput_per_s`.
+    """
+    values = sorted(latencies_ns)
+    count = len(values)
+    return {
+        "count": count,
+        "p50_us": percentile(values, 0.50) / 1000,
+        "p95_us": percentile(values, 0.95) / 1000,
+        "p99_us": percentile(values, 0.99) / 1000,
+        "max_us": (values[-1] if values else 0) / 1000,
+        "mean_us": (sum(values) / count if count else 0) / 1000,
+        "throughput_per_s": count / (total_ns / 1e9) if total_ns else 0.0,
+    }
+
+
+def bench(
+    func: Callable[[Any], Any], inputs: Iterable[Any], warmup: int = 100
+) -> Dict[str, float]:
+    """
+    Вызывает `func` для каждого входного значения и измеряет задержки.
+
+    :param func: Измеряемая функция одного аргумента.
+    :param inputs: Входные значения.
+    :param warmup: Количество первых вызовов, не попадающих в статистику.
+    :return: Результат `summarize`.
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    inputs = list(inputs)
+
+    for item in inputs[:warmup]:
+        func(item)
+
+    started = clock()
+    for item in inputs:
+        start = clock()
+        func(item)
+        latencies.append(clock() - start)
+    return summarize(latencies, clock() - started)
+
+
+def bench_repeat(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Вызывает `func` без аргументов `repeat` раз и измеряет задержки.
+
+    :param func: Измеряемая функция.
+    :param repeat: Количество вызовов.
+    :return: Результат `summarize`.
+    """
+    return bench(lambda _: func(), range(repeat), warmup=1)
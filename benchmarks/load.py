@@ -0,0 +1,491 @@
+"""
+Нагрузочное тестирование `/get_form`.
+
+Отправляет формы сценария с заданной конкурентностью (`--concurrency`,
+замкнутый цикл: следующий запрос уходит после ответа на предыдущий) или
+с заданной частотой (`--rps`, открытый цикл: запросы уходят по расписанию
+независимо от ответов, а задержка считается от запланированного момента
+отправки, поэтому отставание сервиса попадает в перцентили). Печатает
+перцентили задержки, пропускную способность, долю ошибок и долю найденных
+шаблонов и сохраняет результаты в JSON в формате `benchmarks.run`
+(их можно сравнить с помощью `python -m benchmarks.compare`).
+
+По умолчанию запросы выполняются в текущем процессе через ASGI-транспорт
+httpx к `app.api.endpoints.app`, а каталог сценария записывается в выбранное
+хранилище (`--storage`): TinyDB, снимок каталога, mongomock или локальный
+MongoDB (`--storage-host`). Клиент и сервис при этом делят процессор,
+поэтому абсолютные значения ниже, чем у отдельного сервиса, но режимы
+работы и хранилища сравниваются в одинаковых условиях. С `--url` запросы
+отправляются запущенному сервису; каталог тогда определяется его хранилищем.
+
+Режим сервиса задается переменными окружения (`--env FAST_PATH_ENABLED=true`,
+`--env RESULT_CACHE_SIZE=0`, ...), которые применяются до импорта приложения.
+
+Сценарий — JSON-файл (см. `benchmarks/scenarios`) с ключами:
+- `templates`, `vocabulary`, `min_fields`, `max_fields` — синтетический
+  каталог (см. `benchmarks.synthetic`);
+- `forms`, `match_ratio`, `extra_fields` — синтетический поток форм;
+- `catalog` — путь к каталогу в формате TinyDB (например, `data/forms.json`)
+  вместо синтетического;
+- `recorded` — путь к записанным формам в NDJSON (по объекту на строку)
+  вместо синтетических;
+- `match` — режим подбора (`first`, `best`).
+Относительные пути отсчитываются от каталога файла сценария.
+
+Запуск:
+    python -m benchmarks.load benchmarks/scenarios/*.json --concurrency 32 --duration 10
+    python -m benchmarks.load benchmarks/scenarios/matching.json --rps 500 --storage mongomock
+    python -m benchmarks.load benchmarks/scenarios/matching.json --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from contextlib import ExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+from urllib.parse import urlencode
+
+import httpx
+from tinydb import TinyDB
+
+from benchmarks.harness import summarize
+from benchmarks.run import git_commit
+from benchmarks.synthetic import make_field_names, make_forms, make_template_documents
+
+#: Каталог для результатов по умолчанию
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+#: Хранилища, в которые записывается каталог сценария
+STORAGES = ("tinydb", "snapshot", "mongomock", "mongodb")
+
+#: Значения сценария по умолчанию
+SCENARIO_DEFAULTS: Dict[str, Any] = {
+    "templates": 1000,
+    "vocabulary": 500,
+    "min_fields": 2,
+    "max_fields": 8,
+    "forms": 5000,
+    "match_ratio": 0.7,
+    "extra_fields": 2,
+    "match": "first",
+    "seed": 0,
+}
+
+#: Отправка тела запроса; возвращает код ответа и найден ли шаблон
+Send = Callable[[bytes], Awaitable[Tuple[int, bool]]]
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    """
+    Читает сценарий и строит его каталог и поток форм.
+
+    :param path: Путь к JSON-файлу сценария.
+    :return: Сценарий с ключами `name`, `documents`, `forms` и параметрами.
+    """
+    with open(path) as f:
+        scenario = {**SCENARIO_DEFAULTS, **json.load(f)}
+    scenario["name"] = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.dirname(os.path.abspath(path))
+    field_names = make_field_names(scenario["vocabulary"])
+
+    if "catalog" in scenario:
+        with open(os.path.join(base, scenario["catalog"])) as f:
+            scenario["documents"] = list(json.load(f).get("forms", {}).values())
+    else:
+        scenario["documents"] = make_template_documents(
+            scenario["templates"],
+            min_fields=scenario["min_fields"],
+            max_fields=scenario["max_fields"],
+            seed=scenario["seed"],
+            field_names=field_names,
+        )
+
+    if "recorded" in scenario:
+        with open(os.path.join(base, scenario["recorded"])) as f:
+            scenario["forms"] = [json.loads(line) for line in f if line.strip()]
+    else:
+        scenario["forms"] = make_forms(
+            scenario["documents"],
+            scenario["forms"],
+            match_ratio=scenario["match_ratio"],
+            extra_fields=scenario["extra_fields"],
+            seed=scenario["seed"] + 1,
+            field_names=field_names,
+        )
+    return scenario
+
+
+def prepare_storage(
+    storage: str,
+    documents: List[Dict[str, str]],
+    directory: str,
+    host: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Записывает каталог в хранилище и возвращает переменные окружения сервиса.
+
+    :param storage: Тип хранилища (см. `STORAGES`).
+    :param documents: Документы шаблонов.
+    :param directory: Каталог для файлов хранилища.
+    :param host: Адрес MongoDB для `mongodb`.
+    :return: Переменные `STORAGE_*`.
+    """
+    if storage in ("tinydb", "snapshot"):
+        path = os.path.join(directory, f"forms-{len(os.listdir(directory))}.json")
+        db = TinyDB(path)
+        db.table("forms").insert_multiple(dict(doc) for doc in documents)
+        db.close()
+        if storage == "tinydb":
+            return {
+                "STORAGE_TYPE": "TinyDB",
+                "STORAGE_NAME": path,
+                "STORAGE_COLLECTION": "forms",
+            }
+
+        from app.models.form_template import FormTemplate
+        from app.services.snapshot import write_snapshot
+
+        snapshot = f"{path}.snapshot"
+        write_snapshot(snapshot, (FormTemplate(**dict(doc)) for doc in documents))
+        return {"STORAGE_TYPE": "Snapshot", "STORAGE_NAME": snapshot}
+
+    from app.storage.mongodb import MongoDBStorage
+
+    storage = MongoDBStorage(
+        HOST=host or "mongodb://localhost", NAME="forms_loadtest", COLLECTION="forms"
+    )
+    storage.client.drop_database("forms_loadtest")
+    storage.collection.insert_many([dict(doc) for doc in documents])
+    storage.migrate()
+    return {
+        "STORAGE_TYPE": "MongoDB",
+        "STORAGE_HOST": host or "mongodb://localhost",
+        "STORAGE_NAME": "forms_loadtest",
+        "STORAGE_COLLECTION": "forms",
+    }
+
+
+def encode_forms(forms: List[Dict[str, Any]]) -> List[bytes]:
+    """
+    Кодирует формы в тела запросов `application/x-www-form-urlencoded`.
+
+    :param forms: Данные форм.
+    :return: Тела запросов.
+    """
+    return [urlencode(form).encode() for form in forms]
+
+
+@asynccontextmanager
+async def in_process_client(env: Dict[str, str]) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Создает клиент к приложению в текущем процессе и прогревает каталог.
+
+    Сервис приложения создается заново, поэтому переменные хранилища
+    сценария применяются без повторного импорта приложения.
+
+    :param env: Переменные окружения хранилища.
+    :return: Клиент httpx с ASGI-транспортом.
+    """
+    from app.core import config
+    from app.services.form_service import FormService
+
+    os.environ.update(env)
+    # Конфигурация хранилища вычисляется один раз на процесс.
+    config.__dict__.pop("CONFIG", None)
+    endpoints = importlib.import_module("app.api.endpoints")
+    endpoints.service = FormService()
+    await endpoints.service.awarmup()
+    transport = httpx.ASGITransport(app=endpoints.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        yield client
+
+
+def sender(client: httpx.AsyncClient, match: str) -> Send:
+    """
+    Возвращает функцию отправки формы на `/get_form`.
+
+    :param client: Клиент httpx.
+    :param match: Режим подбора.
+    :return: Корутина `send(body) -> (код ответа, найден ли шаблон)`.
+    """
+    url = f"/get_form?match={match}"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    async def send(body: bytes) -> Tuple[int, bool]:
+        response = await client.post(url, content=body, headers=headers)
+        return response.status_code, b'"template_name"' in response.content
+
+    return send
+
+
+class LoadResult:
+    """
+    Результаты нагрузки.
+
+    Атрибуты:
+    - `latencies_ns`: Задержки выполненных запросов.
+    - `statuses`: Количество ответов по кодам и ошибок клиента по типам.
+    - `matched`: Количество ответов с найденным шаблоном.
+    """
+
+    def __init__(self):
+        self.latencies_ns: List[int] = []
+        self.statuses: Dict[str, int] = {}
+        self.matched = 0
+
+    async def record(self, send: Send, body: bytes, started_ns: int) -> None:
+        """
+        Выполняет запрос и учитывает результат.
+
+        :param send: Функция отправки.
+        :param body: Тело запроса.
+        :param started_ns: Момент, от которого считается задержка.
+        """
+        try:
+            status, matched = await send(body)
+            key = str(status)
+        except httpx.HTTPError as e:
+            matched = False
+            key = type(e).__name__
+        self.latencies_ns.append(time.perf_counter_ns() - started_ns)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        self.matched += matched
+
+    def summary(self, total_ns: int) -> Dict[str, Any]:
+        """
+        Возвращает итоговую статистику.
+
+        :param total_ns: Длительность нагрузки.
+        :return: Результат `summarize`, дополненный `errors`, `error_rate`,
+                 `matched_rate`, `statuses`.
+        """
+        count = len(self.latencies_ns)
+        errors = count - sum(
+            value for key, value in self.statuses.items() if key.startswith("2")
+        )
+        return {
+            **summarize(self.latencies_ns, total_ns),
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "matched_rate": self.matched / count if count else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+async def run_closed(
+    send: Send, bodies: List[bytes], concurrency: int, requests: int, duration: float
+) -> Dict[str, Any]:
+    """
+    Нагрузка с постоянной конкурентностью.
+
+    :param send: Функция отправки.
+    :param bodies: Тела запросов (повторяются по кругу).
+    :param concurrency: Количество одновременных запросов.
+    :param requests: Максимальное количество запросов.
+    :param duration: Максимальная длительность в секундах.
+    :return: Итоговая статистика.
+    """
+    result = LoadResult()
+    counter = itertools.count()
+    started = time.perf_counter_ns()
+    deadline = started + int(duration * 1e9)
+
+    async def worker() -> None:
+        for i in counter:
+            now = time.perf_counter_ns()
+            if i >= requests or now >= deadline:
+                return
+            await result.record(send, bodies[i % len(bodies)], now)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result.summary(time.perf_counter_ns() - started)
+
+
+async def run_open(
+    send: Send,
+    bodies: List[bytes],
+    rps: float,
+    requests: int,
+    duration: float,
+    max_in_flight: int,
+) -> Dict[str, Any]:
+    """
+    Нагрузка с постоянной частотой запросов.
+
+    Задержка считается от запланированного момента отправки. Если сервис
+    не успевает и одновременно выполняется `max_in_flight` запросов,
+    следующие ждут, а время ожидания входит в их задержку.
+
+    :param send: Функция отправки.
+    :param bodies: Тела запросов (повторяются по кругу).
+    :param rps: Частота запросов в секунду.
+    :param requests: Максимальное количество запросов.
+    :param duration: Максимальная длительность в секундах.
+    :param max_in_flight: Ограничение одновременных запросов.
+    :return: Итоговая статистика с фактической частотой `achieved_rps`.
+    """
+    result = LoadResult()
+    slots = asyncio.Semaphore(max_in_flight)
+    total = min(requests, int(rps * duration))
+    interval_ns = 1e9 / rps
+    tasks = []
+
+    async def fire(body: bytes, scheduled: int) -> None:
+        async with slots:
+            await result.record(send, body, scheduled)
+
+    started = time.perf_counter_ns()
+    for i in range(total):
+        scheduled = started + int(i * interval_ns)
+        delay = (scheduled - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(fire(bodies[i % len(bodies)], scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter_ns() - started
+    summary = result.summary(elapsed)
+    summary["target_rps"] = rps
+    summary["achieved_rps"] = summary["count"] / (elapsed / 1e9) if elapsed else 0.0
+    return summary
+
+
+async def run_scenario(
+    scenario: Dict[str, Any], args: argparse.Namespace, directory: str
+) -> Dict[str, Any]:
+    """
+    Выполняет прогрев и нагрузку по сценарию.
+
+    :param scenario: Сценарий (см. `load_scenario`).
+    :param args: Аргументы командной строки.
+    :param directory: Каталог для файлов хранилища.
+    :return: Итоговая статистика.
+    """
+    bodies = encode_forms(scenario["forms"])
+    if args.url:
+        client_context = httpx.AsyncClient(
+            base_url=args.url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+    else:
+        env = prepare_storage(
+            args.storage, scenario["documents"], directory, args.storage_host
+        )
+        client_context = in_process_client(env)
+
+    async with client_context as client:
+        send = sender(client, scenario["match"])
+        warmup = LoadResult()
+        for body in itertools.islice(itertools.cycle(bodies), args.warmup):
+            await warmup.record(send, body, time.perf_counter_ns())
+        if args.rps:
+            return await run_open(
+                send, bodies, args.rps, args.requests, args.duration, args.concurrency
+            )
+        return await run_closed(
+            send, bodies, args.concurrency, args.requests, args.duration
+        )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Выполняет сценарии.
+
+    :param args: Аргументы командной строки.
+    :return: Результаты с метаданными запуска.
+    """
+    target = "url" if args.url else args.storage
+    results = {}
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        if target == "mongomock":
+            import mongomock
+
+            client = mongomock.MongoClient()
+            stack.enter_context(
+                mock.patch(
+                    "app.storage.mongodb.MongoClient",
+                    lambda host, **options: client,
+                )
+            )
+        for path in args.scenarios:
+            scenario = load_scenario(path)
+            name = f"load.{scenario['name']}[{target}]"
+            results[name] = await run_scenario(scenario, args, directory)
+            print_row(name, results[name])
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+    }
+
+
+def print_header() -> None:
+    print(
+        f"{'scenario':<36} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'p99 ms':>8} {'errors':>7} {'matched':>8}"
+    )
+
+
+def print_row(name: str, stats: Dict[str, Any]) -> None:
+    print(
+        f"{name:<36} {stats['count']:>9} {stats['throughput_per_s']:>8.0f}"
+        f" {stats['p50_us'] / 1000:>8.2f} {stats['p95_us'] / 1000:>8.2f}"
+        f" {stats['p99_us'] / 1000:>8.2f} {stats['error_rate']:>7.1%}"
+        f" {stats['matched_rate']:>8.1%}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="+", help="Файлы сценариев")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rps", type=float, help="Частота запросов (открытый цикл)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=10**9)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--storage", choices=STORAGES, default="tinydb")
+    parser.add_argument("--storage-host", help="Адрес MongoDB для --storage mongodb")
+    parser.add_argument("--url", help="Адрес запущенного сервиса")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Переменная окружения сервиса",
+    )
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами")
+    args = parser.parse_args()
+
+    for item in args.env:
+        name, _, value = item.partition("=")
+        os.environ[name] = value
+
+    print_header()
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
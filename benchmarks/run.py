@@ -0,0 +1,295 @@
+"""
+Набор бенчмарков: определение типов, подбор шаблонов и загрузка из хранилищ.
+
+Запуск:
+    python -m benchmarks.run --templates 1000 10000 --forms 20000
+
+Результаты печатаются в виде таблицы и сохраняются в JSON
+(по умолчанию `benchmarks/results/<commit>.json`) для сравнения между
+коммитами с помощью `python -m benchmarks.compare`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List
+from unittest import mock
+
+from tinydb import TinyDB
+
+from app.models import field_validator
+from app.models.form_template import FormData, FormTemplate
+from app.services.form_service import FormService
+from app.services.engines import MATCH_ENGINES, get_match_engine
+from app.services.matcher import TemplateIndex
+from app.services.snapshot import write_snapshot
+from app.storage.cache import CachedStorage
+from app.storage.indexed_file import IndexedFileStorage
+from app.storage.mongodb import MongoDBStorage
+from app.storage.snapshot import SnapshotStorage
+from app.storage.tinydb import TinyDBStorage
+from benchmarks.harness import bench, bench_repeat
+from benchmarks.synthetic import make_field_names, make_forms, make_template_documents
+
+#: Каталог для результатов по умолчанию
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def bench_detection(forms: List[Dict[str, str]]) -> Dict[str, Dict[str, float]]:
+    """
+    Бенчмарки определения типов полей: по значению и по форме целиком.
+
+    :param forms: Поток данных форм.
+    :return: Результаты по сценариям.
+    """
+    values = [value for form in forms for value in form.values()]
+    previous = field_validator.get_detection_cache()
+    try:
+        field_validator.configure_detection_cache(0)
+        results = {
+            "detection.value": bench(field_validator.detect_field_type, values),
+            "detection.form_data": bench(lambda data: FormData(data=data), forms),
+        }
+        cache = field_validator.configure_detection_cache(10_000, 4 << 20, 512)
+        results["detection.value_memoized"] = bench(
+            field_validator.detect_field_type, values
+        )
+        results["detection.value_memoized"]["hit_rate"] = cache.stats()["hit_rate"]
+    finally:
+        field_validator._detection_cache = previous
+    return results
+
+
+def bench_matching(
+    documents: List[Dict[str, str]],
+    forms: List[Dict[str, str]],
+    engines: Iterable[str] = ("index",),
+) -> Dict[str, Dict[str, float]]:
+    """
+    Бенчмарки построения индекса и подбора шаблонов.
+
+    :param documents: Документы шаблонов каталога.
+    :param forms: Поток данных форм.
+    :param engines: Движки подбора шаблонов.
+    :return: Результаты по сценариям.
+    """
+    size = len(documents)
+    templates = [FormTemplate(**dict(doc)) for doc in documents]
+    form_data = [FormData(data=form) for form in forms]
+    results = {}
+
+    for engine in engines:
+        index_factory = get_match_engine(engine)
+        prefix = "matching" if engine == "index" else f"matching.{engine}"
+        index = index_factory(templates)
+        results.update(
+            {
+                f"{prefix}.build_index[{size}]": bench_repeat(
+                    lambda: index_factory(templates), repeat=3 if size < 10**6 else 1
+                ),
+                f"{prefix}.match_template[{size}]": bench(
+                    lambda data: FormService.match_template(data, index), form_data
+                ),
+                f"{prefix}.match_best[{size}]": bench(
+                    lambda data: FormService.match_template(data, index, "best"),
+                    form_data,
+                ),
+                f"{prefix}.rank_top5[{size}]": bench(
+                    lambda data: index.rank(data.field_types, 5), form_data
+                ),
+            }
+        )
+    return results
+
+
+def bench_storage(
+    documents: List[Dict[str, str]], forms: List[Dict[str, str]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Бенчмарки загрузки шаблонов из TinyDB, снимка каталога, файлового
+    хранилища с индексом и MongoDB (через mongomock).
+
+    :param documents: Документы шаблонов каталога.
+    :param forms: Поток данных форм (для поиска кандидатов).
+    :return: Результаты по сценариям.
+    """
+    size = len(documents)
+    repeat = max(3, min(50, 200_000 // size))
+    field_types = [FormData(data=form).field_types for form in forms[:2000]]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "forms.json")
+        db = TinyDB(path)
+        db.table("forms").insert_multiple(dict(doc) for doc in documents)
+        db.close()
+
+        storage = TinyDBStorage(NAME=path, COLLECTION="forms")
+        results[f"storage.tinydb.get_templates[{size}]"] = bench_repeat(
+            storage.get_templates, repeat
+        )
+        results[f"storage.tinydb.cached_index[{size}]"] = _bench_cached(storage)
+        results[f"storage.tinydb.load_index[{size}]"] = bench_repeat(
+            lambda: TemplateIndex(storage.get_templates()), repeat
+        )
+        storage.db.storage.close()
+
+        path = os.path.join(directory, "forms.snapshot")
+        write_snapshot(path, (FormTemplate(**dict(doc)) for doc in documents))
+        storage = SnapshotStorage(NAME=path)
+        results[f"storage.snapshot.load_index[{size}]"] = bench_repeat(
+            storage.load_index, repeat
+        )
+
+        storage = IndexedFileStorage(os.path.join(directory, "forms.db"))
+        storage.add_templates(FormTemplate(**dict(doc)) for doc in documents)
+        results[f"storage.indexed_file.get_templates[{size}]"] = bench_repeat(
+            storage.get_templates, repeat
+        )
+        results[f"storage.indexed_file.find_templates[{size}]"] = bench(
+            storage.find_templates, field_types
+        )
+        storage.close()
+
+    try:
+        import mongomock
+    except ImportError:
+        print("mongomock is not installed, skipping MongoDB benchmarks")
+        return results
+
+    with mock.patch("app.storage.mongodb.MongoClient", mongomock.MongoClient):
+        storage = MongoDBStorage(HOST="localhost", NAME="bench", COLLECTION="forms")
+        storage.collection.insert_many([dict(doc) for doc in documents])
+        results[f"storage.mongomock.get_templates[{size}]"] = bench_repeat(
+            storage.get_templates, repeat
+        )
+        results[f"storage.mongomock.cached_index[{size}]"] = _bench_cached(storage)
+        storage.migrate()
+        results[f"storage.mongomock.find_templates[{size}]"] = bench(
+            storage.find_templates, field_types[:200], warmup=10
+        )
+    return results
+
+
+def _bench_cached(storage) -> Dict[str, float]:
+    cached = CachedStorage(storage, ttl=0, check_interval=3600)
+    cached.get_index()
+    return bench_repeat(cached.get_index, 10_000)
+
+
+def git_commit() -> str:
+    """
+    Возвращает короткий хеш текущего коммита или "unknown".
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+CASES: Dict[str, Callable] = {
+    "detection": bench_detection,
+    "matching": bench_matching,
+    "storage": bench_storage,
+}
+
+
+def run(args: argparse.Namespace) -> Dict:
+    """
+    Выполняет выбранные бенчмарки.
+
+    :param args: Аргументы командной строки.
+    :return: Результаты с метаданными запуска.
+    """
+    field_names = make_field_names(args.vocabulary)
+    results: Dict[str, Dict[str, float]] = {}
+
+    for size in args.templates:
+        documents = make_template_documents(
+            size,
+            min_fields=args.min_fields,
+            max_fields=args.max_fields,
+            seed=args.seed,
+            field_names=field_names,
+        )
+        forms = make_forms(
+            documents,
+            args.forms,
+            match_ratio=args.match_ratio,
+            seed=args.seed + 1,
+            field_names=field_names,
+        )
+        if "detection" in args.cases and size == args.templates[0]:
+            results.update(bench_detection(forms))
+        if "matching" in args.cases:
+            results.update(bench_matching(documents, forms, args.engines))
+        if "storage" in args.cases:
+            results.update(bench_storage(documents, forms))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "params": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+    }
+
+
+def print_table(report: Dict) -> None:
+    """
+    Печатает результаты в виде таблицы.
+
+    :param report: Результаты `run`.
+    """
+    print(f"{'case':<45} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'ops/s':>12}")
+    for name, stats in report["results"].items():
+        print(
+            f"{name:<45} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f}"
+            f" {stats['p99_us']:>10.1f} {stats['throughput_per_s']:>12.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--templates", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--forms", type=int, default=20_000)
+    parser.add_argument("--vocabulary", type=int, default=500)
+    parser.add_argument("--min-fields", type=int, default=2)
+    parser.add_argument("--max-fields", type=int, default=8)
+    parser.add_argument("--match-ratio", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument(
+        "--engines", nargs="+", choices=list(MATCH_ENGINES), default=["index"]
+    )
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_table(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
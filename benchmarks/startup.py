@@ -0,0 +1,148 @@
+"""
+Бенчмарк времени запуска сервиса.
+
+Измеряет в новых процессах интерпретатора:
+- время импорта `app.api.endpoints`;
+- время от запуска uvicorn до первого успешного ответа `/get_form`.
+
+Каждый замер выполняется в отдельном процессе, поэтому учитываются
+импорт модулей, создание сервиса и прогрев каталога.
+
+Запуск:
+    python -m benchmarks.startup --runs 10 --storage-name data/forms.json
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.harness import percentile
+
+IMPORT_CODE = (
+    "import time; started = time.perf_counter(); import app.api.endpoints; "
+    "print(time.perf_counter() - started)"
+)
+
+FORM_BODY = b"username=john&password=secret"
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    """
+    Возвращает время импорта приложения в новом процессе.
+
+    :param env: Переменные окружения процесса.
+    :return: Время в секундах.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_CODE],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(env: Dict[str, str], timeout: float = 30.0) -> float:
+    """
+    Запускает uvicorn и возвращает время до первого успешного ответа.
+
+    :param env: Переменные окружения процесса.
+    :param timeout: Максимальное время ожидания в секундах.
+    :return: Время в секундах.
+    :raises TimeoutError: Если сервис не ответил за `timeout` секунд.
+    """
+    port = _free_port()
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/get_form",
+        data=FORM_BODY,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.api.endpoints:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(request, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError("Service did not respond in time.")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(runs: int, env: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """
+    Выполняет замеры и считает перцентили.
+
+    :param runs: Количество запусков каждого замера.
+    :param env: Переменные окружения процессов.
+    :return: Словарь замер -> перцентили в миллисекундах.
+    """
+    samples: Dict[str, List[float]] = {"import": [], "first_request": []}
+    for _ in range(runs):
+        samples["import"].append(measure_import(env))
+        samples["first_request"].append(measure_first_request(env))
+
+    report = {}
+    for name, values in samples.items():
+        values.sort()
+        report[name] = {
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--storage-type", default="TinyDB")
+    parser.add_argument("--storage-name", default="data/forms.json")
+    parser.add_argument("--storage-collection", default="forms")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        STORAGE_TYPE=args.storage_type,
+        STORAGE_NAME=args.storage_name,
+        STORAGE_COLLECTION=args.storage_collection,
+    )
+    print(f"{'measure':<15} {'p50':>10} {'p95':>10} {'max':>10}")
+    for name, row in run(args.runs, env).items():
+        print(
+            f"{name:<15} {row['p50_ms']:>7.1f} ms {row['p95_ms']:>7.1f} ms"
+            f" {row['max_ms']:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Генераторы синтетических каталогов шаблонов для бенчмарков.
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence
+
+from app.models.form_template import FormTemplate
+
+#: Типы полей и их доли в синтетических шаблонах
+FIELD_TYPE_WEIGHTS = {"text": 0.55, "email": 0.2, "phone": 0.15, "date": 0.1}
+
+
+def make_field_names(count: int) -> List[str]:
+    """
+    Создает словарь имен полей.
+
+    :param count: Количество имен.
+    :return: Список имен полей.
+    """
+    return [f"field_{i}" for i in range(count)]
+
+
+def make_template_documents(
+    count: int,
+    vocabulary_size: int = 500,
+    min_fields: int = 2,
+    max_fields: int = 8,
+    seed: int = 0,
+    field_names: Optional[Sequence[str]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Создает документы шаблонов в формате хранилища (`name` и поля с типами).
+
+    :param count: Количество шаблонов.
+    :param vocabulary_size: Размер словаря имен полей.
+    :param min_fields: Минимальное количество полей в шаблоне.
+    :param max_fields: Максимальное количество полей в шаблоне.
+    :param seed: Начальное значение генератора случайных чисел.
+    :param field_names: Готовый словарь имен полей.
+    :return: Список документов шаблонов.
+    """
+    rng = random.Random(seed)
+    names = list(field_names or make_field_names(vocabulary_size))
+    types = list(FIELD_TYPE_WEIGHTS)
+    weights = list(FIELD_TYPE_WEIGHTS.values())
+
+    documents = []
+    for i in range(count):
+        fields = rng.sample(names, rng.randint(min_fields, max_fields))
+        document = {"name": f"Template {i}"}
+        document.update(zip(fields, rng.choices(types, weights, k=len(fields))))
+        documents.append(document)
+    return documents
+
+
+def make_templates(count: int, **kwargs) -> List[FormTemplate]:
+    """
+    Создает синтетические шаблоны форм.
+
+    :param count: Количество шаблонов.
+    :param kwargs: Параметры `make_template_documents`.
+    :return: Список объектов `FormTemplate`.
+    """
+    return [FormTemplate(**doc) for doc in make_template_documents(count, **kwargs)]
+
+
+#: Примеры значений по типам для синтетических форм
+_TEXT_WORDS = ["hello", "world", "form", "order", "thanks", "please", "call", "me"]
+
+
+def make_value(field_type: str, rng: random.Random) -> str:
+    """
+    Создает значение поля заданного типа.
+
+    :param field_type: Тип поля.
+    :param rng: Генератор случайных чисел.
+    :return: Значение поля.
+    """
+    if field_type == "email":
+        return f"user{rng.randint(0, 999)}@example{rng.randint(0, 9)}.com"
+    if field_type == "phone":
+        return (
+            f"+{rng.randint(1, 99)} {rng.randint(100, 999)} {rng.randint(100, 999)}"
+            f" {rng.randint(10, 99)} {rng.randint(10, 99)}"
+        )
+    if field_type == "date":
+        if rng.random() < 0.5:
+            return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2030)}"
+        return f"{rng.randint(1950, 2030)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    length = rng.choice([1, 2, 3, 5, 30])
+    return " ".join(rng.choices(_TEXT_WORDS, k=length))
+
+
+def make_forms(
+    documents: Sequence[Dict[str, str]],
+    count: int,
+    match_ratio: float = 0.7,
+    extra_fields: int = 2,
+    seed: int = 1,
+    field_names: Optional[Sequence[str]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Создает поток синтетических форм.
+
+    Доля `match_ratio` форм построена по случайному шаблону каталога
+    (с дополнительными полями), остальные — из случайных полей и,
+    как правило, не подходят ни одному шаблону.
+
+    :param documents: Документы шаблонов каталога.
+    :param count: Количество форм.
+    :param match_ratio: Доля форм, подходящих под шаблон.
+    :param extra_fields: Максимальное число дополнительных полей в форме.
+    :param seed: Начальное значение генератора случайных чисел.
+    :param field_names: Словарь имен полей для дополнительных полей.
+    :return: Список данных форм.
+    """
+    rng = random.Random(seed)
+    names = list(field_names or make_field_names(500))
+    types = list(FIELD_TYPE_WEIGHTS)
+    weights = list(FIELD_TYPE_WEIGHTS.values())
+
+    forms = []
+    for _ in range(count):
+        form = {}
+        if documents and rng.random() < match_ratio:
+            document = rng.choice(documents)
+            form = {
+                field: make_value(field_type, rng)
+                for field, field_type in document.items()
+                if field != "name"
+            }
+            extra = rng.randint(0, extra_fields)
+        else:
+            extra = rng.randint(1, extra_fields + 4)
+        for field in rng.sample(names, extra):
+            form.setdefault(field, make_value(rng.choices(types, weights)[0], rng))
+        forms.append(form)
+    return forms
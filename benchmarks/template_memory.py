@@ -0,0 +1,83 @@
+"""
+Бенчмарк памяти, занимаемой каталогом шаблонов.
+
+Сравнивает объем памяти на один шаблон для списка `FormTemplate`
+(как его возвращает хранилище) и для `TemplateIndex` с компактными
+шаблонами, который держится в кеше.
+
+Запуск:
+    python -m benchmarks.template_memory --sizes 10000 100000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.models.form_template import FormTemplate
+from app.services.matcher import TemplateIndex
+from benchmarks.synthetic import make_template_documents
+
+
+def measure(build: Callable[[], object]) -> int:
+    """
+    Возвращает объем памяти, удерживаемой результатом `build()`.
+
+    :param build: Функция, создающая измеряемый объект.
+    :return: Размер в байтах.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(sizes: List[int]) -> List[Dict[str, float]]:
+    """
+    Измеряет объем памяти на шаблон для каждого размера каталога.
+
+    :param sizes: Размеры каталогов.
+    :return: Список результатов.
+    """
+    results = []
+    for size in sizes:
+        documents = make_template_documents(size)
+
+        def templates():
+            return [FormTemplate(**dict(doc)) for doc in documents]
+
+        def index():
+            return TemplateIndex(FormTemplate(**dict(doc)) for doc in documents)
+
+        before = measure(templates)
+        after = measure(index)
+        results.append(
+            {
+                "templates": size,
+                "form_template_bytes": before / size,
+                "compact_index_bytes": after / size,
+                "ratio": before / after,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'templates':>10} {'FormTemplate':>14} {'compact':>10} {'ratio':>7}")
+    for row in run(args.sizes):
+        print(
+            f"{row['templates']:>10} {row['form_template_bytes']:>12.0f} B"
+            f" {row['compact_index_bytes']:>8.0f} B {row['ratio']:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
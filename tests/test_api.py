@@ -1,5 +1,32 @@
+import shutil
+
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    """
+    Клиент к приложению в текущем процессе над временной копией каталога
+    TinyDB: тесты записи не изменяют `data/forms.json`.
+    """
+    from app.api import endpoints
+    from app.core import config
+    from app.services.form_service import FormService
+
+    path = tmp_path / "forms.json"
+    shutil.copy("data/forms.json", path)
+    monkeypatch.setenv("STORAGE_TYPE", "TinyDB")
+    monkeypatch.setenv("STORAGE_NAME", str(path))
+    monkeypatch.setenv("STORAGE_COLLECTION", "forms")
+    # Конфигурация хранилища вычисляется один раз на процесс.
+    config.__dict__.pop("CONFIG", None)
+    monkeypatch.setattr(endpoints, "service", FormService())
+    monkeypatch.setitem(endpoints.api_config, "ADMIN_TOKEN", "secret")
+    yield AsyncClient(
+        transport=ASGITransport(app=endpoints.app), base_url="http://test"
+    )
+    config.__dict__.pop("CONFIG", None)
 
 
 @pytest.mark.asyncio
@@ -55,3 +82,207 @@ async def test_get_form_invalid_request():
         response = await client.post("/get_form", data={"unknown_field": "value"})
     assert response.status_code == 200
     assert response.json() == {"unknown_field": "text"}
+
+
+@pytest.mark.asyncio
+async def test_get_forms_json_array():
+    """
+    Тестирует пакетный эндпоинт `/get_forms` с JSON-массивом форм.
+
+    Ожидаемый результат:
+    - Статус ответа: 200.
+    - Тело ответа: Результаты в порядке входных форм.
+    """
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.post(
+            "/get_forms",
+            json=[
+                {
+                    "email": "test@example.com",
+                    "phone": "+1 123 456 78 90",
+                    "message": "Hello",
+                },
+                {"email": "unknown@example.com", "phone": "+1 123 456 78 90"},
+            ],
+        )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"template_name": "Contact Form"},
+        {"email": "email", "phone": "phone"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_forms_ndjson_stream():
+    """
+    Тестирует пакетный эндпоинт `/get_forms` с NDJSON и потоковым ответом.
+
+    Ожидаемый результат:
+    - Статус ответа: 200.
+    - Тело ответа: По одной строке результата на каждую форму.
+    """
+    body = '{"unknown_field": "value"}\n\n{"email": "test@example.com"}\n'
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.post(
+            "/get_forms",
+            params={"stream": "true"},
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    assert response.status_code == 200
+    assert response.text == '{"unknown_field":"text"}\n{"email":"email"}\n'
+
+
+@pytest.mark.asyncio
+async def test_get_forms_invalid_item():
+    """
+    Тестирует пакетный эндпоинт `/get_forms` с некорректным элементом.
+
+    Ожидаемый результат:
+    - Статус ответа: 422.
+    """
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.post("/get_forms", json=[{"email": 1}])
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_ready():
+    """
+    Тестирует сигнал готовности `/ready` после запуска приложения.
+
+    Ожидаемый результат:
+    - Статус ответа: 200 (каталог шаблонов загружен при запуске).
+    """
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+
+
+@pytest.mark.asyncio
+async def test_health():
+    """
+    Тестирует отчет о состоянии `/health`: каталог загружен и актуален.
+    """
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.get("/health")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == "ok"
+    assert report["catalog"]["loaded"] is True
+    assert report["catalog"]["degraded"] is False
+
+
+@pytest.mark.asyncio
+async def test_get_form_best_match():
+    """
+    Тестирует режим `match=best` эндпоинта `/get_form`.
+
+    Ожидаемый результат:
+    - Без параметра возвращается первый подходящий шаблон (Contact Form).
+    - С `match=best` возвращается шаблон с наибольшим числом полей.
+    """
+    data = {
+        "username": "john",
+        "password": "secret",
+        "email": "test@example.com",
+        "birthdate": "01.01.2000",
+        "phone": "+1 123 456 78 90",
+        "message": "Hello",
+    }
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        first = await client.post("/get_form", data=data)
+        best = await client.post("/get_form", params={"match": "best"}, data=data)
+    assert first.json() == {"template_name": "Contact Form"}
+    assert best.status_code == 200
+    assert best.json() == {"template_name": "Registration Form"}
+
+
+@pytest.mark.asyncio
+async def test_get_form_top_candidates():
+    """
+    Тестирует режим `match=top` эндпоинта `/get_form`.
+
+    Ожидаемый результат:
+    - Статус ответа: 200.
+    - Тело ответа: Не более `limit` кандидатов, первым — полное совпадение.
+    """
+    async with AsyncClient(base_url="http://localhost:8000") as client:
+        response = await client.post(
+            "/get_form",
+            params={"match": "top", "limit": 2},
+            data={"username": "john", "password": "secret"},
+        )
+    assert response.status_code == 200
+    assert response.json() == {
+        "candidates": [
+            {
+                "template_name": "Login Form",
+                "score": 1.0,
+                "matched_fields": 2,
+                "template_fields": 2,
+            },
+            {
+                "template_name": "Registration Form",
+                "score": 0.5,
+                "matched_fields": 2,
+                "template_fields": 4,
+            },
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_template_crud(app_client):
+    """
+    Тестирует эндпоинты `/templates`: добавление, подбор по новому шаблону,
+    пакетную запись и удаление. Запись идет во временную копию каталога.
+
+    Ожидаемый результат:
+    - Запись без токена администратора отклоняется (403).
+    - Новый шаблон сразу участвует в подборе.
+    - Некорректный пакет отклоняется целиком (422).
+    - Удаленный шаблон больше не находится (404).
+    """
+    data = {"api_query": "find me", "api_date": "2024-01-31"}
+    async with app_client as client:
+        denied = await client.put("/templates/API Search Form", json={"q": "text"})
+        assert denied.status_code == 403
+        assert (await client.delete("/templates/Login Form")).status_code == 403
+
+        client.headers["X-Admin-Token"] = "secret"
+        response = await client.put(
+            "/templates/API Search Form", json={"api_query": "text"}
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "name": "API Search Form",
+            "fields": {"api_query": "text"},
+        }
+        form = await client.post("/get_form", data=data)
+        assert form.json() == {"template_name": "API Search Form"}
+
+        invalid = await client.post(
+            "/templates/bulk",
+            json=[{"name": "API Other Form", "api_query": "text"}, {"api": "text"}],
+        )
+        assert invalid.status_code == 422
+        assert (await client.get("/templates/API Other Form")).status_code == 404
+
+        bulk = await client.post(
+            "/templates/bulk",
+            json=[{"name": "API Search Form", "api_query": "text", "api_date": "date"}],
+        )
+        assert bulk.json() == {"upserted": 1}
+        template = await client.get("/templates/API Search Form")
+        assert template.json()["fields"] == {"api_query": "text", "api_date": "date"}
+        names = [
+            t["name"] for t in (await client.get("/templates")).json()["templates"]
+        ]
+        assert names.count("API Search Form") == 1
+
+        assert (await client.delete("/templates/API Search Form")).status_code == 204
+        assert (await client.delete("/templates/API Search Form")).status_code == 404
+        form = await client.post("/get_form", data=data)
+    assert form.json() == {"api_query": "text", "api_date": "date"}
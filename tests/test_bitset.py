@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from app.models.form_template import FormData, FormTemplate
+from app.services.matcher import TemplateIndex
+
+pytest.importorskip("numpy")
+
+from app.services.bitset import BitsetTemplateIndex  # noqa: E402
+from app.services.form_service import FormService  # noqa: E402
+
+TYPES = ["date", "phone", "email", "text"]
+
+
+def make_catalog(rng, field_count, template_count):
+    """
+    Генерирует случайный каталог шаблонов, включая шаблон без полей.
+    """
+    names = [f"field_{i}" for i in range(field_count)]
+    templates = [
+        FormTemplate(
+            name=f"Template {i}",
+            **{
+                name: rng.choice(TYPES) for name in rng.sample(names, rng.randint(1, 5))
+            },
+        )
+        for i in range(template_count)
+    ]
+    templates.insert(template_count // 2, FormTemplate(name="Empty Form"))
+    return names, templates
+
+
+@pytest.mark.parametrize("field_count, dense", [(10, True), (40, False)])
+def test_bitset_index_matches_template_index(field_count, dense):
+    """
+    Проверяет, что битовый индекс (плотный и разреженный) дает те же
+    результаты, что и инвертированный индекс, во всех режимах подбора.
+    """
+    rng = random.Random(field_count)
+    names, templates = make_catalog(rng, field_count, 300)
+    expected = TemplateIndex(templates)
+    index = BitsetTemplateIndex(templates)
+    assert index.dense is dense
+
+    for _ in range(300):
+        field_types = {
+            name: rng.choice(TYPES) for name in rng.sample(names, rng.randint(0, 10))
+        }
+        assert index.match_name(field_types) == expected.match_name(field_types)
+        assert index.match_best_name(field_types) == expected.match_best_name(
+            field_types
+        )
+        assert [
+            (c.template.name, c.matched, c.total) for c in index.rank(field_types, 5)
+        ] == [
+            (c.template.name, c.matched, c.total) for c in expected.rank(field_types, 5)
+        ]
+
+
+def test_bitset_index_empty_catalog():
+    """
+    Проверяет подбор по пустому каталогу.
+    """
+    index = BitsetTemplateIndex([])
+    assert index.match({"email": "email"}) is None
+    assert index.match_best({"email": "email"}) is None
+    assert index.rank({"email": "email"}) == []
+
+
+class LoginStorage:
+    """
+    Хранилище с одним шаблоном для тестов выбора движка.
+    """
+
+    def get_templates(self):
+        return [FormTemplate(name="Login Form", username="text", password="text")]
+
+
+def test_form_service_bitset_engine(monkeypatch):
+    """
+    Тестирует выбор движка `bitset` в FormService.
+    """
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: LoginStorage()
+    )
+    service = FormService(engine="bitset")
+    result = service.process_form(
+        FormData(data={"username": "john", "password": "secret"})
+    )
+
+    assert isinstance(service.get_index(), BitsetTemplateIndex)
+    assert result.name == "Login Form"
@@ -0,0 +1,121 @@
+import io
+import json
+
+import pytest
+
+from app.api.batch import serialize_result
+from app.classify import Progress, classify, load_index, main, read_records
+from app.models.form_template import FormData
+from app.services.form_service import FormService
+from app.storage.lazy import LazyStorage
+from app.storage.tinydb import TinyDBStorage
+
+FORMS = [
+    {"username": "john", "password": "secret"},
+    {"email": "test@example.com", "phone": "+7 123 456 78 90"},
+    {"order_date": "2024-01-31", "username": "mary", "password": "x"},
+    {"comment": "hello"},
+]
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    """
+    Хранилище TinyDB с двумя шаблонами, которое используют сервис и воркеры.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    storage.db.insert({"name": "Login Form", "username": "text", "password": "text"})
+    storage.db.insert({"name": "Contact Form", "email": "email", "phone": "phone"})
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    monkeypatch.setattr("app.classify._index", None)
+    return storage
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_classify_matches_service_in_input_order(storage, workers):
+    """
+    Проверяет, что результаты совпадают с обработкой формы сервисом
+    и выводятся в порядке входных данных.
+    """
+    forms = FORMS * 50
+    source = io.BytesIO(b"".join(json.dumps(form).encode() + b"\n" for form in forms))
+    output = io.StringIO()
+
+    progress = classify(
+        read_records(source, "ndjson"), output, workers=workers, chunk_size=7
+    )
+
+    service = FormService()
+    expected = [
+        serialize_result(service.process_form(FormData(data=form))) for form in forms
+    ]
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == expected
+    assert (progress.forms, progress.matched, progress.errors) == (200, 150, 0)
+
+
+def test_classify_reports_invalid_records(storage):
+    """
+    Проверяет, что некорректные записи дают строку с ошибкой, а пустые
+    строки пропускаются.
+    """
+    source = io.BytesIO(b'{"username": "a", "password": "b"}\n\nnot json\n[1]\n')
+    output = io.StringIO()
+
+    progress = classify(read_records(source, "ndjson"), output, workers=0)
+
+    assert output.getvalue().splitlines() == [
+        '{"template_name":"Login Form"}',
+        '{"error":"Item 3: invalid JSON."}',
+        '{"error":"Item 4: form must be an object with string values."}',
+    ]
+    assert progress.errors == 2
+
+
+def test_load_index_closes_storage_before_fork(storage, monkeypatch):
+    """
+    Проверяет, что после загрузки каталога клиенты хранилища закрыты
+    и пулы потоков остановлены: воркеры наследуют только индекс.
+    """
+    closed = []
+    lazy = LazyStorage(TinyDBStorage, NAME=storage.path, COLLECTION="forms")
+    monkeypatch.setattr(
+        TinyDBStorage, "close", lambda self: closed.append(self), raising=False
+    )
+    monkeypatch.setattr("app.storage.factory.StorageFactory.get_storage", lambda: lazy)
+
+    index = load_index()
+
+    assert len(closed) == 1
+    assert not lazy.connected
+    assert index.match_name({"username": "text", "password": "text"}) == "Login Form"
+
+
+def test_main_reads_csv(storage, tmp_path, capsys):
+    """
+    Проверяет классификацию CSV-файла из командной строки и итоговый отчет.
+    """
+    source = tmp_path / "forms.csv"
+    source.write_text("username,password\njohn,secret\nmary\n")
+    target = tmp_path / "results.ndjson"
+
+    main([str(source), str(target), "--workers", "0"])
+
+    assert target.read_text().splitlines() == [
+        '{"template_name":"Login Form"}',
+        '{"username":"text"}',
+    ]
+    assert "Done: 2 forms, 1 matched, 0 errors" in capsys.readouterr().err
+
+
+def test_progress_reports_throughput():
+    """
+    Проверяет формат отчета о ходе обработки.
+    """
+    stream = io.StringIO()
+    progress = Progress(interval=0, stream=stream)
+    progress.update(10, 4, 1)
+    progress.report(final=True)
+    assert stream.getvalue().startswith("Done: 10 forms, 4 matched, 1 errors")
+    assert "forms/s" in stream.getvalue()
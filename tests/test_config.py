@@ -1,5 +1,10 @@
+import os
+import subprocess
+import sys
+
 import pytest
 
+from app.core import config as config_module
 from app.core.config import StorageConfigFactory, get_storage_config
 from app.core.exceptions import StorageConfigError
 from app.core.mongodb import MongoDBConfig
@@ -111,3 +116,70 @@ def test_factory_with_real_classes(monkeypatch):
     monkeypatch.delenv("STORAGE_TYPE", raising=False)
     config = StorageConfigFactory.create_config("TinyDB")
     assert isinstance(config, TinyDBConfig)
+
+
+def test_matching_config_invalid_engine(monkeypatch):
+    """Тест ошибки при неизвестном движке подбора шаблонов."""
+    from app.core.matching import MatchingConfig
+
+    monkeypatch.setenv("MATCH_ENGINE", "unknown")
+    with pytest.raises(StorageConfigError, match="Unknown match engine"):
+        MatchingConfig().get_params()
+
+
+def test_field_types_config(monkeypatch):
+    """Тест списка поставляемых типов полей и ошибки при неизвестном типе."""
+    from app.core.field_types import FieldTypesConfig
+
+    monkeypatch.setenv("FIELD_TYPES", " inn, url,inn ,")
+    assert FieldTypesConfig().get_params()["TYPES"] == ["inn", "url"]
+    monkeypatch.setenv("FIELD_TYPES", "inn,website")
+    with pytest.raises(StorageConfigError, match="Unknown field type: website"):
+        FieldTypesConfig().get_params()
+
+
+def test_config_is_computed_on_first_access(monkeypatch, mock_storage_configs):
+    """Тест ленивого вычисления CONFIG при первом обращении к нему."""
+    monkeypatch.delitem(config_module.__dict__, "CONFIG", raising=False)
+    monkeypatch.setenv("STORAGE_TYPE", "InvalidDB")
+    with pytest.raises(StorageConfigError):
+        config_module.CONFIG
+
+    monkeypatch.setenv("STORAGE_TYPE", "MongoDB")
+    assert config_module.CONFIG["STORAGE_TYPE"] == "MongoDB"
+    monkeypatch.setenv("STORAGE_TYPE", "TinyDB")
+    assert config_module.CONFIG["STORAGE_TYPE"] == "MongoDB"
+
+
+def test_app_import_skips_unused_storage_drivers():
+    """Тест того, что импорт приложения не загружает драйверы других хранилищ."""
+    code = (
+        "import sys, app.api.endpoints; "
+        "assert 'pymongo' not in sys.modules, 'pymongo imported'"
+    )
+    env = dict(os.environ, STORAGE_TYPE="TinyDB", STORAGE_NAME="missing/forms.json")
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def test_mongodb_config_client_options(monkeypatch):
+    """Тест параметров пула, таймаутов и выключателя в конфигурации MongoDB."""
+    monkeypatch.setenv("STORAGE_HOST", "mongo")
+    monkeypatch.setenv("STORAGE_NAME", "form_storage")
+    monkeypatch.setenv("STORAGE_COLLECTION", "forms")
+    monkeypatch.setenv("STORAGE_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("STORAGE_READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setenv("STORAGE_BREAKER_RESET_TIMEOUT", "2.5")
+
+    params = MongoDBConfig().get_params()
+    assert params["MAX_POOL_SIZE"] == 20
+    assert params["SERVER_SELECTION_TIMEOUT_MS"] == 2000
+    assert params["READ_PREFERENCE"] == "secondaryPreferred"
+    assert params["BREAKER_RESET_TIMEOUT"] == 2.5
+
+    monkeypatch.setenv("STORAGE_READ_PREFERENCE", "fastest")
+    with pytest.raises(StorageConfigError, match="READ_PREFERENCE"):
+        MongoDBConfig().get_params()
+    monkeypatch.setenv("STORAGE_READ_PREFERENCE", "primary")
+    monkeypatch.setenv("STORAGE_MIN_POOL_SIZE", "50")
+    with pytest.raises(StorageConfigError, match="MIN_POOL_SIZE"):
+        MongoDBConfig().get_params()
@@ -0,0 +1,53 @@
+import pytest
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.formparsers import FormParser
+
+from app.api.fast_path import (
+    encode_field_types,
+    encode_template_name,
+    parse_urlencoded,
+)
+
+
+async def starlette_form(body: bytes):
+    """
+    Разбирает тело запроса так же, как `Request.form()` в Starlette.
+    """
+
+    async def stream():
+        yield body
+        yield b""
+
+    headers = Headers({"content-type": "application/x-www-form-urlencoded"})
+    return dict(await FormParser(headers, stream()).parse())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"email=test%40example.com&phone=%2B1+123+456+78+90&message=Hello",
+        b"a=1&a=2&b=&c",
+        b"name=%D0%98%D0%B2%D0%B0%D0%BD;date=2023-12-06",
+        b"&&x=%zz&y=a+b%2Bc",
+        b"",
+    ],
+)
+async def test_parse_urlencoded_matches_starlette(body):
+    """
+    Проверяет, что быстрый разбор тела совпадает с `Request.form()`.
+    """
+    assert parse_urlencoded(body) == await starlette_form(body)
+
+
+def test_fast_path_encoding_matches_json_response():
+    """
+    Проверяет, что ответы быстрого пути совпадают побайтно с `JSONResponse`.
+    """
+    field_types = {"имя": "text", "email": "email"}
+
+    assert encode_field_types(field_types) == JSONResponse(field_types).body
+    assert (
+        encode_template_name("Форма") == JSONResponse({"template_name": "Форма"}).body
+    )
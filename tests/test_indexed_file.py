@@ -0,0 +1,259 @@
+import json
+import os
+
+import pytest
+
+from app.models.form_template import FormData, FormTemplate
+from app.services.form_service import FormService
+from app.storage.indexed_file import IndexedFileStorage
+
+TEMPLATES = [
+    FormTemplate(name="Contact Form", email="email", phone="phone", message="text"),
+    FormTemplate(name="Login Form", username="text", password="text"),
+    FormTemplate(name="Newsletter Form", email="email"),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "forms.db")
+
+
+def names(templates):
+    return [template.name for template in templates]
+
+
+def test_indexed_file_find_templates_decodes_only_candidates(path, monkeypatch):
+    """
+    Проверяет, что поиск кандидатов декодирует только шаблоны,
+    все поля которых присутствуют в форме.
+    """
+    storage = IndexedFileStorage(path)
+    storage.add_templates(TEMPLATES)
+    decoded = []
+    decode = storage._decode
+    monkeypatch.setattr(
+        storage,
+        "_decode",
+        lambda record_id: decoded.append(record_id) or decode(record_id),
+    )
+
+    found = storage.find_templates({"email": "email", "message": "text"})
+    assert names(found) == ["Newsletter Form"]
+    assert len(decoded) == 1
+
+    found = storage.find_templates(
+        {"email": "text", "phone": "phone", "message": "text"}
+    )
+    assert names(found) == ["Contact Form", "Newsletter Form"]
+
+
+def test_indexed_file_update_delete_and_reopen(path):
+    """
+    Проверяет обновление с сохранением позиции, удаление
+    и загрузку индекса из файла при повторном открытии.
+    """
+    storage = IndexedFileStorage(path)
+    contact, login, newsletter = storage.add_templates(TEMPLATES)
+    storage.update_template(
+        contact, FormTemplate(name="Contact Form v2", email="email")
+    )
+    storage.delete_template(login)
+
+    with pytest.raises(KeyError):
+        storage.delete_template(login)
+    assert names(storage.get_templates()) == ["Contact Form v2", "Newsletter Form"]
+    storage.close()
+
+    reopened = IndexedFileStorage(path)
+    assert names(reopened.get_templates()) == ["Contact Form v2", "Newsletter Form"]
+    assert names(reopened.find_templates({"email": "email"})) == [
+        "Contact Form v2",
+        "Newsletter Form",
+    ]
+    assert reopened.add_template(TEMPLATES[1]) == newsletter + 1
+
+
+def test_indexed_file_replays_records_missing_from_index(path):
+    """
+    Проверяет, что записи, дописанные в журнал другим процессом
+    (или после сбоя до обновления индекса), подхватываются из хвоста журнала,
+    а незавершенная последняя строка пропускается.
+    """
+    storage = IndexedFileStorage(path)
+    storage.add_templates(TEMPLATES[:1])
+    with open(path, "ab") as f:
+        f.write(b'{"id":2,"template":{"name":"Login Form","username":"text"}}\n')
+        f.write(b'{"id":3,"templ')
+
+    assert names(storage.find_templates({"username": "text"})) == ["Login Form"]
+    assert names(IndexedFileStorage(path).get_templates()) == [
+        "Contact Form",
+        "Login Form",
+    ]
+
+
+def test_indexed_file_upsert_and_delete_by_name(path):
+    """
+    Проверяет замену шаблона по имени с сохранением позиции,
+    добавление нового шаблона в конец и удаление по имени.
+    """
+    storage = IndexedFileStorage(path)
+    storage.upsert_templates(TEMPLATES)
+    storage.upsert_templates(
+        [
+            FormTemplate(name="Contact Form", email="email"),
+            FormTemplate(name="Search Form", query="text"),
+        ]
+    )
+
+    assert names(storage.get_templates()) == names(TEMPLATES) + ["Search Form"]
+    assert names(storage.find_templates({"email": "email"})) == [
+        "Contact Form",
+        "Newsletter Form",
+    ]
+    assert storage.delete_templates(["Login Form", "Missing Form"]) == 1
+    assert names(IndexedFileStorage(path).get_templates()) == [
+        "Contact Form",
+        "Newsletter Form",
+        "Search Form",
+    ]
+
+
+def test_indexed_file_skips_torn_batch(path):
+    """
+    Проверяет, что пакет, оборванный сбоем, не применяется частично
+    и отрезается перед следующей записью.
+    """
+    IndexedFileStorage(path).upsert_templates(TEMPLATES[:1])
+    with open(path, "ab") as f:
+        f.write(b'{"batch":2}\n')
+        f.write(b'{"id":2,"template":{"name":"Login Form","username":"text"}}\n')
+
+    storage = IndexedFileStorage(path)
+    assert names(storage.get_templates()) == ["Contact Form"]
+    storage.upsert_templates(TEMPLATES[2:])
+    assert names(IndexedFileStorage(path).get_templates()) == [
+        "Contact Form",
+        "Newsletter Form",
+    ]
+
+
+def test_indexed_file_rebuilds_broken_index(path):
+    """
+    Проверяет построение индекса по журналу, если файл индекса поврежден.
+    """
+    IndexedFileStorage(path).add_templates(TEMPLATES)
+    with open(f"{path}.idx", "w") as f:
+        f.write("{")
+
+    assert names(IndexedFileStorage(path).get_templates()) == names(TEMPLATES)
+
+
+def test_indexed_file_saves_index_at_checkpoints(path):
+    """
+    Проверяет, что индекс сохраняется раз в `INDEX_CHECKPOINT` записей,
+    а записи после него дочитываются из журнала при загрузке.
+    """
+    storage = IndexedFileStorage(path, INDEX_CHECKPOINT=3)
+    saves = []
+    save = storage._save_index
+    storage._save_index = lambda: saves.append(storage._size) or save()
+    for template in TEMPLATES:
+        storage.add_template(template)
+    storage.add_template(FormTemplate(name="Search Form", query="text"))
+    assert len(saves) == 1
+
+    with open(f"{path}.idx") as f:
+        assert len(json.load(f)["records"]) == 3
+    assert names(IndexedFileStorage(path).get_templates()) == names(TEMPLATES) + [
+        "Search Form"
+    ]
+    storage.close()
+    assert len(saves) == 2
+
+
+def test_indexed_file_rebuilds_stale_index(path):
+    """
+    Проверяет, что индекс строится заново, если журнал заменен
+    или его проиндексированная часть изменилась.
+    """
+    storage = IndexedFileStorage(path)
+    storage.add_templates(TEMPLATES)
+    storage.close()
+    with open(path, "rb") as f:
+        journal = f.read()
+
+    changed = journal.replace(b"Login Form", b"Login Formx", 1)
+    with open(path, "wb") as f:
+        f.write(changed)
+    assert "Login Formx" in names(IndexedFileStorage(path).get_templates())
+
+    os.remove(path)
+    with open(path, "wb") as f:
+        f.write(journal.replace(b"Login", b"Logon"))
+    assert names(IndexedFileStorage(path).get_templates()) == [
+        "Contact Form",
+        "Logon Form",
+        "Newsletter Form",
+    ]
+
+
+def read_ids(path):
+    with open(path, "rb") as f:
+        entries = [json.loads(line) for line in f.read().splitlines()]
+    return [entry["id"] for entry in entries if "id" in entry]
+
+
+def test_indexed_file_compaction(path):
+    """
+    Проверяет, что компакция удаляет устаревшие записи и сохраняет порядок.
+    """
+    storage = IndexedFileStorage(path)
+    ids = storage.add_templates(TEMPLATES)
+    storage.update_template(ids[0], TEMPLATES[0])
+    storage.delete_template(ids[1])
+    assert read_ids(path) == [1, 2, 3, 1, 2]
+
+    version = storage.get_version()
+    storage.compact()
+    assert read_ids(path) == [1, 3]
+    assert storage.get_version() != version
+    assert names(storage.find_templates({"email": "email"})) == ["Newsletter Form"]
+    assert names(IndexedFileStorage(path).get_templates()) == [
+        "Contact Form",
+        "Newsletter Form",
+    ]
+
+
+def test_indexed_file_compacts_automatically(path):
+    """
+    Проверяет автоматическую компакцию после превышения доли устаревших данных.
+    """
+    storage = IndexedFileStorage(path, COMPACT_RATIO=0.5, COMPACT_MIN_BYTES=0)
+    storage.add_templates(TEMPLATES)
+    for _ in range(5):
+        storage.update_template(1, TEMPLATES[0])
+
+    assert len(read_ids(path)) < 8
+    assert names(storage.get_templates()) == names(TEMPLATES)
+
+
+def test_form_service_uses_find_templates(path, monkeypatch):
+    """
+    Проверяет, что без кеша шаблонов сервис запрашивает у хранилища
+    только кандидатов, а не весь каталог.
+    """
+    storage = IndexedFileStorage(path)
+    storage.add_templates(TEMPLATES)
+    monkeypatch.setenv("TEMPLATE_CACHE_ENABLED", "false")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    monkeypatch.setattr(
+        storage, "get_templates", lambda: pytest.fail("full catalog load")
+    )
+    service = FormService()
+    form_data = FormData(data={"username": "john", "password": "secret"})
+
+    assert service.process_form(form_data).name == "Login Form"
@@ -0,0 +1,94 @@
+import threading
+
+from app.core.lru import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    """
+    Проверяет вытеснение давно не использованных записей по количеству.
+    """
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_respects_byte_limits():
+    """
+    Проверяет ограничения по суммарному размеру и размеру одной записи.
+    """
+    cache = LRUCache(max_entries=100, max_bytes=10, max_item_bytes=6)
+
+    assert not cache.put("long value", "text", size=10)
+    assert cache.put("a", "text", size=6)
+    assert cache.put("b", "text", size=6)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "text"
+    assert cache.stats()["bytes"] == 6
+
+
+def test_lru_stats():
+    """
+    Проверяет подсчет попаданий и промахов.
+    """
+    cache = LRUCache(max_entries=10)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "entries": 1,
+        "bytes": cache.stats()["bytes"],
+    }
+
+
+def test_lru_concurrent_access():
+    """
+    Проверяет целостность кеша при одновременной работе нескольких потоков.
+    """
+    cache = LRUCache(max_entries=50)
+
+    def worker(offset):
+        for i in range(2000):
+            key = (offset + i) % 100
+            if cache.get(key) is None:
+                cache.put(key, key)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert len(cache) == stats["entries"] <= 50
+    assert stats["hits"] + stats["misses"] == 8 * 2000
+
+
+def test_detection_cache_memoizes_values():
+    """
+    Проверяет, что определение типа использует кеш и ведет статистику.
+    """
+    from app.models import field_validator
+
+    previous = field_validator.get_detection_cache()
+    try:
+        cache = field_validator.configure_detection_cache(10, max_value_bytes=200)
+        assert field_validator.detect_field_type("test@example.com") == "email"
+        assert field_validator.detect_field_type("test@example.com") == "email"
+        assert field_validator.detect_field_type("x" * 500) == "text"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["entries"] == 1
+    finally:
+        field_validator._detection_cache = previous
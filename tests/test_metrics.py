@@ -0,0 +1,86 @@
+import pytest
+
+from app.models.form_template import FormData, FormTemplate
+from app.services.form_service import FormService
+from app.services.metrics import Histogram, Metrics
+
+
+class LoginStorage:
+    """
+    Мок-реализация хранилища с одним шаблоном формы входа.
+    """
+
+    def get_templates(self):
+        return [FormTemplate(name="Login Form", username="text", password="text")]
+
+
+@pytest.fixture
+def enabled_metrics(monkeypatch):
+    """
+    Включенные метрики вместо метрик процесса.
+    """
+    metrics = Metrics(enabled=True)
+    for module in ("form_service", "metrics"):
+        monkeypatch.setattr(f"app.services.{module}.metrics", metrics)
+    monkeypatch.setattr("app.storage.cache.metrics", metrics)
+    return metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Проверяет текстовый формат гистограммы: накопленные интервалы,
+    количество и сумму наблюдений.
+    """
+    histogram = Histogram("latency_seconds", "Latency.", "stage", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "parse")
+
+    samples = [(name, dict(pairs), value) for name, pairs, value in histogram.samples()]
+    assert samples == [
+        ("latency_seconds_bucket", {"stage": "parse", "le": "0.1"}, 1),
+        ("latency_seconds_bucket", {"stage": "parse", "le": "1.0"}, 3),
+        ("latency_seconds_bucket", {"stage": "parse", "le": "+Inf"}, 4),
+        ("latency_seconds_count", {"stage": "parse"}, 4),
+        ("latency_seconds_sum", {"stage": "parse"}, 6.05),
+    ]
+
+
+def test_disabled_metrics_record_nothing():
+    """
+    Проверяет, что выключенные метрики не обращаются к часам и не копят значения.
+    """
+    metrics = Metrics(enabled=False)
+    started = metrics.now()
+    assert started == 0.0
+    assert metrics.stage("parse", started) == 0.0
+    metrics.result("Login Form")
+    metrics.catalog_loaded(0.5, 10)
+
+    assert "form_stage_duration_seconds_count" not in metrics.render()
+    assert metrics.forms.value("matched") == 0
+
+
+def test_form_service_records_stages_and_results(enabled_metrics, monkeypatch):
+    """
+    Проверяет этапы, загрузку каталога, результаты и счетчики по шаблонам.
+    """
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: LoginStorage()
+    )
+    service = FormService()
+
+    service.process_form(FormData(data={"username": "john", "password": "secret"}))
+    service.process_form(FormData(data={"username": "john", "password": "secret"}))
+    service.process_form(FormData(data={"email": "test@example.com"}))
+
+    assert enabled_metrics.stage_seconds.count("load") == 3
+    assert enabled_metrics.stage_seconds.count("match") == 3
+    assert enabled_metrics.storage_load_seconds.count() == 1
+    assert enabled_metrics.forms.value("matched") == 2
+    assert enabled_metrics.forms.value("unmatched") == 1
+    assert enabled_metrics.template_matches.value("Login Form") == 2
+
+    text = enabled_metrics.render()
+    assert "# TYPE form_stage_duration_seconds histogram" in text
+    assert 'template_matches_total{template="Login Form"} 2' in text
+    assert "template_catalog_size 1" in text
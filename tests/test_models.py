@@ -60,7 +60,7 @@ def test_field_validators():
     """
     Проверяет, что валидаторы работают корректно для различных типов.
     """
-    from app.models.form_template import FieldValidator
+    from app.models.field_validator import FieldValidator
 
     validators = FieldValidator.get_validators()
 
@@ -100,3 +100,226 @@ def test_get_field_types(form_template):
         "phone": "phone",
         "message": "text",
     }
+
+
+def legacy_detect_type(value):
+    """
+    Эталонное определение типа: последовательный перебор валидаторов.
+    """
+    from app.models.field_validator import FieldValidator
+
+    for field_type, validator_cls in FieldValidator.get_validators().items():
+        if validator_cls.validate(value):
+            return field_type
+    return "text"
+
+
+def generate_values(count, seed=0):
+    """
+    Генерирует значения, похожие на даты, телефоны, адреса почты и текст,
+    включая пограничные случаи.
+    """
+    import random
+
+    rng = random.Random(seed)
+    alphabet = "0123456789 .-+@:/aZ_\n٣"
+    templates = [
+        "{d}.{m}.{y}",
+        "{y}-{m}-{d}",
+        "+{c} {a} {b} {e} {f}",
+        "{c} {a} {b} {e} {f}",
+        "{w}@{w}.{w}",
+    ]
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            value = rng.choice(templates).format(
+                d=rng.choice(["1", "01", " 1", "29", "30", "31", "32", "0", "٣"]),
+                m=rng.choice(["1", "01", "02", "12", "13", "00"]),
+                y=rng.choice(["2023", "2024", "1900", "0000", "202", "20245"]),
+                c=str(rng.randint(0, 1000)),
+                a=str(rng.randint(0, 1000)),
+                b=str(rng.randint(0, 1000)),
+                e=str(rng.randint(0, 100)),
+                f=str(rng.randint(0, 100)),
+                w=rng.choice(["test", "a.b", "x", "ex-ample", "c0m", ""]),
+            )
+            if rng.random() < 0.2:
+                value += rng.choice(["\n", " ", "x", "0"])
+        else:
+            value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        yield value
+
+
+def test_field_type_detector_matches_validators():
+    """
+    Проверяет, что однопроходный определитель типа дает тот же результат,
+    что и последовательный перебор валидаторов.
+    """
+    from app.models.field_validator import FieldTypeDetector
+
+    detector = FieldTypeDetector()
+    for value in generate_values(20000):
+        assert detector.detect(value) == legacy_detect_type(value), repr(value)
+
+
+def test_compact_template_round_trip(form_template):
+    """
+    Проверяет, что компактный шаблон восстанавливается в исходный `FormTemplate`.
+    """
+    from app.models.compact import TYPE_CODES, CompactTemplate, FieldVocabulary, unpack
+
+    vocabulary = FieldVocabulary()
+    template = FormTemplate(**form_template)
+    compact = CompactTemplate.from_template(template, vocabulary)
+    other = CompactTemplate.from_fields("Other", {"email": "text"}, vocabulary)
+
+    assert len(vocabulary) == 3
+    assert unpack(other.fields[0]) == (vocabulary.get("email"), TYPE_CODES["text"])
+    assert compact.to_template(vocabulary).name == "Contact Form"
+    assert compact.to_template(vocabulary).fields == template.fields
+    with pytest.raises(AttributeError):
+        compact.name = "Changed"
+
+
+def registry_detect_type(registry, value):
+    """
+    Эталонное определение типа по реестру: последовательная проверка
+    выражения каждого типа в порядке приоритета.
+    """
+    import re
+
+    for spec in registry.detectable():
+        if re.fullmatch(spec.pattern, value) and (
+            spec.check is None or spec.check(value)
+        ):
+            return spec.name
+    return registry.fallback
+
+
+def test_field_type_detector_with_optional_types():
+    """
+    Проверяет определение поставляемых типов объединенным выражением:
+    приоритеты, переход к следующему типу при непройденной проверке
+    и совпадение с последовательной проверкой типов реестра.
+    """
+    import random
+
+    from app.models.field_types import OPTIONAL_FIELD_TYPES, default_registry
+    from app.models.field_validator import FieldTypeDetector
+
+    registry = default_registry(OPTIONAL_FIELD_TYPES)
+    detector = FieldTypeDetector(registry)
+
+    assert detector.detect("7707083893") == "inn"
+    assert detector.detect("7707083894") == "decimal"
+    assert detector.detect("500100732259") == "inn"
+    assert detector.detect("123456") == "postcode"
+    assert detector.detect("12,5") == "decimal"
+    assert detector.detect("https://example.com/a?b=1") == "url"
+    assert detector.detect("123e4567-e89b-12d3-a456-426614174000") == "uuid"
+    assert detector.detect("06.12.2023") == "date"
+    assert detector.detect("31.02.2023") == "text"
+    assert detector.detect("test@example.com") == "email"
+
+    rng = random.Random(1)
+    numbers = [
+        "".join(rng.choices("0123456789.,-", k=rng.randint(1, 13))) for _ in range(5000)
+    ]
+    for value in [*generate_values(5000), *numbers]:
+        assert detector.detect(value) == registry_detect_type(registry, value), repr(
+            value
+        )
+
+
+def test_field_type_registry_declarations():
+    """
+    Проверяет объявление собственных типов: порядок при равных приоритетах,
+    назначение кодов и отклонение некорректных объявлений.
+    """
+    from app.models.field_types import FieldTypeRegistry
+    from app.models.field_validator import FieldTypeDetector
+
+    registry = FieldTypeRegistry()
+    registry.register("text", code=3)
+    registry.register("ticket", r"[A-Z]{3}-\d+", priority=10)
+    registry.register("code", r"[A-Z]+(?:-\d+)?", priority=10)
+    registry.register("upper", r"[A-Z]+", priority=20, check=lambda v: len(v) > 2)
+
+    detector = FieldTypeDetector(registry)
+    assert detector.detect("ABC-1") == "ticket"
+    assert detector.detect("ABCD") == "upper"
+    assert detector.detect("AB") == "code"
+    assert detector.detect("abc") == "text"
+    assert registry.codes == {"text": 3, "ticket": 0, "code": 1, "upper": 2}
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register("code", r"\d+")
+    with pytest.raises(ValueError, match="named groups"):
+        registry.register("named", r"(?P<x>\d+)")
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        registry.register("broken", r"(\d+")
+    with pytest.raises(ValueError, match="is taken"):
+        registry.register("other", r"\d+", code=3)
+    with pytest.raises(ValueError, match="backreferences"):
+        registry.register("repeat", r"(\w)\1")
+    with pytest.raises(ValueError, match="backreferences"):
+        registry.register("optional", r"(a)?(?(1)b|c)")
+    with pytest.raises(ValueError, match="cannot be combined"):
+        registry.register("caseless", r"(?i)[a-z]+")
+    assert len(registry) == 4 and registry.version == 4
+    for i in range(12):
+        registry.register(f"type_{i}", r"\d+")
+    with pytest.raises(ValueError, match="No free code"):
+        registry.register("extra", r"\d+")
+
+
+def test_register_field_type_keeps_registry_on_error(monkeypatch):
+    """
+    Проверяет, что `register_field_type` изменяет реестр сервиса вместе
+    с определителем типов, а при ошибке оставляет оба прежними.
+    """
+    from app.models import field_validator
+
+    registry = field_validator.field_types.copy()
+    monkeypatch.setattr(field_validator, "field_types", registry)
+    monkeypatch.setattr(field_validator, "_detector", field_validator._detector)
+    monkeypatch.setattr(field_validator, "_detection_cache", None)
+    detector = field_validator._detector
+
+    with pytest.raises(ValueError):
+        field_validator.register_field_type("caseless", r"(?i)[a-z]+")
+    assert "caseless" not in registry
+    assert field_validator._detector is detector
+
+    field_validator.register_field_type("ticket", r"[A-Z]{3}-\d+", priority=10)
+    assert "ticket" in registry
+    assert field_validator.detect_field_type("ABC-1") == "ticket"
+    assert FormTemplate.model_json_schema()["properties"]["fields"][
+        "additionalProperties"
+    ]["enum"] == list(registry.codes)
+
+
+def test_field_type_schema_lists_registered_types():
+    """
+    Проверяет, что схема OpenAPI перечисляет допустимые типы полей.
+    """
+    from app.api.endpoints import app
+
+    schema = app.openapi()["components"]["schemas"]["TemplateResponse"]
+    assert schema["properties"]["fields"]["additionalProperties"]["enum"] == [
+        "date",
+        "phone",
+        "email",
+        "text",
+    ]
+
+
+def test_template_rejects_unknown_field_type():
+    """
+    Проверяет, что шаблон с типом, не объявленным в реестре, отклоняется.
+    """
+    from pydantic import ValidationError
+
+    with pytest.raises(ValidationError, match="Unknown field type"):
+        FormTemplate(name="Profile", site="website")
@@ -0,0 +1,483 @@
+import json
+import random
+
+import pytest
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from app.core.exceptions import StorageUnavailableError
+from app.models.form_template import FormData, FormTemplate
+from app.services.form_service import FormService
+from app.storage.cache import CachedStorage
+from app.storage.migrate import to_normalized_mongo
+from app.storage.mongodb import MongoDBStorage, PoolStats
+
+mongomock = pytest.importorskip("mongomock")
+
+SOURCE = "data/forms_mongo.json"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """
+    Хранилище MongoDB поверх mongomock с каталогом из `data/forms_mongo.json`
+    в нормализованном формате. mongomock не поддерживает транзакции,
+    поэтому записи выполняются через промежуточную коллекцию.
+    """
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "app.storage.mongodb.MongoClient", lambda host, **options: client
+    )
+    to_normalized_mongo("mongodb://localhost", "form_storage", "forms", SOURCE)
+    storage = MongoDBStorage(HOST="localhost", NAME="form_storage", COLLECTION="forms")
+    storage.transactions = False
+    return storage
+
+
+def test_migration_keeps_flat_templates(storage):
+    """
+    Проверяет, что после миграции шаблоны читаются в исходном виде и порядке,
+    а версия каталога увеличивается при каждом запуске.
+    """
+    with open(SOURCE) as f:
+        expected = [FormTemplate(**doc) for doc in json.load(f)]
+
+    assert storage.get_templates() == expected
+    document = storage.collection.find_one({"name": "Login Form"})
+    assert document["_fields"] == ["password:text", "username:text"]
+    assert document["_order"] == 6
+
+    version = storage.get_version()
+    assert storage.migrate() == len(expected)
+    assert storage.get_version() != version
+    assert storage.get_templates() == expected
+
+
+def test_find_templates_matches_in_memory_index(storage):
+    """
+    Проверяет, что отбор на стороне MongoDB возвращает ровно те шаблоны,
+    которые подходят форме, в порядке каталога.
+    """
+    templates = storage.get_templates()
+    names = sorted({name for template in templates for name in template.fields})
+    types = ["date", "phone", "email", "text"]
+    rng = random.Random(3)
+
+    for _ in range(200):
+        field_types = {
+            name: rng.choice(types + ["text"] * 4)
+            for name in rng.sample(names, rng.randint(0, 8))
+        }
+        expected = [
+            template.name
+            for template in templates
+            if all(
+                field_types.get(name) == field_type
+                for name, field_type in template.fields.items()
+            )
+        ]
+        found = storage.find_templates(field_types)
+        assert [template.name for template in found] == expected
+
+
+def test_form_service_server_side_matching(storage, monkeypatch):
+    """
+    Проверяет, что без кеша шаблонов сервис подбирает шаблон запросом
+    к MongoDB, не загружая весь каталог.
+    """
+    monkeypatch.setenv("TEMPLATE_CACHE_ENABLED", "false")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    monkeypatch.setattr(
+        storage, "get_templates", lambda: pytest.fail("full catalog load")
+    )
+    service = FormService()
+    form_data = FormData(
+        data={
+            "email": "test@example.com",
+            "phone": "+1 123 456 78 90",
+            "message": "Hello",
+        }
+    )
+
+    assert service.process_form(form_data).name == "Contact Form"
+    assert service.process_form(form_data, match="best").name == "Contact Form"
+
+
+def test_unmigrated_collection_matches_in_application(monkeypatch):
+    """
+    Проверяет, что без кеша шаблонов коллекция в плоском формате
+    (без миграции) не приводит к молчаливому отсутствию совпадений:
+    шаблоны подбираются по всему каталогу в приложении.
+    """
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "app.storage.mongodb.MongoClient", lambda host, **options: client
+    )
+    with open(SOURCE) as f:
+        client["form_storage"]["forms"].insert_many(json.load(f))
+    storage = MongoDBStorage(HOST="localhost", NAME="form_storage", COLLECTION="forms")
+    monkeypatch.setenv("TEMPLATE_CACHE_ENABLED", "false")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    service = FormService()
+    form_data = FormData(data={"username": "john", "password": "secret"})
+
+    assert not storage.is_normalized()
+    assert service.process_form(form_data).name == "Login Form"
+
+    storage.migrate()
+    assert storage.is_normalized()
+    monkeypatch.setattr(
+        storage, "get_templates", lambda: pytest.fail("full catalog load")
+    )
+    assert service.process_form(form_data).name == "Login Form"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_uses_server_side_matching(storage, monkeypatch):
+    """
+    Проверяет, что быстрый путь `/get_form` без кеша шаблонов тоже
+    подбирает шаблон запросом к MongoDB, не загружая весь каталог.
+    """
+    from httpx import ASGITransport, AsyncClient
+
+    from app.api import endpoints
+
+    monkeypatch.setenv("TEMPLATE_CACHE_ENABLED", "false")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    monkeypatch.setattr(
+        storage, "get_templates", lambda: pytest.fail("full catalog load")
+    )
+    monkeypatch.setattr(endpoints, "service", FormService())
+    monkeypatch.setitem(endpoints.api_config, "FAST_PATH", True)
+    form = {"email": "test@example.com", "phone": "+1 123 456 78 90", "message": "Hi"}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=endpoints.app), base_url="http://test"
+    ) as client:
+        for match in ("first", "best"):
+            response = await client.post(f"/get_form?match={match}", data=form)
+            assert response.json() == {"template_name": "Contact Form"}
+        response = await client.post("/get_form", data={"query": "text"})
+    assert response.json() == {"query": "text"}
+
+
+def test_upsert_and_delete_keep_catalog_order(storage):
+    """
+    Проверяет, что замененный шаблон сохраняет позицию, новый получает
+    следующую, поиск видит изменения, а версия каталога увеличивается.
+    """
+    version = storage.get_version()
+    storage.upsert_templates(
+        [
+            FormTemplate(
+                name="Login Form", username="text", password="text", otp="text"
+            ),
+            FormTemplate(name="Search Form", query="text"),
+        ]
+    )
+    assert storage.get_version() != version
+    assert storage.collection.find_one({"name": "Login Form"})["_order"] == 6
+    count = storage.collection.count_documents({})
+    assert storage.collection.find_one({"name": "Search Form"})["_order"] == count - 1
+
+    found = storage.find_templates({"username": "text", "password": "text"})
+    assert "Login Form" not in [template.name for template in found]
+    assert [t.name for t in storage.find_templates({"query": "text"})] == [
+        "Search Form"
+    ]
+
+    version = storage.get_version()
+    assert storage.delete_templates(["Search Form", "Missing Form"]) == 1
+    assert storage.get_version() != version
+    assert storage.find_templates({"query": "text"}) == []
+
+
+def test_upsert_keeps_order_after_reload(storage):
+    """
+    Проверяет, что после замены шаблона полная загрузка каталога (как при
+    перезагрузке кеша) возвращает шаблоны в прежнем порядке.
+    """
+    names = [template.name for template in storage.get_templates()]
+    first = storage.get_templates()[0]
+    storage.upsert_templates([FormTemplate(name=first.name, **first.fields)])
+
+    assert [template.name for template in storage.get_templates()] == names
+    cached = CachedStorage(storage)
+    assert [template.name for template in cached.get_templates()] == names
+
+
+def test_failed_write_leaves_catalog_unchanged(storage, monkeypatch):
+    """
+    Проверяет, что ошибка посреди записи на отдельном сервере не меняет
+    каталог и версию, а блокировка записи снимается.
+    """
+    templates = storage.get_templates()
+    version = storage.get_version()
+
+    def fail(collection=None):
+        raise OperationFailure("index build failed")
+
+    monkeypatch.setattr(storage, "ensure_indexes", fail)
+    with pytest.raises(OperationFailure):
+        storage.upsert_templates(
+            [
+                FormTemplate(name="Login Form", username="text"),
+                FormTemplate(name="Search Form", query="text"),
+            ]
+        )
+    assert storage.get_templates() == templates
+    assert storage.get_version() == version
+    assert storage.meta.find_one({"_id": "write_lock"}) is None
+
+    monkeypatch.undo()
+    storage.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert storage.get_templates()[-1].name == "Search Form"
+    assert "forms_staging" not in storage.database.list_collection_names()
+
+
+def test_write_lock_waits_for_other_writer(storage, monkeypatch):
+    """
+    Проверяет, что запись ждет блокировку другого процесса и забирает
+    брошенную блокировку после истечения срока.
+    """
+    monkeypatch.setattr(MongoDBStorage, "LOCK_TIMEOUT", 0.1)
+    storage.meta.insert_one({"_id": "write_lock", "owner": "x", "expires": 2e9})
+    with pytest.raises(StorageUnavailableError, match="another writer"):
+        storage.delete_templates(["Login Form"])
+    assert storage.get_templates()[6].name == "Login Form"
+
+    storage.meta.update_one({"_id": "write_lock"}, {"$set": {"expires": 0}})
+    assert storage.delete_templates(["Login Form"]) == 1
+
+
+class RecordingSession:
+    """Сессия, выполняющая функцию транзакции и отмечающая фиксацию."""
+
+    def __init__(self):
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def with_transaction(self, callback):
+        result = callback(self)
+        self.committed = True
+        return result
+
+
+class SessionCollection:
+    """
+    Коллекция, записывающая операции и переданную им сессию; mongomock
+    сессии не поддерживает, поэтому операции выполняются без нее.
+    """
+
+    def __init__(self, collection, calls):
+        self.collection = collection
+        self.calls = calls
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+
+        def call(*args, session=None, **kwargs):
+            self.calls.append((name, session, kwargs.get("ordered")))
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+def test_write_runs_in_transaction(storage, monkeypatch):
+    """
+    Проверяет, что в наборе реплик замена шаблонов и увеличение версии
+    выполняются в одной транзакции одним упорядоченным `bulk_write`.
+    """
+    session = RecordingSession()
+    calls = []
+    monkeypatch.setattr(storage.client, "start_session", lambda: session)
+    storage.collection = SessionCollection(storage.collection, calls)
+    storage.meta = SessionCollection(storage.meta, calls)
+    storage.transactions = True
+    version = storage.get_version()
+    calls.clear()
+
+    storage.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert session.committed
+    assert ("bulk_write", session, True) in calls
+    assert ("update_one", session, None) in calls
+    assert all(call[1] is session for call in calls)
+    assert storage.get_version() != version
+    assert storage.get_templates()[-1].name == "Search Form"
+    assert "forms_staging" not in storage.database.list_collection_names()
+
+
+class FakeClock:
+    """Управляемый источник времени."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyCollection:
+    """
+    Коллекция, которая при `down = True` ведет себя как недоступный сервер:
+    каждое обращение завершается `ServerSelectionTimeoutError`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.down = False
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.down:
+                raise ServerSelectionTimeoutError("mongo:27017: timed out")
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture
+def flaky(storage):
+    """
+    Хранилище с управляемой недоступностью MongoDB и часами выключателя.
+    """
+    storage.collection = FlakyCollection(storage.collection)
+    storage.meta = FlakyCollection(storage.meta)
+    storage.breaker.threshold = 2
+    storage.breaker.reset_timeout = 10
+    storage.breaker.clock = FakeClock()
+    return storage
+
+
+def set_down(storage, down):
+    storage.collection.down = storage.meta.down = down
+
+
+def test_circuit_breaker_fails_fast_while_open(flaky):
+    """
+    Проверяет, что после нескольких ошибок соединения обращения к MongoDB
+    приостанавливаются, а после паузы первое успешное обращение
+    возвращает выключатель в рабочее состояние.
+    """
+    set_down(flaky, True)
+    for _ in range(2):
+        with pytest.raises(StorageUnavailableError):
+            flaky.get_version()
+    assert flaky.health()["state"] == "open"
+
+    calls = flaky.meta.calls
+    with pytest.raises(StorageUnavailableError, match="retrying in"):
+        flaky.get_templates()
+    assert flaky.meta.calls == calls
+
+    flaky.breaker.clock.now = 10
+    assert flaky.breaker.state == "half-open"
+    with pytest.raises(StorageUnavailableError):
+        flaky.get_version()
+    assert flaky.breaker.state == "open"
+
+    set_down(flaky, False)
+    flaky.breaker.clock.now = 20
+    assert flaky.get_version()[1] > 0
+    assert flaky.health()["state"] == "closed"
+    assert flaky.breaker.failures == 0
+
+
+def test_circuit_breaker_ignores_query_errors(flaky):
+    """
+    Проверяет, что ошибка запроса от работающего сервера не считается
+    недоступностью хранилища.
+    """
+    flaky.breaker.failures = 1
+    with pytest.raises(OperationFailure):
+        with flaky.breaker:
+            raise OperationFailure("bad query")
+    assert flaky.breaker.failures == 0
+
+
+def test_cached_catalog_served_while_mongo_is_down(flaky):
+    """
+    Проверяет, что при недоступной MongoDB запросы обслуживаются последним
+    загруженным каталогом, а отчет о состоянии показывает деградацию.
+    """
+    clock = FakeClock()
+    cached = CachedStorage(flaky, ttl=0, check_interval=1, clock=clock)
+    templates = cached.get_templates()
+    assert cached.health()["catalog"]["degraded"] is False
+
+    set_down(flaky, True)
+    for second in range(1, 5):
+        clock.now = second
+        assert cached.get_templates() == templates
+    health = cached.health()
+    assert health["catalog"]["degraded"] is True
+    assert "unavailable" in health["catalog"]["last_error"]
+    assert health["storage"]["state"] == "open"
+    assert cached.stats.stale == 4
+
+    set_down(flaky, False)
+    flaky.breaker.clock.now = 10
+    flaky.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    clock.now = 10
+    assert cached.get_index().match_name({"query": "text"}) == "Search Form"
+    assert cached.health()["catalog"]["degraded"] is False
+
+
+def test_cold_start_while_mongo_is_down(flaky, monkeypatch):
+    """
+    Проверяет, что без загруженного каталога недоступность MongoDB
+    приводит к `StorageUnavailableError`, а отчет сервиса — к статусу
+    `unavailable`.
+    """
+    monkeypatch.setattr("app.storage.factory.StorageFactory.get_storage", lambda: flaky)
+    service = FormService()
+    service.storage.clock = clock = FakeClock()
+    set_down(flaky, True)
+
+    with pytest.raises(StorageUnavailableError):
+        service.get_index()
+    health = service.health()
+    assert health["status"] == "unavailable"
+    assert health["catalog"]["load_failures"] == 1
+
+    set_down(flaky, False)
+    clock.now = 1
+    service.get_index()
+    assert service.health()["status"] == "ok"
+
+
+def test_pool_stats_follow_connection_events():
+    """
+    Проверяет учет соединений пула по событиям pymongo.
+    """
+    stats = PoolStats()
+    stats.connection_created(None)
+    stats.connection_created(None)
+    stats.connection_check_out_started(None)
+    assert stats.as_dict()["waiting"] == 1
+    stats.connection_checked_out(None)
+    stats.connection_check_out_started(None)
+    stats.connection_check_out_failed(None)
+    stats.connection_closed(None)
+
+    assert stats.as_dict() == {
+        "open": 1,
+        "in_use": 1,
+        "waiting": 0,
+        "checkout_failures": 1,
+        "pool_clears": 0,
+    }
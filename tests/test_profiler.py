@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.services.profiler import Profiler
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return Profiler(
+        ENABLED=True,
+        SAMPLE_RATE=0.0,
+        SLOW_MS=20,
+        INTERVAL_MS=1,
+        DIR=str(tmp_path / "profiles"),
+        MAX_FILES=2,
+    )
+
+
+def test_profiler_keeps_only_slow_requests(profiler):
+    """
+    Проверяет, что сохраняются профили только медленных запросов
+    и в формате collapsed stacks.
+    """
+    recording = profiler.start()
+    assert profiler.finish(recording, "POST /get_form") is None
+
+    recording = profiler.start()
+    busy_loop(0.05)
+    path = profiler.finish(recording, "POST /get_form")
+
+    assert path.endswith(".collapsed") and "POST_get_form" in path
+    with open(path) as f:
+        lines = f.read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_loop (tests/test_profiler.py" in line for line in lines)
+    assert stack.split(";")[-1].startswith("busy_loop")
+
+
+def test_profiler_rotates_files(profiler):
+    """
+    Проверяет, что в каталоге остаются только последние `max_files` профилей.
+    """
+    profiler.configure(sample_rate=1.0, slow_ms=0)
+    paths = []
+    for _ in range(4):
+        recording = profiler.start()
+        busy_loop(0.03)
+        paths.append(profiler.finish(recording, "GET /templates"))
+        time.sleep(0.01)
+
+    assert profiler.profiles() == paths[-2:]
+
+
+def test_profiler_disabled_skips_requests(profiler):
+    """
+    Проверяет, что выключенный профилировщик не снимает стеки.
+    """
+    profiler.configure(enabled=False)
+    assert profiler.start() is None
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_toggles_profiling(tmp_path, monkeypatch):
+    """
+    Проверяет переключение профилирования через `/admin/profiling`
+    и сохранение профиля запроса средствами middleware.
+    """
+    from app.api import endpoints
+
+    async def slow_process_form(form_data, match):
+        busy_loop(0.02)
+        return form_data.field_types
+
+    profiler = endpoints.profiler
+    for name, value in (("directory", str(tmp_path)), ("enabled", False)):
+        monkeypatch.setattr(profiler, name, value)
+    monkeypatch.setattr(profiler, "sample_rate", profiler.sample_rate)
+    monkeypatch.setattr(profiler.sampler, "interval", 0.0005)
+    monkeypatch.setattr(endpoints.service, "aprocess_form", slow_process_form)
+    monkeypatch.setitem(endpoints.api_config, "FAST_PATH", False)
+    monkeypatch.setitem(endpoints.api_config, "ADMIN_TOKEN", "")
+
+    transport = ASGITransport(app=endpoints.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/get_form", data={"email": "test@example.com"})
+        assert profiler.profiles() == []
+
+        response = await client.post("/admin/profiling", json={"enabled": True})
+        assert response.status_code == 404
+        monkeypatch.setitem(endpoints.api_config, "ADMIN_TOKEN", "secret")
+        response = await client.post("/admin/profiling", json={"enabled": True})
+        assert response.status_code == 403
+        client.headers["X-Admin-Token"] = "secret"
+
+        response = await client.post(
+            "/admin/profiling", json={"enabled": True, "sample_rate": 1.0}
+        )
+        assert response.json()["enabled"] is True
+        assert response.json()["sample_rate"] == 1.0
+        await client.post("/get_form", data={"email": "test@example.com"})
+
+        await client.post("/admin/profiling", json={"enabled": False})
+        assert (await client.get("/admin/profiling")).json()["enabled"] is False
+
+    profiles = profiler.profiles()
+    assert "POST_get_form" in profiles[0]
+    with open(profiles[0]) as f:
+        assert "slow_process_form" in f.read()
+
+
+@pytest.mark.asyncio
+async def test_afinish_writes_profile_off_event_loop(profiler, monkeypatch):
+    """
+    Проверяет, что `afinish` записывает профиль не в потоке цикла событий.
+    """
+    threads = []
+    write = profiler._write
+
+    def recording_write(stacks, name):
+        threads.append(threading.get_ident())
+        return write(stacks, name)
+
+    monkeypatch.setattr(profiler, "_write", recording_write)
+    recording = profiler.start()
+    busy_loop(0.02)
+    path = await profiler.afinish(recording, "GET /")
+
+    assert path in profiler.profiles()
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,97 @@
+from app.models.form_template import FormData, FormTemplate
+from app.services.form_service import FormService
+from app.services.matcher import TemplateIndex
+from app.services.result_cache import ResultCache, signature
+from app.storage.tinydb import TinyDBStorage
+
+LOGIN = {"username": "john", "password": "secret"}
+
+
+class CountingIndex(TemplateIndex):
+    """
+    Индекс, считающий вызовы подбора.
+    """
+
+    calls = 0
+
+    def match(self, field_types):
+        CountingIndex.calls += 1
+        return super().match(field_types)
+
+
+def test_signature_ignores_field_order():
+    """
+    Проверяет, что сигнатура не зависит от порядка полей, но учитывает
+    типы и режим подбора.
+    """
+    assert signature({"a": "text", "b": "email"}) == signature(
+        {"b": "email", "a": "text"}
+    )
+    assert signature({"a": "text"}) != signature({"a": "email"})
+    assert signature({"a": "text"}) != signature({"a": "text"}, "best")
+
+
+def test_repeated_shapes_skip_matching(monkeypatch, tmp_path):
+    """
+    Проверяет, что формы с одинаковым набором типизированных полей
+    подбираются один раз, включая результат «не найден».
+    """
+    monkeypatch.setattr(CountingIndex, "calls", 0)
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    service = FormService()
+    index = CountingIndex(
+        [FormTemplate(name="Login Form", username="text", password="text")]
+    )
+
+    for data in (LOGIN, {"password": "other", "username": "jane"}):
+        template = service.match_index(index, FormData(data=data).field_types)
+        assert template.name == "Login Form"
+    for _ in range(2):
+        assert service.match_index(index, {"email": "email"}) is None
+
+    assert CountingIndex.calls == 2
+    stats = service.result_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+
+
+def test_result_cache_invalidated_by_catalog_changes(monkeypatch, tmp_path):
+    """
+    Проверяет, что изменение индекса на месте и перезагрузка каталога
+    сбрасывают сохраненные результаты.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    storage.db.insert({"name": "Login Form", "username": "text", "password": "text"})
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: storage
+    )
+    monkeypatch.setenv("TEMPLATE_CACHE_CHECK_INTERVAL", "0")
+    service = FormService()
+    form_data = FormData(data=LOGIN)
+
+    assert service.process_form(form_data).name == "Login Form"
+    service.storage.upsert_templates(
+        [FormTemplate(name="Login Form", username="text", password="date")]
+    )
+    assert service.process_form(form_data) == form_data.field_types
+
+    storage.db.insert({"name": "Plain Login", "username": "text", "password": "text"})
+    assert service.process_form(form_data).name == "Plain Login"
+
+
+def test_result_cache_ignores_results_of_stale_snapshot():
+    """
+    Проверяет, что результат, подобранный до изменения индекса,
+    не сохраняется для нового снимка.
+    """
+    cache = ResultCache(10)
+    index = TemplateIndex([FormTemplate(name="Login Form", username="text")])
+    key = signature({"username": "text"})
+
+    assert cache.get(index, key) is None
+    revision = index.revision
+    index.delete(["Login Form"])
+    cache.put(index, revision, key, FormTemplate(name="Login Form", username="text"))
+    assert cache.get(index, key) is None
@@ -0,0 +1,157 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.models.form_template import FormTemplate
+from app.serve import PreforkServer
+from app.storage.cache import CachedStorage
+from app.storage.lazy import LazyStorage
+from app.storage.tinydb import TinyDBStorage
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+
+
+def copy_catalog(tmp_path):
+    path = str(tmp_path / "forms.json")
+    shutil.copy("data/forms.json", path)
+    return path
+
+
+def test_after_fork_keeps_catalog_and_resets_clients(tmp_path):
+    """
+    Проверяет, что после `fork` кеш сохраняет загруженный каталог,
+    а хранилище и пул потоков создаются заново.
+    """
+    lazy = LazyStorage(TinyDBStorage, NAME=copy_catalog(tmp_path), COLLECTION="forms")
+    cached = CachedStorage(lazy)
+    templates = cached.get_templates()
+    executor = cached.async_storage.executor
+    assert lazy.connected
+
+    cached.after_fork()
+
+    assert not lazy.connected
+    assert cached.is_loaded
+    assert cached.async_storage.executor is not executor
+    assert cached.get_templates() == templates
+
+
+def test_write_does_not_respawn_workers_until_version_settles(tmp_path):
+    """
+    Проверяет, что запись в каталог (через другой процесс) не вызывает
+    замену поколения на ближайшей проверке версии: родитель ждет,
+    пока версия не будет меняться `reload_delay` секунд.
+    """
+    path = copy_catalog(tmp_path)
+    cached = CachedStorage(TinyDBStorage(NAME=path, COLLECTION="forms"))
+    cached.get_templates()
+    writer = TinyDBStorage(NAME=path, COLLECTION="forms")
+    server = PreforkServer("127.0.0.1", 0, 1, reload_delay=0.3)
+    server.service = SimpleNamespace(storage=cached)
+
+    assert not server._catalog_settled()
+    writer.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert not server._catalog_settled()
+    time.sleep(0.1)
+    writer.upsert_templates([FormTemplate(name="Search Form", query="email")])
+    assert not server._catalog_settled()
+    time.sleep(0.1)
+    assert not server._catalog_settled()
+
+    time.sleep(0.3)
+    assert server._catalog_settled()
+
+
+def spawn(code):
+    return subprocess.Popen([sys.executable, "-c", code])
+
+
+def test_wait_ready_requires_every_worker(tmp_path):
+    """
+    Проверяет ожидание готовности: поколение готово, только когда
+    о готовности сообщили все воркеры; завершившийся воркер или
+    истекшее время ожидания означают неготовность.
+    """
+    server = PreforkServer("127.0.0.1", 0, 2, ready_timeout=0.5)
+    server._ready_pipe = os.pipe()
+    workers = [spawn("import time; time.sleep(5)") for _ in range(2)]
+    try:
+        os.write(server._ready_pipe[1], f"{workers[0].pid}\n".encode())
+        assert not server._wait_ready([worker.pid for worker in workers])
+
+        os.write(
+            server._ready_pipe[1], f"{workers[0].pid}\n{workers[1].pid}\n".encode()
+        )
+        assert server._wait_ready([worker.pid for worker in workers])
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+
+    exited = spawn("pass")
+    started = time.monotonic()
+    server.ready_timeout = 5.0
+    assert not server._wait_ready([exited.pid])
+    assert time.monotonic() - started < 5.0
+    for fd in server._ready_pipe:
+        os.close(fd)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_workers_see_writes_of_other_workers(tmp_path):
+    """
+    Проверяет многопроцессный запуск: файл готовности создается после
+    готовности воркеров, а шаблон, записанный через один воркер,
+    виден всем воркерам.
+    """
+    port = free_port()
+    ready_file = str(tmp_path / "ready")
+    env = {
+        **os.environ,
+        "STORAGE_TYPE": "TinyDB",
+        "STORAGE_NAME": copy_catalog(tmp_path),
+        "STORAGE_COLLECTION": "forms",
+        "ADMIN_TOKEN": "secret",
+        "TEMPLATE_CACHE_CHECK_INTERVAL": "0.1",
+    }
+    args = ["--port", str(port), "--workers", "2", "--reload-interval", "0"]
+    args += ["--ready-file", ready_file, "--log-level", "warning"]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", *args],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(ready_file):
+            assert server.poll() is None and time.monotonic() < deadline
+            time.sleep(0.05)
+        assert httpx.get(f"{base_url}/ready").status_code == 200
+
+        response = httpx.put(
+            f"{base_url}/templates/Search Form",
+            json={"query": "text"},
+            headers={"X-Admin-Token": "secret"},
+        )
+        assert response.status_code == 200
+        time.sleep(0.5)
+        for _ in range(10):
+            with httpx.Client() as client:
+                response = client.get(f"{base_url}/templates/Search Form")
+            assert response.status_code == 200
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    assert not os.path.exists(ready_file)
@@ -1,3 +1,5 @@
+import pytest
+
 from app.models.form_template import FormData, FormTemplate
 from app.services.form_service import FormService
 
@@ -68,3 +70,282 @@ def test_process_form_no_match(monkeypatch):
     result = service.process_form(form_data)
     assert isinstance(result, dict)
     assert result == {"email": "email", "phone": "phone"}
+
+
+def brute_force_match(field_types, templates):
+    """
+    Эталонный линейный перебор шаблонов в порядке списка.
+    """
+    for template in templates:
+        if all(
+            field_types.get(name) == field_type
+            for name, field_type in template.fields.items()
+        ):
+            return template
+    return None
+
+
+def test_template_index_matches_linear_scan():
+    """
+    Проверяет, что поиск по индексу даёт тот же первый шаблон, что и перебор.
+    """
+    import random
+
+    from app.services.matcher import TemplateIndex
+
+    rng = random.Random(42)
+    names = [f"field_{i}" for i in range(12)]
+    types = ["date", "phone", "email", "text"]
+    templates = [
+        FormTemplate(
+            name=f"Template {i}",
+            **{
+                name: rng.choice(types) for name in rng.sample(names, rng.randint(1, 4))
+            },
+        )
+        for i in range(200)
+    ]
+    index = TemplateIndex(templates)
+
+    for _ in range(500):
+        field_types = {
+            name: rng.choice(types) for name in rng.sample(names, rng.randint(0, 8))
+        }
+        expected = brute_force_match(field_types, templates)
+        result = index.match(field_types)
+        assert (result and result.name) == (expected and expected.name)
+        if expected is not None:
+            assert result.fields == expected.fields
+
+
+def test_template_index_empty_template_matches_any_form():
+    """
+    Проверяет, что шаблон без полей подходит любой форме, как и при переборе.
+    """
+    from app.services.matcher import TemplateIndex
+
+    templates = [
+        FormTemplate(name="Contact Form", email="email"),
+        FormTemplate(name="Empty Form"),
+    ]
+    index = TemplateIndex(templates)
+
+    assert index.match({"email": "email"}).name == "Contact Form"
+    assert index.match({"phone": "phone"}).name == "Empty Form"
+
+
+@pytest.mark.asyncio
+async def test_aprocess_form_match_template(monkeypatch):
+    """
+    Тестирует асинхронную обработку формы через синхронное хранилище.
+    """
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: MockStorage()
+    )
+    service = FormService()
+    form_data = FormData(
+        data={
+            "customer_name": "John",
+            "email": "test@example.com",
+            "feedback": "Great",
+        }
+    )
+    result = await service.aprocess_form(form_data)
+    assert isinstance(result, FormTemplate)
+    assert result.name == "Feedback Form"
+
+
+def test_process_forms_keeps_input_order(monkeypatch):
+    """
+    Тестирует пакетную обработку форм: результаты идут в порядке входных данных.
+    """
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: MockStorage()
+    )
+    service = FormService()
+    forms = [
+        {"email": "test@example.com", "phone": "+1 123 456 78 90", "message": "Hi"},
+        {"email": "test@example.com"},
+        {"customer_name": "John", "email": "test@example.com", "feedback": "Hi"},
+    ]
+    results = list(service.process_forms(forms))
+
+    assert results[0].name == "Contact Form"
+    assert results[1] == {"email": "email"}
+    assert results[2].name == "Feedback Form"
+    assert [r for r in results if isinstance(r, dict)] == [
+        service.process_form(FormData(data=forms[1]))
+    ]
+
+
+def test_template_index_best_and_rank_match_linear_scan():
+    """
+    Проверяет режим `best` и ранжирование по индексу против полного перебора.
+    """
+    import random
+
+    from app.services.matcher import TemplateIndex
+
+    rng = random.Random(7)
+    names = [f"field_{i}" for i in range(12)]
+    types = ["date", "phone", "email", "text"]
+    templates = [
+        FormTemplate(
+            name=f"Template {i}",
+            **{
+                name: rng.choice(types) for name in rng.sample(names, rng.randint(1, 5))
+            },
+        )
+        for i in range(200)
+    ]
+    index = TemplateIndex(templates)
+
+    for _ in range(300):
+        field_types = {
+            name: rng.choice(types) for name in rng.sample(names, rng.randint(0, 8))
+        }
+        scored = []
+        for position, template in enumerate(templates):
+            matched = sum(
+                field_types.get(name) == field_type
+                for name, field_type in template.fields.items()
+            )
+            if matched:
+                complete = matched == len(template.fields)
+                scored.append((not complete, -matched, position))
+        scored.sort()
+
+        complete = [key for key in scored if not key[0]]
+        best = index.match_best(field_types)
+        expected = templates[complete[0][2]] if complete else None
+        assert (best and best.name) == (expected and expected.name)
+        assert index.match_best_name(field_types) == (expected and expected.name)
+
+        ranked = index.rank(field_types, limit=5)
+        assert [
+            (candidate.template.name, candidate.matched) for candidate in ranked
+        ] == [(templates[position].name, -count) for _, count, position in scored[:5]]
+
+
+def test_process_form_best_match(monkeypatch):
+    """
+    Тестирует режим `best`: выбирается подходящий шаблон с наибольшим числом полей,
+    а не первый в порядке хранилища.
+    """
+
+    class OrderedStorage:
+        def get_templates(self):
+            return [
+                FormTemplate(name="Short Form", email="email"),
+                FormTemplate(
+                    name="Contact Form", email="email", phone="phone", message="text"
+                ),
+            ]
+
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: OrderedStorage()
+    )
+    service = FormService()
+    form_data = FormData(
+        data={
+            "email": "test@example.com",
+            "phone": "+1 123 456 78 90",
+            "message": "Hello",
+        }
+    )
+
+    assert service.process_form(form_data).name == "Short Form"
+    assert service.process_form(form_data, match="best").name == "Contact Form"
+
+    ranked = service.rank_form(form_data, limit=1)
+    assert [(c.template.name, c.score, c.complete) for c in ranked] == [
+        ("Contact Form", 1.0, True)
+    ]
+
+
+def test_rank_form_partial_candidates(monkeypatch):
+    """
+    Тестирует ранжирование: частично совпавшие шаблоны идут после полных
+    с оценкой, равной доле совпавших полей.
+    """
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: MockStorage()
+    )
+    service = FormService()
+    form_data = FormData(data={"email": "test@example.com", "message": "Hello"})
+
+    ranked = service.rank_form(form_data)
+    assert [(c.template.name, c.matched, c.total) for c in ranked] == [
+        ("Contact Form", 2, 3),
+        ("Feedback Form", 1, 3),
+    ]
+    assert ranked[0].score == pytest.approx(2 / 3)
+    assert not ranked[0].complete
+
+
+def test_template_index_incremental_updates_match_rebuild():
+    """
+    Проверяет, что индекс после изменений на месте отвечает так же,
+    как индекс, построенный заново по итоговому каталогу.
+    """
+    import random
+
+    from app.services.matcher import TemplateIndex
+
+    rng = random.Random(11)
+    names = [f"field_{i}" for i in range(10)]
+    types = ["date", "phone", "email", "text"]
+
+    def random_template(i):
+        return FormTemplate(
+            name=f"Template {i}",
+            **{
+                name: rng.choice(types) for name in rng.sample(names, rng.randint(0, 4))
+            },
+        )
+
+    catalog = {f"Template {i}": random_template(i) for i in range(100)}
+    index = TemplateIndex(catalog.values())
+
+    for _ in range(50):
+        changed = [random_template(rng.randrange(130)) for _ in range(3)]
+        index.upsert(changed)
+        for template in changed:
+            catalog[template.name] = template
+        removed = [f"Template {rng.randrange(130)}" for _ in range(2)]
+        assert index.delete(removed) == len(
+            [name for name in set(removed) if catalog.pop(name, None)]
+        )
+
+        rebuilt = TemplateIndex(catalog.values())
+        assert len(index) == len(catalog)
+        assert index.templates() == rebuilt.templates()
+        for _ in range(10):
+            field_types = {
+                name: rng.choice(types) for name in rng.sample(names, rng.randint(0, 6))
+            }
+            assert index.match_name(field_types) == rebuilt.match_name(field_types)
+            assert index.match_best_name(field_types) == rebuilt.match_best_name(
+                field_types
+            )
+            assert [c.template.name for c in index.rank(field_types)] == [
+                c.template.name for c in rebuilt.rank(field_types)
+            ]
+    assert index.get("Template 0") == catalog.get("Template 0")
+
+
+def test_read_only_storage_rejects_writes(monkeypatch):
+    """
+    Проверяет, что запись в хранилище без поддержки записи отклоняется.
+    """
+    from app.core.exceptions import ReadOnlyStorageError
+
+    monkeypatch.setenv("TEMPLATE_CACHE_ENABLED", "false")
+    monkeypatch.setattr(
+        "app.storage.factory.StorageFactory.get_storage", lambda: MockStorage()
+    )
+    service = FormService()
+
+    with pytest.raises(ReadOnlyStorageError):
+        service.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert service.get_template("Search Form") is None
@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from app.core.exceptions import ReadOnlyStorageError, SnapshotError
+from app.models.form_template import FormTemplate
+from app.services.matcher import TemplateIndex
+from app.services.snapshot import SnapshotIndex, write_snapshot
+from app.storage.cache import CachedStorage
+from app.storage.snapshot import SnapshotStorage, main, verify
+from app.storage.tinydb import TinyDBStorage
+
+TYPES = ["text", "email", "phone", "date"]
+
+
+def random_catalog(rng, count=300, fields=40):
+    """
+    Создает случайный каталог шаблонов, включая шаблон без полей
+    и повторяющиеся имена.
+    """
+    names = [f"field_{i}" for i in range(fields)]
+    templates = [FormTemplate(name="Пустой шаблон")]
+    for i in range(count):
+        chosen = rng.sample(names, rng.randint(1, 5))
+        templates.append(
+            FormTemplate(
+                name=f"Шаблон {i % 250}", **{n: rng.choice(TYPES) for n in chosen}
+            )
+        )
+    return names, templates
+
+
+def test_snapshot_index_matches_template_index(tmp_path):
+    """
+    Проверяет, что индекс снимка возвращает те же результаты подбора,
+    что и индекс, построенный из шаблонов.
+    """
+    rng = random.Random(7)
+    names, templates = random_catalog(rng)
+    path = str(tmp_path / "forms.snapshot")
+    assert write_snapshot(path, templates) == len(templates)
+
+    snapshot = SnapshotIndex(path)
+    index = TemplateIndex(templates)
+    assert snapshot.verify_checksum()
+    assert len(snapshot) == len(index)
+    assert snapshot.templates() == index.templates()
+    assert snapshot.get("Шаблон 3") == index.get("Шаблон 3")
+
+    for _ in range(500):
+        chosen = rng.sample(names + ["unknown"], rng.randint(0, 8))
+        form = {name: rng.choice(TYPES) for name in chosen}
+        assert snapshot.match(form) == index.match(form)
+        assert snapshot.match_name(form) == index.match_name(form)
+        assert snapshot.match_best(form) == index.match_best(form)
+        assert [(s.template, s.matched) for s in snapshot.rank(form, 3)] == [
+            (s.template, s.matched) for s in index.rank(form, 3)
+        ]
+
+    with pytest.raises(TypeError):
+        snapshot.upsert([FormTemplate(name="New", email="email")])
+
+
+def test_snapshot_rejects_foreign_and_damaged_files(tmp_path):
+    """
+    Проверяет ошибки при открытии не-снимка и обнаружение поврежденных данных.
+    """
+    path = tmp_path / "forms.snapshot"
+    path.write_bytes(b"{}" * 200)
+    with pytest.raises(SnapshotError):
+        SnapshotIndex(str(path))
+
+    write_snapshot(str(path), [FormTemplate(name="Login Form", login="text")])
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data[:-8]))
+    with pytest.raises(SnapshotError):
+        SnapshotIndex(str(path))
+
+    path.write_bytes(bytes(data))
+    assert not SnapshotIndex(str(path)).verify_checksum()
+
+
+def test_cached_storage_uses_snapshot_index(tmp_path):
+    """
+    Проверяет, что кеш использует готовый индекс снимка, перезагружает его
+    после пересборки и не поддерживает запись.
+    """
+    path = str(tmp_path / "forms.snapshot")
+    write_snapshot(path, [FormTemplate(name="Login Form", login="text")])
+    cached = CachedStorage(SnapshotStorage(NAME=path), ttl=0, check_interval=0)
+
+    index = cached.get_index()
+    assert isinstance(index, SnapshotIndex)
+    assert index.match_name({"login": "text"}) == "Login Form"
+
+    write_snapshot(path, [FormTemplate(name="Email Form", login="email")])
+    assert cached.get_index().match_name({"login": "email"}) == "Email Form"
+    assert cached.stats.reloads == 1
+    with pytest.raises(ReadOnlyStorageError):
+        cached.upsert_templates([FormTemplate(name="New", email="email")])
+
+
+def test_build_and_verify_commands(tmp_path, monkeypatch, capsys):
+    """
+    Проверяет сборку снимка из TinyDB и сверку с источником.
+    """
+    monkeypatch.setattr("os.environ", {})
+    source = str(tmp_path / "forms.json")
+    storage = TinyDBStorage(NAME=source, COLLECTION="forms")
+    storage.db.insert({"name": "Login Form", "login": "text", "password": "text"})
+    storage.db.insert({"name": "Contact Form", "email": "email"})
+    path = str(tmp_path / "forms.snapshot")
+    options = ["--source-type", "TinyDB", "--source-name", source]
+
+    main(["build", path, *options])
+    main(["verify", path, *options])
+    assert "matches the source" in capsys.readouterr().out
+
+    storage.db.insert({"name": "Search Form", "query": "text"})
+    assert verify(path, storage)[0] == "template count: snapshot 2, source 3"
+    with pytest.raises(SystemExit):
+        main(["verify", path, *options])
+
+
+def test_snapshot_rejects_other_field_type_codes(tmp_path, monkeypatch):
+    """
+    Проверяет, что снимок, собранный с другими кодами типов полей,
+    не открывается.
+    """
+    from app.models.compact import TYPE_CODES, TYPE_NAMES
+
+    path = str(tmp_path / "forms.snapshot")
+    write_snapshot(path, [FormTemplate(name="Login Form", login="text")])
+    SnapshotIndex(path)
+
+    names = list(TYPE_NAMES)
+    names[TYPE_CODES["text"]] = "note"
+    monkeypatch.setattr("app.services.snapshot.TYPE_NAMES", names)
+    with pytest.raises(SnapshotError, match="field type 'text'"):
+        SnapshotIndex(path)
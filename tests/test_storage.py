@@ -0,0 +1,465 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models.form_template import FormTemplate
+from app.storage.cache import CachedStorage
+from app.storage.lazy import LazyStorage
+from app.storage.registry import StorageRegistry
+from app.storage.threaded import is_async_storage
+from app.storage.tinydb import TinyDBStorage
+
+
+class VersionedStorage:
+    """
+    Мок-реализация хранилища с управляемой версией данных.
+    Считает количество обращений к `get_templates`.
+    """
+
+    def __init__(self):
+        self.version = 1
+        self.loads = 0
+
+    def get_templates(self):
+        self.loads += 1
+        return [FormTemplate(name=f"Form v{self.version}", email="email")]
+
+    def get_version(self):
+        return self.version
+
+
+class FakeClock:
+    """Управляемый источник времени."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def storage():
+    return VersionedStorage()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_cached_storage_serves_from_memory(storage, clock):
+    """
+    Проверяет, что повторные запросы не обращаются к хранилищу.
+    """
+    cached = CachedStorage(storage, ttl=0, check_interval=10, clock=clock)
+
+    for _ in range(5):
+        assert cached.get_templates()[0].name == "Form v1"
+
+    assert storage.loads == 1
+    assert cached.stats.as_dict() == {
+        "hits": 4,
+        "misses": 1,
+        "reloads": 0,
+        "updates": 0,
+        "stale": 0,
+    }
+
+
+def test_cached_storage_reloads_on_version_change(storage, clock):
+    """
+    Проверяет перезагрузку кеша после смены версии данных.
+    """
+    cached = CachedStorage(storage, ttl=0, check_interval=1, clock=clock)
+    cached.get_templates()
+
+    storage.version = 2
+    assert cached.get_templates()[0].name == "Form v1"
+
+    clock.now = 1.5
+    assert cached.get_templates()[0].name == "Form v2"
+    assert cached.get_index().match({"email": "email"}).name == "Form v2"
+    assert storage.loads == 2
+    assert cached.stats.reloads == 1
+
+
+def test_cached_storage_reloads_after_ttl(storage, clock):
+    """
+    Проверяет перезагрузку кеша по истечении TTL даже без смены версии.
+    """
+    cached = CachedStorage(storage, ttl=5, check_interval=100, clock=clock)
+    cached.get_templates()
+
+    clock.now = 5
+    cached.get_templates()
+    assert storage.loads == 2
+    assert cached.stats.reloads == 1
+
+
+def test_tinydb_version_changes_on_write(tmp_path):
+    """
+    Проверяет, что версия TinyDB меняется после записи в файл.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    storage.db.insert({"name": "Contact Form", "email": "email"})
+    before = storage.get_version()
+
+    storage.db.insert({"name": "Feedback Form", "feedback": "text"})
+    assert storage.get_version() != before
+    assert [t.name for t in storage.get_templates()] == [
+        "Contact Form",
+        "Feedback Form",
+    ]
+
+
+def test_tinydb_upsert_and_delete_by_name(tmp_path):
+    """
+    Проверяет замену шаблона с сохранением позиции, добавление в конец
+    и удаление по имени в TinyDB.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    storage.db.insert({"name": "Contact Form", "email": "email"})
+    storage.db.insert({"name": "Login Form", "username": "text"})
+
+    storage.upsert_templates(
+        [
+            FormTemplate(name="Contact Form", email="email", phone="phone"),
+            FormTemplate(name="Search Form", query="text"),
+        ]
+    )
+    assert storage.get_templates() == [
+        FormTemplate(name="Contact Form", email="email", phone="phone"),
+        FormTemplate(name="Login Form", username="text"),
+        FormTemplate(name="Search Form", query="text"),
+    ]
+    assert storage.delete_templates(["Login Form", "Missing Form"]) == 1
+    storage.db.insert({"name": "Feedback Form", "feedback": "text"})
+    assert [doc.doc_id for doc in storage.db.all()] == [1, 3, 4]
+
+
+def test_tinydb_concurrent_writes(tmp_path):
+    """
+    Проверяет, что одновременные записи из нескольких потоков не теряются.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+
+    def write(i):
+        storage.upsert_templates([FormTemplate(name=f"Form {i}", query="text")])
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(write, range(40)))
+    names = [template.name for template in storage.get_templates()]
+    assert sorted(names) == sorted(f"Form {i}" for i in range(40))
+    assert len({doc.doc_id for doc in storage.db.all()}) == 40
+
+
+def test_cached_storage_applies_writes_without_reload(tmp_path):
+    """
+    Проверяет, что записи через кеш применяются к загруженному индексу
+    без перезагрузки каталога, а внешнее изменение приводит к перезагрузке.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    storage.db.insert({"name": "Contact Form", "email": "email"})
+    cached = CachedStorage(storage, ttl=0, check_interval=0)
+    index = cached.get_index()
+
+    cached.upsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert cached.get_index() is index
+    assert index.match_name({"query": "text"}) == "Search Form"
+    assert cached.delete_templates(["Contact Form"]) == 1
+    assert cached.get_index() is index
+    assert index.match_name({"email": "email"}) is None
+    assert cached.stats.updates == 2
+    assert cached.stats.reloads == 0
+
+    storage.db.insert({"name": "Feedback Form", "feedback": "text"})
+    cached.upsert_templates([FormTemplate(name="Search Form", query="email")])
+    assert cached.get_index() is not index
+    assert [t.name for t in cached.get_templates()] == ["Search Form", "Feedback Form"]
+
+
+class AsyncVersionedStorage(VersionedStorage):
+    """
+    Асинхронный вариант мок-хранилища.
+    """
+
+    async def get_templates(self):
+        return VersionedStorage.get_templates(self)
+
+    async def get_version(self):
+        return self.version
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_async_over_sync_storage(storage, clock):
+    """
+    Проверяет асинхронный доступ к кешу поверх синхронного хранилища.
+    """
+    cached = CachedStorage(storage, ttl=0, check_interval=1, clock=clock)
+
+    index = await cached.aget_index()
+    assert index.match({"email": "email"}).name == "Form v1"
+
+    storage.version = 2
+    clock.now = 1
+    assert (await cached.aget_templates())[0].name == "Form v2"
+    assert storage.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_async_storage(clock):
+    """
+    Проверяет работу кеша с асинхронным хранилищем.
+    """
+    storage = AsyncVersionedStorage()
+    cached = CachedStorage(storage, ttl=0, check_interval=1, clock=clock)
+
+    assert (await cached.aget_templates())[0].name == "Form v1"
+    assert (await cached.aget_templates())[0].name == "Form v1"
+    assert storage.loads == 1
+
+    with pytest.raises(TypeError):
+        CachedStorage(storage).get_templates()
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_async_writes(tmp_path):
+    """
+    Проверяет асинхронную запись через кеш поверх синхронного хранилища.
+    """
+    storage = TinyDBStorage(NAME=str(tmp_path / "forms.json"), COLLECTION="forms")
+    cached = CachedStorage(storage, ttl=0, check_interval=0)
+    index = await cached.aget_index()
+
+    await cached.aupsert_templates([FormTemplate(name="Search Form", query="text")])
+    assert (await cached.aget_index()) is index
+    assert await cached.adelete_templates(["Search Form"]) == 1
+    assert storage.get_templates() == []
+    assert len(index) == 0
+
+
+class BlockingStorage(VersionedStorage):
+    """
+    Мок-хранилище, загрузка в котором ждет разрешения теста
+    и может завершаться ошибкой.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.error = None
+
+    def get_templates(self):
+        self.started.set()
+        self.release.wait(5)
+        templates = super().get_templates()
+        if self.error is not None:
+            raise self.error
+        return templates
+
+
+def test_cached_storage_loads_once_for_concurrent_threads(clock):
+    """
+    Проверяет, что одновременные запросы к незагруженному кешу
+    выполняют одну загрузку и получают один и тот же индекс.
+    """
+    storage = BlockingStorage()
+    cached = CachedStorage(storage, ttl=0, check_interval=10, clock=clock)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cached.get_index()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    storage.started.wait(5)
+    storage.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert storage.loads == 1
+    assert len(results) == 8
+    assert all(index is results[0] for index in results)
+    assert cached.stats.misses == 1
+
+
+def test_cached_storage_serves_stale_index_during_reload(clock):
+    """
+    Проверяет, что во время перезагрузки остальные запросы получают
+    предыдущий снимок, а новый подставляется после завершения загрузки.
+    """
+    storage = BlockingStorage()
+    storage.release.set()
+    cached = CachedStorage(storage, ttl=0, check_interval=1, clock=clock)
+    old = cached.get_index()
+
+    storage.release.clear()
+    storage.started.clear()
+    storage.version = 2
+    clock.now = 1
+    leader = threading.Thread(target=cached.get_index)
+    leader.start()
+    storage.started.wait(5)
+    assert cached.get_index() is old
+    assert cached.get_index() is old
+
+    storage.release.set()
+    leader.join(5)
+    assert cached.get_templates()[0].name == "Form v2"
+    assert storage.loads == 2
+    assert cached.stats.reloads == 1
+
+
+def test_cached_storage_backs_off_after_failed_reload(clock):
+    """
+    Проверяет, что после ошибки загрузки кеш отдает предыдущий снимок
+    и не обращается к хранилищу до истечения паузы, удваивая ее
+    после повторной ошибки.
+    """
+    storage = BlockingStorage()
+    storage.release.set()
+    cached = CachedStorage(
+        storage, ttl=0, check_interval=0, clock=clock, retry_backoff=2
+    )
+    old = cached.get_index()
+
+    storage.version = 2
+    storage.error = ConnectionError("storage is down")
+    assert cached.get_index() is old
+    assert storage.loads == 2
+
+    clock.now = 1.9
+    assert cached.get_index() is old
+    assert storage.loads == 2
+
+    clock.now = 2
+    assert cached.get_index() is old
+    assert storage.loads == 3
+
+    clock.now = 5.9
+    assert cached.get_index() is old
+    assert storage.loads == 3
+
+    storage.error = None
+    clock.now = 6
+    assert cached.get_templates()[0].name == "Form v2"
+    assert storage.loads == 4
+
+
+def test_cached_storage_raises_while_backing_off_without_index(clock):
+    """
+    Проверяет, что при неудачной первой загрузке ошибка возвращается
+    без повторных обращений к хранилищу до истечения паузы.
+    """
+    storage = BlockingStorage()
+    storage.release.set()
+    storage.error = ConnectionError("storage is down")
+    cached = CachedStorage(storage, ttl=0, check_interval=0, clock=clock)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            cached.get_index()
+    assert storage.loads == 1
+
+    storage.error = None
+    clock.now = 1
+    assert cached.get_templates()[0].name == "Form v1"
+    assert storage.loads == 2
+
+
+def test_cached_storage_discards_load_started_before_invalidate(clock):
+    """
+    Проверяет, что результат загрузки, начатой до сброса кеша,
+    не подставляется в кеш.
+    """
+    storage = BlockingStorage()
+    cached = CachedStorage(storage, ttl=0, check_interval=10, clock=clock)
+    leader = threading.Thread(target=cached.get_index)
+    leader.start()
+    storage.started.wait(5)
+
+    cached.invalidate()
+    storage.release.set()
+    leader.join(5)
+    assert not cached.is_loaded
+
+    storage.version = 2
+    assert cached.get_templates()[0].name == "Form v2"
+    assert storage.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_async_loads_once(clock):
+    """
+    Проверяет, что одновременные корутины выполняют одну загрузку,
+    а отмена первой из них не прерывает загрузку для остальных.
+    """
+    storage = BlockingStorage()
+    cached = CachedStorage(storage, ttl=0, check_interval=10, clock=clock)
+
+    first = asyncio.ensure_future(cached.aget_index())
+    others = [asyncio.ensure_future(cached.aget_index()) for _ in range(4)]
+    await asyncio.to_thread(storage.started.wait, 5)
+    first.cancel()
+    storage.release.set()
+    results = await asyncio.gather(*others)
+
+    assert storage.loads == 1
+    assert all(index is results[0] for index in results)
+    assert cached.is_loaded
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+class ConnectingStorage(VersionedStorage):
+    """
+    Мок-хранилище, считающее созданные экземпляры.
+    """
+
+    instances = 0
+
+    def __init__(self, **params):
+        super().__init__()
+        ConnectingStorage.instances += 1
+        self.params = params
+
+
+def test_lazy_storage_connects_on_first_call(monkeypatch):
+    """
+    Проверяет, что хранилище создается только при первом обращении
+    к данным, а проверки интерфейса к подключению не приводят.
+    """
+    monkeypatch.setattr(ConnectingStorage, "instances", 0)
+    lazy = LazyStorage(ConnectingStorage, NAME="forms")
+
+    assert hasattr(lazy, "get_version")
+    assert not hasattr(lazy, "find_templates")
+    assert not hasattr(lazy, "loads")
+    assert not is_async_storage(lazy)
+    assert is_async_storage(LazyStorage(AsyncVersionedStorage))
+    assert ConnectingStorage.instances == 0
+
+    assert lazy.get_templates()[0].name == "Form v1"
+    assert lazy.get_version() == 1
+    assert lazy.loads == 1
+    assert lazy.connect().params == {"NAME": "forms"}
+    assert ConnectingStorage.instances == 1
+
+
+def test_registry_imports_storage_by_path():
+    """
+    Проверяет, что хранилище, зарегистрированное путем, импортируется
+    при первом обращении, а неизвестный тип вызывает ошибку.
+    """
+    StorageRegistry.register("Versioned", f"{__name__}.VersionedStorage")
+    try:
+        assert StorageRegistry.get_storage("Versioned") is VersionedStorage
+    finally:
+        StorageRegistry._registry.pop("Versioned")
+
+    with pytest.raises(ValueError):
+        StorageRegistry.get_storage("Missing")